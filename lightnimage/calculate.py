@@ -1,3 +1,5 @@
+import math
+
 import numpy as np
 
 
@@ -12,6 +14,9 @@ def average_2d(array, area=None):
 
     Added 16.11.2018
 
+    Changed 19.10.2026
+    The average is calculated on the sliced sub array instead of iterating over every element of the whole array
+
     @param np.ndarray array:
     @param tuple area:
     @return:
@@ -24,22 +29,12 @@ def average_2d(array, area=None):
     else:
         raise TypeError("area input of type {} not supported".format(type(area)))
 
-    # Iterating over all the specified elements, calculating the sum, while also counting the elements,
-    # so that later on the average can be calculated as the sum divided by the amount
-    summation = 0
-    amount = 0
-
-    it = np.nditer(array, flags=['multi_index'])
-    while not it.finished:
-        y_index, x_index = it.multi_index
-
-        if x_sequence[0] <= x_index <= x_sequence[1] and y_sequence[0] <= y_index <= y_sequence[1]:
-            summation += it[0]
-            amount += 1
-
-        it.iternext()
-
-    return summation / amount
+    # 19.10.2026
+    # Instead of iterating over all the elements of the array and checking whether they are within the area, only the
+    # sub array of the area is sliced (the area indices are inclusive) and then averaged by numpy. The average is
+    # explicitly accumulated as float64, as the sum of an 8 bit image would overflow otherwise.
+    sub_array = array[y_sequence[0]:y_sequence[1] + 1, x_sequence[0]:x_sequence[1] + 1]
+    return np.mean(sub_array, dtype=np.float64)
 
 
 def threshold_sequencing(array, threshold):
@@ -53,33 +48,27 @@ def threshold_sequencing(array, threshold):
 
     Added 16.11.2018
 
+    Changed 19.10.2026
+    A sequence, that is still going on at the end of the array is now also returned, with the length of the array as
+    the end index
+
+    Changed 19.10.2026
+    The sequences are found with numpy instead of iterating over every element
+
     @param np.ndarray array:
     @param float threshold:
     @return:
     """
-    sequences = []
-
-    sequence_start = None
-    it = np.nditer(array, flags=['multi_index'])
-    while not it.finished:
-
-        if sequence_start is None:
-            # This means no value was bigger than the threshold yet, so no sequence has started
-            # We are only searching for a value bigger than the threshold.
-            if it[0] >= threshold:
-                sequence_start = it.multi_index[0]
-
-        else:
-            # This means we are in the middle of a sequence. When we find a single value
-            # that is smaller than the threshold, the sequence ends
-            if it[0] < threshold:
-                # Saving the sequence with the end being the current index
-                sequences.append((sequence_start, it.multi_index[0]))
-                sequence_start = None
-
-        it.iternext()
+    # 19.10.2026
+    # Instead of iterating every element, the sequences are found as the rising and falling edges of the boolean array
+    # of the elements above the threshold. Padding it with False on both ends makes sure, that every sequence has both
+    # edges, so a sequence, which is still going on at the end of the array ends with the length of the array.
+    above = np.asarray(array) >= threshold
+    edges = np.diff(above.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
 
-    return sequences
+    return [(int(start), int(end)) for start, end in zip(starts, ends)]
 
 
 def combinations_2d(iterable1, iterable2):
@@ -103,3 +92,580 @@ def combinations_2d(iterable1, iterable2):
             combinations.append((i, j))
 
     return combinations
+
+
+def areas_overlap(area1, area2):
+    """
+    Whether or not the two given areas overlap (or touch). The areas have to be tuples of the form
+    ( (axis1_start_index, axis1_end_index), (axis0_start_index, axis0_end_index) )
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param tuple area1:
+    :param tuple area2:
+    :return: bool
+    """
+    return (area1[0][0] <= area2[0][1] and area2[0][0] <= area1[0][1] and
+            area1[1][0] <= area2[1][1] and area2[1][0] <= area1[1][1])
+
+
+def merge_overlapping_areas(areas):
+    """
+    Given a list of areas, this function will combine all the areas, that overlap each other into one area, which spans
+    over both of them. This is repeated until there are no overlapping areas left. Returns the list of merged areas.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list areas:
+    :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+    """
+    merged_areas = list(areas)
+
+    # The amount of areas is usually very small, so the quadratic complexity of the pairwise checking is not a problem
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(merged_areas)):
+            for j in range(i + 1, len(merged_areas)):
+                if areas_overlap(merged_areas[i], merged_areas[j]):
+                    area_i = merged_areas[i]
+                    area_j = merged_areas.pop(j)
+                    merged_areas[i] = (
+                        (min(area_i[0][0], area_j[0][0]), max(area_i[0][1], area_j[0][1])),
+                        (min(area_i[1][0], area_j[1][0]), max(area_i[1][1], area_j[1][1]))
+                    )
+                    merged = True
+                    break
+            if merged:
+                break
+
+    return merged_areas
+
+
+def tile_ranges(length, tile_size, overlap=0):
+    """
+    Splits an axis of the given length into tiles of the given size, where two neighbouring tiles overlap by the given
+    amount of elements. Returns a list of tuples, each containing the start index and the (exclusive) end index of one
+    tile. The last tile may be smaller than the tile size.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param int length:      The length of the axis to split
+    :param int tile_size:   The length of a single tile
+    :param int overlap:     The amount of elements two neighbouring tiles share. Has to be smaller than the tile size
+    :return: List(Tuple(int, int))
+    """
+    if overlap >= tile_size:
+        raise ValueError("The overlap {} has to be smaller than the tile size {}".format(overlap, tile_size))
+
+    ranges = []
+    start = 0
+    while True:
+        end = min(start + tile_size, length)
+        ranges.append((start, end))
+        if end >= length:
+            break
+        start = end - overlap
+
+    return ranges
+
+
+def offset_areas(areas, x_offset, y_offset):
+    """
+    Moves all the given areas by the given offsets. This is used to transform the areas found within a part of an
+    image back into the coordinates of the whole image.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list areas:
+    :param int x_offset:    The offset along the axis 1 of the image (the width)
+    :param int y_offset:    The offset along the axis 0 of the image (the height)
+    :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+    """
+    return [
+        ((area[0][0] + x_offset, area[0][1] + x_offset), (area[1][0] + y_offset, area[1][1] + y_offset))
+        for area in areas
+    ]
+
+
+def block_mean(array, factor):
+    """
+    Downsamples the given 2 dimensional array by the given integer factor, where each element of the result is the
+    mean of a factor x factor block of the original array. If the shape is not a multiple of the factor, the blocks at
+    the bottom and right border are smaller and still averaged correctly.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The blocks are summed up in chunks of block rows, so that only a chunk and not the whole array is converted to
+    float
+
+    :param np.ndarray array:
+    :param int factor:
+    :return: np.ndarray
+    """
+    row_starts = np.arange(0, array.shape[0], factor)
+    column_starts = np.arange(0, array.shape[1], factor)
+
+    # The block sums are computed by first summing up the blocks of rows and then the blocks of columns of that result.
+    # reduceat converts its whole input to the type of the result, so this is done for chunks of the block rows
+    sums = np.empty((len(row_starts), len(column_starts)), np.float64)
+    step = max(1, 2**16 // max(1, array.shape[1] * factor))
+    for i in range(0, len(row_starts), step):
+        chunk = array[row_starts[i]:row_starts[i] + step * factor].astype(np.float64, copy=False)
+        chunk = np.add.reduceat(chunk, row_starts[i:i + step] - row_starts[i], axis=0)
+        sums[i:i + step] = np.add.reduceat(chunk, column_starts, axis=1)
+
+    row_counts = np.diff(np.append(row_starts, array.shape[0]))
+    column_counts = np.diff(np.append(column_starts, array.shape[1]))
+
+    return sums / np.outer(row_counts, column_counts)
+
+
+def image_pyramid(array, factor, levels):
+    """
+    Creates a list of increasingly downsampled versions of the given array. The first element is the original array
+    and each following element is the block mean of the previous one with the given factor.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:
+    :param int factor:  The downsampling factor between two levels
+    :param int levels:  The amount of downsampled levels
+    :return: List(np.ndarray)
+    """
+    pyramid = [array]
+    for i in range(levels):
+        pyramid.append(block_mean(pyramid[-1], factor))
+
+    return pyramid
+
+
+def neighbourhood(array):
+    """
+    Returns a list with the 8 neighbour arrays of the given 2 dimensional array. The i-th array contains for each
+    element the value of its i-th neighbour, where the neighbours are in clockwise order, starting with the upper one:
+    N, NE, E, SE, S, SW, W, NW. Neighbours outside of the array are 0.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:
+    :return: List(np.ndarray)
+    """
+    padded = np.pad(array, 1, mode='constant')
+    height, width = array.shape
+    offsets = [(-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1)]
+    return [padded[1 + i:1 + i + height, 1 + j:1 + j + width] for i, j in offsets]
+
+
+def crossing_numbers(mask):
+    """
+    Calculates the crossing number for every element of the given binary mask. The crossing number is the amount of
+    separate runs of set pixels in the circular 8 neighbourhood of a pixel. For a pixel of a skeleton a crossing number
+    of 1 means it is an end point, 2 means it is part of a line and 3 or more means it is a branch point.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray mask:
+    :return: np.ndarray
+    """
+    neighbours = [n.astype(np.int8) for n in neighbourhood(mask.astype(np.bool_))]
+    transitions = np.zeros(mask.shape, np.int8)
+    for i in range(8):
+        transitions += np.abs(neighbours[(i + 1) % 8] - neighbours[i])
+
+    return transitions // 2
+
+
+def skeletonize(mask):
+    """
+    Thins the given binary mask down to a skeleton with a width of one pixel, using the Zhang-Suen thinning algorithm.
+    Each sub iteration of the algorithm is computed for the whole array at once. Returns a boolean array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray mask: An array, where every non zero element belongs to the shape
+    :return: np.ndarray
+    """
+    skeleton = mask.astype(np.bool_)
+
+    changed = True
+    while changed:
+        changed = False
+        for step in range(2):
+            p2, p3, p4, p5, p6, p7, p8, p9 = [n.astype(np.uint8) for n in neighbourhood(skeleton)]
+            sequence = [p2, p3, p4, p5, p6, p7, p8, p9, p2]
+
+            # B is the amount of set neighbours and A the amount of 0 to 1 transitions in the circular neighbourhood
+            b = p2 + p3 + p4 + p5 + p6 + p7 + p8 + p9
+            a = np.zeros(skeleton.shape, np.uint8)
+            for i in range(8):
+                a += (sequence[i] == 0) & (sequence[i + 1] == 1)
+
+            if step == 0:
+                condition = (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+            else:
+                condition = (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+
+            removed = skeleton & (b >= 2) & (b <= 6) & (a == 1) & condition
+            if removed.any():
+                skeleton = skeleton & ~removed
+                changed = True
+
+    return skeleton
+
+
+def simplify_polyline(points, tolerance):
+    """
+    Simplifies the given polyline with the Ramer-Douglas-Peucker algorithm: Only the points, that deviate more than the
+    tolerance from the straight line between the retained points are kept. The first and last point are always kept.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray points:   The (n, 2) array of points
+    :param float tolerance:     The maximum distance a removed point is allowed to have from the simplified line
+    :return: np.ndarray
+    """
+    points = np.asarray(points)
+    if len(points) < 3 or tolerance <= 0:
+        return points
+
+    keep = np.zeros(len(points), np.bool_)
+    keep[0] = keep[-1] = True
+
+    stack = [(0, len(points) - 1)]
+    while stack:
+        start, end = stack.pop()
+        if end - start < 2:
+            continue
+
+        # The perpendicular distances of all the points in between to the line from the start to the end point
+        line = (points[end] - points[start]).astype(np.float64)
+        vectors = (points[start + 1:end] - points[start]).astype(np.float64)
+        line_length = math.sqrt(line[0] ** 2 + line[1] ** 2)
+        if line_length == 0:
+            distances = np.sqrt(np.sum(vectors ** 2, axis=1))
+        else:
+            distances = np.abs(line[0] * vectors[:, 1] - line[1] * vectors[:, 0]) / line_length
+
+        index = int(np.argmax(distances))
+        if distances[index] > tolerance:
+            index += start + 1
+            keep[index] = True
+            stack.append((start, index))
+            stack.append((index, end))
+
+    return points[keep]
+
+
+def integral_image(array, weights=None, dtype=np.float64):
+    """
+    Calculates the integral image (summed area table) of the given 2 dimensional array. The result has one more row and
+    column than the array, where the element [i, j] is the sum of all elements array[:i, :j]. With it the sum of any
+    rectangle of the array can be computed from just four elements (see "area_sums").
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    Added the "weights" parameter. The sums are accumulated in place, without a temporary array
+
+    Changed 19.10.2026
+    Added the "dtype" parameter. An int type is enough for the sums of int arrays and smaller than float64
+
+    :param np.ndarray array:
+    :param np.ndarray weights:  Optionally weights, which are broadcast against the array and multiplied with it,
+                                before the sums are taken. The product is written directly into the result, so no
+                                temporary array of the product is needed. DEFAULT is None
+    :param dtype:               The type of the result, which has to be able to hold the sum of the whole array.
+                                DEFAULT is float64
+    :return: np.ndarray
+    """
+    # 19.10.2026
+    # The values are first written into the result and then summed up in place. Accumulating directly from the array
+    # into the (non contiguous) part of the result made numpy create a temporary array of the same size
+    integral = np.zeros((array.shape[0] + 1, array.shape[1] + 1), dtype)
+    if weights is None:
+        integral[1:, 1:] = array
+    else:
+        np.multiply(array, weights, out=integral[1:, 1:], casting='unsafe')
+    # The type of the accumulator has to be given, otherwise the sums of small int types are accumulated in a
+    # temporary array of the platform int
+    np.cumsum(integral[1:, 1:], axis=0, out=integral[1:, 1:], dtype=integral.dtype)
+    np.cumsum(integral[1:, 1:], axis=1, out=integral[1:, 1:], dtype=integral.dtype)
+    return integral
+
+
+def integral_type(array):
+    """
+    Returns the smallest type, which can hold the integral image of the given array exactly: int32, if the sum of the
+    whole array fits, int64 for other int arrays and float64 otherwise.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:
+    :return: type
+    """
+    if np.issubdtype(array.dtype, np.bool_):
+        return np.int32 if array.size < 2**31 else np.int64
+    if not np.issubdtype(array.dtype, np.integer):
+        return np.float64
+    if np.min(array, initial=0) >= 0 and int(np.max(array, initial=0)) * array.size < 2**31:
+        return np.int32
+    return np.int64
+
+
+def areas_to_array(areas, shape):
+    """
+    Converts the given list of area tuples into an (n, 4) int array with the columns x_start, x_end, y_start, y_end.
+    The (inclusive) indices are clipped to the given shape of the image.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list areas:
+    :param tuple shape: The (height, width) of the image
+    :return: np.ndarray
+    """
+    if len(areas) == 0:
+        return np.zeros((0, 4), np.int64)
+
+    array = np.asarray(areas, np.int64).reshape((len(areas), 4))
+    array[:, 0:2] = np.clip(array[:, 0:2], 0, shape[1] - 1)
+    array[:, 2:4] = np.clip(array[:, 2:4], 0, shape[0] - 1)
+    return array
+
+
+def area_sums(integral, areas_array):
+    """
+    Calculates the sums of the elements within all the given areas at once, using the integral image of the array.
+    The areas have to be given as an (n, 4) array (see "areas_to_array"). Returns an array with one sum per area.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray integral:     The integral image of the array
+    :param np.ndarray areas_array:  The (n, 4) array of the inclusive area indices
+    :return: np.ndarray
+    """
+    x_start, x_end, y_start, y_end = areas_array.T
+    return (
+        integral[y_end + 1, x_end + 1] - integral[y_start, x_end + 1] -
+        integral[y_end + 1, x_start] + integral[y_start, x_start]
+    )
+
+
+def area_segments(starts, ends, lengths_from, lengths_to):
+    """
+    Enumerates the rows (or the columns) of all the given areas at once. The areas are given by the start and the
+    (exclusive) end along the enumerated axis and by the start and the end along the other axis. Returns a tuple of
+    the index of the area of each segment, the row (or column) of each segment, the start and the end of each segment
+    along the other axis and the offsets of the first segment of each area within these arrays.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray starts:       The first rows of the areas
+    :param np.ndarray ends:         The exclusive last rows of the areas
+    :param np.ndarray lengths_from: The first columns of the areas
+    :param np.ndarray lengths_to:   The exclusive last columns of the areas
+    :return: Tuple(np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray)
+    """
+    counts = ends - starts
+    offsets = np.concatenate([[0], np.cumsum(counts)[:-1]]).astype(np.int64)
+    area_indices = np.repeat(np.arange(len(starts)), counts)
+    positions = starts[area_indices] + np.arange(int(np.sum(counts))) - offsets[area_indices]
+    return area_indices, positions, lengths_from[area_indices], lengths_to[area_indices], offsets
+
+
+def segment_sums(integral, positions, starts, ends, axis):
+    """
+    Returns the sums of the given segments of single rows (axis 1) or single columns (axis 0) using the integral
+    image of the array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray integral:     The integral image of the array
+    :param np.ndarray positions:    The row (axis 1) or the column (axis 0) of each segment
+    :param np.ndarray starts:       The first index of each segment along the other axis
+    :param np.ndarray ends:         The exclusive last index of each segment along the other axis
+    :param int axis:
+    :return: np.ndarray
+    """
+    if axis == 1:
+        return (
+            integral[positions + 1, ends] - integral[positions, ends] -
+            integral[positions + 1, starts] + integral[positions, starts]
+        )
+    return (
+        integral[ends, positions + 1] - integral[ends, positions] -
+        integral[starts, positions + 1] + integral[starts, positions]
+    )
+
+
+def lit_extent(lit_counts, positions, offsets):
+    """
+    Returns the amount of rows (or columns) from the first to the last one, which contain lit pixels, for each area.
+    The segments of an area have to be consecutive and every area needs at least one segment.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray lit_counts:   The amount of lit pixels within each segment
+    :param np.ndarray positions:    The row or the column of each segment
+    :param np.ndarray offsets:      The offset of the first segment of each area
+    :return: np.ndarray
+    """
+    is_lit = lit_counts > 0
+    first = np.minimum.reduceat(np.where(is_lit, positions, np.iinfo(np.int64).max), offsets)
+    last = np.maximum.reduceat(np.where(is_lit, positions, -1), offsets)
+    return np.where(last >= 0, last - first + 1, 0).astype(np.float64)
+
+
+def area_features(array, areas, threshold=0):
+    """
+    Computes the features of all the given areas of the image array at once. The areas have exclusive ends, just like
+    the areas of the segmentation engines. The sums are computed with integral images, the maximum with a reduction of
+    the flat array over the rows of all the areas. Returns a dict, which contains one array with a value for each area
+    for every feature:
+    - width, height:            The size of the area as it is given by the area tuple
+    - aspect_ratio:             The width divided by the height
+    - fill_ratio:               The fraction of the pixels within the area, which exceed the threshold ("lit")
+    - intensity_sum:            The sum of all the grayscale values within the area
+    - intensity_max:            The maximum grayscale value within the area
+    - centroid_x, centroid_y:   The intensity weighted center of the area
+    - horizontal_extent,
+      vertical_extent:          The width and the height of the bounding box of the lit pixels within the area
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The intensity weighted coordinates are multiplied directly into their integral images, instead of creating a full
+    size 64 bit product first
+
+    Changed 19.10.2026
+    The areas are treated as having exclusive ends everywhere, the pixel count used to treat them as inclusive. The
+    maximum and the extents of the lit pixels are computed from the sums of the single rows and columns of all the
+    areas at once instead of a loop over the areas. The weighted coordinate sums are derived from these as well, so
+    only the integral images of the intensity and of the lit pixels are needed, in the smallest exact int type
+
+    :param np.ndarray array:    The (preprocessed) grayscale image
+    :param list areas:          The list of area tuples with exclusive ends
+    :param threshold:           The value a pixel has to exceed to count as lit. DEFAULT is 0
+    :return: dict
+    """
+    height, width = array.shape
+    areas_array = np.asarray(areas, np.int64).reshape((len(areas), 4))
+    x_start, x_end = np.clip(areas_array[:, 0], 0, width), np.clip(areas_array[:, 1], 0, width)
+    y_start, y_end = np.clip(areas_array[:, 2], 0, height), np.clip(areas_array[:, 3], 0, height)
+
+    area_width = (areas_array[:, 1] - areas_array[:, 0]).astype(np.float64)
+    area_height = (areas_array[:, 3] - areas_array[:, 2]).astype(np.float64)
+    count = len(areas_array)
+
+    intensity_sum = np.zeros(count, np.float64)
+    intensity_max = np.zeros(count, np.float64)
+    lit_sum = np.zeros(count, np.float64)
+    horizontal_extent = np.zeros(count, np.float64)
+    vertical_extent = np.zeros(count, np.float64)
+    centroid_x = (areas_array[:, 0] + areas_array[:, 1] - 1) / 2
+    centroid_y = (areas_array[:, 2] + areas_array[:, 3] - 1) / 2
+
+    # Only the areas, which contain pixels of the image, have segments
+    valid = (x_end > x_start) & (y_end > y_start)
+    if np.any(valid):
+        x_start, x_end, y_start, y_end = x_start[valid], x_end[valid], y_start[valid], y_end[valid]
+        row_areas, rows, row_starts, row_ends, row_offsets = area_segments(y_start, y_end, x_start, x_end)
+        column_areas, columns, column_starts, column_ends, column_offsets = area_segments(
+            x_start, x_end, y_start, y_end
+        )
+
+        integral = integral_image(array, dtype=integral_type(array))
+        row_sums = segment_sums(integral, rows, row_starts, row_ends, 1).astype(np.float64)
+        column_sums = segment_sums(integral, columns, column_starts, column_ends, 0).astype(np.float64)
+        del integral
+
+        lit = array > threshold
+        integral = integral_image(lit, dtype=integral_type(lit))
+        del lit
+        row_lit = segment_sums(integral, rows, row_starts, row_ends, 1)
+        column_lit = segment_sums(integral, columns, column_starts, column_ends, 0)
+        del integral
+
+        sums = np.add.reduceat(row_sums, row_offsets)
+        intensity_sum[valid] = sums
+        lit_sum[valid] = np.add.reduceat(row_lit, row_offsets)
+        vertical_extent[valid] = lit_extent(row_lit, rows, row_offsets)
+        horizontal_extent[valid] = lit_extent(column_lit, columns, column_offsets)
+
+        # The maximum of each row of each area is a reduction over the interleaved starts and ends of the rows within
+        # the flat array. An end at the very end of the array is moved to the last element, which is then added
+        flat = np.ravel(array)
+        indices = np.empty(2 * len(rows), np.int64)
+        indices[0::2] = rows * width + row_starts
+        indices[1::2] = np.minimum(rows * width + row_ends, flat.size - 1)
+        row_maxima = np.maximum.reduceat(flat, indices)[0::2]
+        row_maxima = np.where(rows * width + row_ends == flat.size, np.maximum(row_maxima, flat[-1]), row_maxima)
+        intensity_max[valid] = np.maximum.reduceat(row_maxima, row_offsets)
+
+        # The center of the area is used as the centroid for the areas, which do not contain any intensity at all
+        has_intensity = sums > 0
+        divisor = np.where(has_intensity, sums, 1)
+        centroid_x[valid] = np.where(
+            has_intensity,
+            np.add.reduceat(columns * column_sums, column_offsets) / divisor,
+            centroid_x[valid]
+        )
+        centroid_y[valid] = np.where(
+            has_intensity,
+            np.add.reduceat(rows * row_sums, row_offsets) / divisor,
+            centroid_y[valid]
+        )
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        aspect_ratio = area_width / area_height
+        fill_ratio = np.where(area_width * area_height > 0, lit_sum / (area_width * area_height), 0.0)
+
+    return {
+        'width':                area_width,
+        'height':               area_height,
+        'aspect_ratio':         aspect_ratio,
+        'fill_ratio':           fill_ratio,
+        'intensity_sum':        intensity_sum,
+        'intensity_max':        intensity_max,
+        'centroid_x':           centroid_x,
+        'centroid_y':           centroid_y,
+        'horizontal_extent':    horizontal_extent,
+        'vertical_extent':      vertical_extent
+    }
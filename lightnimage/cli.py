@@ -0,0 +1,304 @@
+# 19.10.2026
+# The "lightnimage" console command. The "detect" command runs the detection on all the frames of a folder or a raw
+# frame store (see the runner module), so that it can be run unattended on the recording servers. The "serve" command
+# starts the local detection service (see the service module). The "evaluate" command compares the accuracy, the speed
+# and the memory of the engines on annotated frames (see the evaluation module).
+import os
+import sys
+import json
+import argparse
+
+from lightnimage.runner import ENGINES, FolderFrameSource, RawFrameSource, run_batch
+from lightnimage.metrics import MetricsExporter
+from lightnimage.evaluation import DetectionPipeline, load_annotations, compare, format_reports
+
+
+def parse_shape(value):
+    """
+    Parses a frame shape given as "HEIGHTxWIDTH" into a tuple of ints
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param str value:
+    :return: Tuple(int, int)
+    """
+    try:
+        height, width = (int(part) for part in value.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError('The shape has to be given as HEIGHTxWIDTH, not "{}"'.format(value))
+    return height, width
+
+
+def create_parser():
+    """
+    Creates the argument parser of the console command
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :return: argparse.ArgumentParser
+    """
+    parser = argparse.ArgumentParser(prog='lightnimage', description='Detects lightning in recorded frames')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    detect = commands.add_parser('detect', help='Runs the detection on all the frames of a folder or a frame store')
+    detect.add_argument('source', help='The folder of the frames or, together with --shape, a raw frame store file')
+    detect.add_argument('-o', '--output', required=True, help='The path of the detection log to write')
+    detect.add_argument('--pattern', default='*.jpg', help='The file name pattern of the frames in a folder')
+    detect.add_argument('--shape', type=parse_shape, help='The HEIGHTxWIDTH of the frames of a raw frame store')
+    detect.add_argument('--fps', type=float, default=1.0, help='The frame rate of a raw frame store')
+    detect.add_argument('--workers', type=int, default=1, help='The amount of worker processes, 0 for all CPUs')
+    detect.add_argument('--engine', choices=sorted(ENGINES), default='simple', help='The segmentation engine')
+    detect.add_argument('--engine-config', type=json.loads, default={}, help='The engine config as a JSON object')
+    detect.add_argument('--reference', choices=['auto', 'previous'], default='auto', help='The reference selection')
+    detect.add_argument('--window', type=int, default=10, help='The window of the automatic reference selection')
+    detect.add_argument('--no-classification', action='store_true', help='Do not classify the areas')
+    detect.add_argument('--progress-interval', type=float, default=1.0, help='The seconds between progress reports')
+    detect.add_argument('--quiet', action='store_true', help='Do not report the progress')
+    detect.add_argument('--summary', help='The path of a JSON file to save the summary in')
+    detect.add_argument('--checkpoint-interval', type=float, default=30.0, help='The seconds between checkpoints')
+    detect.add_argument('--restart', action='store_true', help='Discard an earlier run in the log instead of resuming')
+    detect.add_argument('--retry-failed', action='store_true', help='Process the failed frames again')
+
+    serve = commands.add_parser('serve', help='Starts the local detection service')
+    serve.add_argument('--host', default='127.0.0.1', help='The host to listen on')
+    serve.add_argument('--port', type=int, default=8750, help='The TCP port to listen on')
+    serve.add_argument('--socket', help='The path of a Unix socket to listen on instead of the TCP port')
+    serve.add_argument('--max-batch-size', type=int, default=8, help='The maximum amount of frames in a batch')
+    serve.add_argument('--max-wait', type=float, default=0.005, help='The seconds to wait for the frames of a batch')
+    serve.add_argument('--workers', type=int, default=2, help='The amount of worker threads')
+    serve.add_argument('--engine', choices=sorted(ENGINES), default='simple', help='The segmentation engine')
+    serve.add_argument('--engine-config', type=json.loads, default={}, help='The engine config as a JSON object')
+    serve.add_argument('--no-classification', action='store_true', help='Do not classify the areas')
+
+    evaluate = commands.add_parser('evaluate', help='Evaluates the accuracy, speed and memory of the engines')
+    evaluate.add_argument('annotations', help='The path of the annotation file of the frames')
+    evaluate.add_argument('--engine', choices=sorted(ENGINES), action='append', help='An engine to evaluate, '
+                          'can be given several times. DEFAULT are all engines')
+    evaluate.add_argument('--grouping', action='store_true', help='Also evaluate each engine followed by the grouping')
+    evaluate.add_argument('--iou-threshold', type=float, default=0.5, help='The minimal IoU of a detected area')
+    evaluate.add_argument('--repeat', type=int, default=3, help='The amount of runs for the runtime of each frame')
+
+    for command in (detect, serve):
+        command.add_argument('--exclusion', type=json.loads, help='The excluded regions as a JSON list of '
+                             '[[x_start, x_end], [y_start, y_end]] rectangles with exclusive ends, null for the '
+                             'border. DEFAULT are the aragats overlays')
+        command.add_argument('--no-exclusion', action='store_true', help='Do not exclude any regions')
+        command.add_argument('--crop', action='store_true', help='Only process the region left after the exclusion')
+        command.add_argument('--metrics-file', help='The path of a file to write the Prometheus metrics into')
+        command.add_argument('--metrics-snapshots', help='The path of a file to append the JSON metric snapshots to')
+        command.add_argument('--metrics-interval', type=float, default=10.0, help='The seconds between the exports')
+
+    return parser
+
+
+def format_progress(summary):
+    """
+    Formats the summary dict of a running batch as a single progress line
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param dict summary:
+    :return: str
+    """
+    return '{finished}/{frames} frames  {fps:.1f} frames/s  latency p50 {p50:.1f} ms p99 {p99:.1f} ms  ' \
+           'skipped {skipped}  detections {detections}'.format(
+                finished=summary['finished'],
+                frames=summary['frames'],
+                fps=summary['frames_per_second'],
+                p50=summary['latency_ms']['p50'],
+                p99=summary['latency_ms']['p99'],
+                skipped=sum(summary['skipped'].values()),
+                detections=summary['detections']
+           )
+
+
+def detection_config(arguments):
+    """
+    Returns the config dict of the FrameDetectionEngine for the parsed arguments of the "detect" and the "serve"
+    command
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param argparse.Namespace arguments:
+    :return: dict
+    """
+    config = {
+        'engine':           arguments.engine,
+        'engine_config':    arguments.engine_config,
+        'crop':             arguments.crop,
+        'classification':   not arguments.no_classification
+    }
+    if arguments.no_exclusion:
+        config['exclusion'] = None
+    elif arguments.exclusion is not None:
+        config['exclusion'] = arguments.exclusion
+    return config
+
+
+def detect(arguments):
+    """
+    Runs the "detect" command with the parsed arguments. Returns the summary dict of the batch run.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param argparse.Namespace arguments:
+    :return: dict
+    """
+    if arguments.shape is not None:
+        source = RawFrameSource(arguments.source, arguments.shape, fps=arguments.fps)
+    elif os.path.isdir(arguments.source):
+        source = FolderFrameSource(arguments.source, arguments.pattern)
+    else:
+        raise ValueError('The source "{}" is neither a folder nor a frame store with --shape'.format(arguments.source))
+
+    def progress(summary):
+        sys.stderr.write('\r' + format_progress(summary))
+        sys.stderr.flush()
+
+    summary = run_batch(
+        source,
+        arguments.output,
+        config=detection_config(arguments),
+        reference=arguments.reference,
+        window=arguments.window,
+        workers=arguments.workers or None,
+        progress=None if arguments.quiet else progress,
+        progress_interval=arguments.progress_interval,
+        checkpoint_interval=arguments.checkpoint_interval,
+        restart=arguments.restart,
+        retry_failed=arguments.retry_failed
+    )
+    if not arguments.quiet:
+        sys.stderr.write('\n')
+
+    if arguments.summary is not None:
+        with open(arguments.summary, mode='w') as file:
+            json.dump(summary, file, indent=4)
+
+    return summary
+
+
+def serve(arguments):
+    """
+    Runs the "serve" command with the parsed arguments until it is interrupted. Returns the batching statistics.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param argparse.Namespace arguments:
+    :return: dict
+    """
+    # The service is only imported, when it is used, because it imports the http modules
+    from lightnimage.service import DetectionService, create_server
+
+    service = DetectionService({
+        'max_batch_size':   arguments.max_batch_size,
+        'max_wait':         arguments.max_wait,
+        'workers':          arguments.workers,
+        'detection':        detection_config(arguments)
+    })
+    address = arguments.socket or (arguments.host, arguments.port)
+    server = create_server(service, address)
+    sys.stderr.write('lightnimage: serving on {}\n'.format(address))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+        if arguments.socket is not None and os.path.exists(arguments.socket):
+            os.remove(arguments.socket)
+
+    return service.detector.statistics()
+
+
+def evaluate(arguments):
+    """
+    Runs the "evaluate" command with the parsed arguments. Writes the table of the reports and returns the reports
+    without the results of the single frames.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param argparse.Namespace arguments:
+    :return: dict
+    """
+    pipelines = {}
+    for engine in arguments.engine or sorted(ENGINES):
+        pipelines[engine] = DetectionPipeline({'detection': {'engine': engine, 'classification': False}})
+        if arguments.grouping:
+            pipelines[engine + '+grouping'] = DetectionPipeline({
+                'detection':    {'engine': engine, 'classification': False},
+                'grouping':     {}
+            })
+
+    reports = compare(
+        pipelines,
+        load_annotations(arguments.annotations),
+        threshold=arguments.iou_threshold,
+        repeat=arguments.repeat
+    )
+    sys.stderr.write(format_reports(reports) + '\n')
+
+    return {
+        name: {key: value for key, value in report.items() if key != 'results'}
+        for name, report in reports.items()
+    }
+
+
+def main(argv=None):
+    """
+    The entry point of the console command. Prints the summary of the command as JSON. Returns the exit code.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list argv:   The list of arguments. DEFAULT is None for the arguments of the command line
+    :return: int
+    """
+    arguments = create_parser().parse_args(argv)
+    command = {'detect': detect, 'serve': serve, 'evaluate': evaluate}[arguments.command]
+
+    exporter = None
+    # 19.10.2026
+    # The "evaluate" command has no metrics options
+    metrics_file = getattr(arguments, 'metrics_file', None)
+    metrics_snapshots = getattr(arguments, 'metrics_snapshots', None)
+    if metrics_file is not None or metrics_snapshots is not None:
+        exporter = MetricsExporter(
+            prometheus_path=metrics_file,
+            snapshot_path=metrics_snapshots,
+            interval=arguments.metrics_interval
+        )
+
+    try:
+        summary = command(arguments)
+    except (OSError, ValueError) as error:
+        sys.stderr.write('lightnimage: error: {}\n'.format(error))
+        return 1
+    finally:
+        if exporter is not None:
+            exporter.stop()
+
+    print(json.dumps(summary, indent=4))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
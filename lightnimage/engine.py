@@ -3,15 +3,45 @@
 # Python 2 compatibility for the print function syntax
 from __future__ import print_function
 import math
+import copy
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 # third party
 import numpy as np
-from pprint import pprint
 
 # local package
 from lightnimage.image import LightningImage
-from lightnimage.calculate import *
+from lightnimage.model import L2Vector
+from lightnimage.kernel import get_backend
+from lightnimage.mask import RunLengthMask
+from lightnimage.stats import ExponentialFrameStatistics
+# 19.10.2026
+# Only the needed functions are imported explicitly. This module is part of the core of the package, which only depends
+# on numpy, so that the worker processes, which only do the detection start up fast
+from lightnimage.calculate import average_2d, threshold_sequencing, combinations_2d
+from lightnimage.calculate import merge_overlapping_areas, offset_areas, tile_ranges, image_pyramid
+from lightnimage.calculate import skeletonize, crossing_numbers, simplify_polyline, area_features
+from lightnimage.calculate import integral_image, integral_type, area_sums
+
+
+def area_average(lightning_image, area):
+    """
+    Returns the average value within the given area (with inclusive indices) of either a LightningImage or a
+    RunLengthMask.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param lightning_image: Either a LightningImage or a RunLengthMask
+    :param area:
+    :return: float
+    """
+    if isinstance(lightning_image, RunLengthMask):
+        return lightning_image.average(area)
+
+    return average_2d(lightning_image.array, area)
 
 
 # ABSTRACT BASE CLASSES #
@@ -19,35 +49,45 @@ from lightnimage.calculate import *
 
 class AbstractVectorisationEngine:
     """
+    A vectorisation engine turns the lightning within an image into a compact vector representation (L2Vector)
 
     CHANGELOG
 
     Added 05.11.2018
 
+    Changed 19.10.2026
+    The engine is now created with a config dict and called with the image, like all the other engines
     """
 
-    def __init__(self, lightning_image):
+    def __init__(self, config):
         """
 
         CHANGELOG
 
         Added 05.11.2018
 
-        @param LightningImage lightning_image:
+        Changed 19.10.2026
+        The constructor now accepts the config dict instead of the image
+
+        @param dict config:
         """
-        self.lightning_image = lightning_image
-        self.array = self.lightning_image.array
+        pass
 
-    def __call__(self, *args, **kwargs):
+    def __call__(self, lightning_image, area=None):
         """
+        The engine gets called on a single lightning image object and returns the L2Vector of the lightning. The
+        optional area restricts the vectorisation to this part of the image.
 
         CHANGELOG
 
         Added 05.11.2018
 
-        @param args:
-        @param kwargs:
-        @return:
+        Changed 19.10.2026
+        Defined the parameters
+
+        @param LightningImage lightning_image:
+        @param area:
+        @return: L2Vector
         """
         raise NotImplementedError()
 
@@ -128,12 +168,20 @@ class SimpleAreaSegmentationEngine(AbstractAreaSegmentationEngine):
 
         Added 16.11.2018
 
+        Changed 19.10.2026
+        The engine also accepts a RunLengthMask instead of the image
+
         @param LightningImage lightning_image:
         @return: List(Tuple())
         """
         # A copy of the image object is being made, so transformations can be used without disturbing the original
         # image
-        self.current = LightningImage(lightning_image)
+        # 19.10.2026
+        # A run length mask is never modified, so it does not have to be copied (and it does not have a dense array)
+        if isinstance(lightning_image, RunLengthMask):
+            self.current = lightning_image
+        else:
+            self.current = LightningImage(lightning_image)
 
         # Calculating the row and column sums of the grayscale values
         self.x_sums = self.current.row_sum()
@@ -161,7 +209,7 @@ class SimpleAreaSegmentationEngine(AbstractAreaSegmentationEngine):
             result = []
             for area in areas:
                 # Calculating the average within these areas and only using these that contain a high enough value
-                av = average_2d(self.current.array, area)
+                av = area_average(self.current, area)
                 # print("Checking {} with average {}".format(str(area), av))
                 if (av / 255) >= self.config['check_threshold']:
                     result.append(area)
@@ -201,6 +249,9 @@ class CustomSequenceAreaSegmentationEngine(AbstractAreaSegmentationEngine):
 
         Added 06.12.2018
 
+        Changed 19.10.2026
+        The engine also accepts a RunLengthMask instead of the image
+
         :param lightning_image:
         :return:
         """
@@ -223,7 +274,7 @@ class CustomSequenceAreaSegmentationEngine(AbstractAreaSegmentationEngine):
             result = []
             for area in areas:
                 # Calculating the average within these areas and only using these that contain a high enough value
-                av = average_2d(lightning_image.array, area)
+                av = area_average(lightning_image, area)
                 # print("Checking {} with average {}".format(str(area), av))
                 if (av / 255) >= self.config['check_threshold']:
                     result.append(area)
@@ -238,53 +289,636 @@ class CustomSequenceAreaSegmentationEngine(AbstractAreaSegmentationEngine):
 
         Added 06.12.2018
 
+        Changed 19.10.2026
+        The predicates also work with arrays, so they are evaluated for the whole array at once
+
         :param array:
         :return:
         """
         array_max = np.amax(array)
         return CustomSequenceAreaSegmentationEngine.sequence_function_generator(
             lambda i, v, a: v >= array_max * 0.3,
-            lambda i, v, a: v < array_max * 0.3
+            lambda i, v, a: v < array_max * 0.3,
+            vectorized=True
         )(array)
 
     @staticmethod
-    def sequence_function_generator(start_filter_function, stop_filter_function):
+    def sequence_function_generator(start_filter_function, stop_filter_function, backend=None, vectorized=False):
         """
         CHANGELOG
 
         Added 06.12.2018
 
-        :param start_filter_function:
-        :param stop_filter_function:
+        Changed 19.10.2026
+        A sequence, that is still going on at the end of the array is now also returned
+
+        Changed 19.10.2026
+        The scan over the array is done by a kernel backend, which compiles the loop together with the filter functions
+        if numba is used. Filter functions, which also work with arrays can be evaluated for the whole array at once
+        with the vectorized flag.
+
+        :param start_filter_function:   A function with the parameters index, value and the whole array
+        :param stop_filter_function:    A function with the parameters index, value and the whole array
+        :param backend:                 The name of the kernel backend. DEFAULT is None for the default backend
+        :param vectorized:              Whether the filter functions also work with arrays of indices and values
         :return:
         """
 
         def sequence_function(array):
-            sequences = []
+            return get_backend(backend).sequence_scan(start_filter_function, stop_filter_function, array, vectorized)
 
-            sequence_start = None
-            it = np.nditer(array, flags=['multi_index'])
-            while not it.finished:
+        return sequence_function
 
-                if sequence_start is None:
-                    # This means no value was bigger than the threshold yet, so no sequence has started
-                    # We are only searching for a value bigger than the threshold.
-                    if start_filter_function(it.multi_index[0], it[0], array):
-                        sequence_start = it.multi_index[0]
 
-                else:
-                    # This means we are in the middle of a sequence. When we find a single value
-                    # that is smaller than the threshold, the sequence ends
-                    if stop_filter_function(it.multi_index[0], it[0], array):
-                        # Saving the sequence with the end being the current index
-                        sequences.append((sequence_start, it.multi_index[0]))
-                        sequence_start = None
+class TrackingAreaSegmentationEngine(AbstractAreaSegmentationEngine):
+    """
+    The problem:
+    A lightning usually persists over a few consecutive frames of a sequence, but every frame is still being segmented
+    over the whole image from scratch.
 
-                it.iternext()
+    This engine wraps another segmentation engine and remembers the areas found in the previous frame. For the next
+    frame only the regions of interest around these previous areas (expanded by a margin) are being segmented. A full
+    frame search is only done periodically, when there are no previous areas or when the triage signal - the amount of
+    signal OUTSIDE of the regions of interest - indicates, that there is new activity somewhere else in the frame.
 
-            return sequences
+    The engine is stateful, so one engine object should be used for exactly one sequence of frames. The "reset" method
+    can be used to start a new sequence.
 
-        return sequence_function
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'engine':               None,
+        'margin':               20,
+        'full_frame_interval':  10,
+        'activity_threshold':   0.001,
+        'triage_function':      lambda lightning_image, rois: TrackingAreaSegmentationEngine.outside_activity(
+            lightning_image,
+            rois
+        )
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - engine:               The segmentation engine object, which is used to actually find the areas, either within
+                                the regions of interest or on the full frame. DEFAULT is None, which will create a
+                                SimpleAreaSegmentationEngine with the default config.
+        - margin:               The int amount of pixels, by which the previous areas are being expanded on every side
+                                to form the regions of interest for the current frame. DEFAULT is 20
+        - full_frame_interval:  The int amount of frames after which a full frame search is forced, even if the triage
+                                does not indicate any new activity. DEFAULT is 10
+        - activity_threshold:   A float threshold for the triage signal. If the triage signal exceeds it, a full frame
+                                search is done. DEFAULT is 0.001
+        - triage_function:      A callable, which gets the lightning image and the list of regions of interest and has
+                                to return a float signal of how much new activity is outside of these regions. DEFAULT
+                                is the "outside_activity" function
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        AbstractAreaSegmentationEngine.__init__(self, config)
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        if self.config['engine'] is None:
+            self.config['engine'] = SimpleAreaSegmentationEngine({})
+
+        self.previous_areas = []
+        self.frames_since_full_search = 0
+        # This is either "full" or "roi" and describes what kind of search was done for the last frame
+        self.mode = None
+
+    def __call__(self, lightning_image):
+        """
+        Returns the list of areas of the given lightning image, searching only the regions of interest around the areas
+        of the previous frame if possible.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        rois = self.regions_of_interest(lightning_image)
+
+        if self.is_full_search_needed(lightning_image, rois):
+            self.mode = 'full'
+            self.frames_since_full_search = 0
+            areas = self.config['engine'](lightning_image)
+        else:
+            self.mode = 'roi'
+            self.frames_since_full_search += 1
+            areas = []
+            for roi in rois:
+                areas += self.segment_region(lightning_image, roi)
+            # The regions of interest are merged beforehand, but an area can still be found at the same position
+            # through two different regions, which is why the duplicates are removed
+            areas = list(set(areas))
+
+        self.previous_areas = areas
+        return areas
+
+    def reset(self):
+        """
+        Forgets all the areas of the previous frame, so that the next frame is searched completely
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.previous_areas = []
+        self.frames_since_full_search = 0
+        self.mode = None
+
+    def is_full_search_needed(self, lightning_image, rois):
+        """
+        Decides whether the whole frame has to be searched instead of just the given regions of interest.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param list rois:
+        :return: bool
+        """
+        if len(rois) == 0:
+            return True
+
+        if self.frames_since_full_search + 1 >= self.config['full_frame_interval']:
+            return True
+
+        activity = self.config['triage_function'](lightning_image, rois)
+        return activity > self.config['activity_threshold']
+
+    def regions_of_interest(self, lightning_image):
+        """
+        Computes the list of regions of interest from the areas of the previous frame. Each area is expanded by the
+        margin and clipped to the image. Overlapping regions are merged into one, so that no pixel is being segmented
+        twice.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        margin = self.config['margin']
+        rois = []
+        for area in self.previous_areas:
+            roi = (
+                (max(0, area[0][0] - margin), min(lightning_image.width - 1, area[0][1] + margin)),
+                (max(0, area[1][0] - margin), min(lightning_image.height - 1, area[1][1] + margin))
+            )
+            rois.append(roi)
+
+        # Overlapping regions are merged, so that no pixel is being segmented twice
+        return merge_overlapping_areas(rois)
+
+    def segment_region(self, lightning_image, roi):
+        """
+        Runs the wrapped segmentation engine only on the part of the image described by the given region of interest
+        and returns the found areas in the coordinates of the whole image.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param Tuple(Tuple(int, int), Tuple(int, int)) roi:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        (x_start, x_end), (y_start, y_end) = roi
+        region_image = LightningImage(lightning_image.array[y_start:y_end + 1, x_start:x_end + 1], copy=False)
+
+        return offset_areas(self.config['engine'](region_image), x_start, y_start)
+
+    @staticmethod
+    def outside_activity(lightning_image, rois):
+        """
+        The default triage function. Calculates the fraction of the total possible signal of the image, that is
+        OUTSIDE of the given regions of interest. For a binary (preprocessed) image this is the fraction of white pixels
+        not covered by any region.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param list rois:
+        :return: float
+        """
+        covered = np.zeros(lightning_image.array.shape, np.bool_)
+        for (x_start, x_end), (y_start, y_end) in rois:
+            covered[y_start:y_end + 1, x_start:x_end + 1] = True
+
+        outside_sum = np.sum(lightning_image.array[~covered], dtype=np.float64)
+        return outside_sum / (255 * lightning_image.array.size)
+
+
+class TiledAreaSegmentationEngine(AbstractAreaSegmentationEngine):
+    """
+    The problem:
+    All the other engines assume, that the whole frame is one array in memory. For the very high resolution images of
+    all sky cameras this exhausts the memory of the worker processes.
+
+    This engine splits the image into overlapping tiles and runs another segmentation engine on each tile separately.
+    The tiles are only views on the original array, so for a memory mapped image (see "LightningImage.from_memmap")
+    only the tile, that is currently being processed is loaded into memory. The areas of all the tiles are then
+    transformed back into the coordinates of the whole image and the areas, that overlap across the tile boundaries are
+    merged into one. The tiles can optionally be processed in parallel by multiple threads.
+
+    Note, that the wrapped engine only ever sees a single tile, so any thresholds it derives from the image statistics
+    are local to the tile.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'engine':       None,
+        'tile_size':    512,
+        'overlap':      32,
+        'workers':      1
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - engine:       The segmentation engine object, which is used on each tile. DEFAULT is None, which will create
+                        a SimpleAreaSegmentationEngine with the default config.
+        - tile_size:    The int edge length of the square tiles in pixels. DEFAULT is 512
+        - overlap:      The int amount of pixels two neighbouring tiles share. A lightning crossing a tile boundary is
+                        thus found in both tiles and the two parts are merged. DEFAULT is 32
+        - workers:      The int amount of threads used to process the tiles in parallel. DEFAULT is 1, which processes
+                        the tiles one after another
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        AbstractAreaSegmentationEngine.__init__(self, config)
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        if self.config['engine'] is None:
+            self.config['engine'] = SimpleAreaSegmentationEngine({})
+
+    def __call__(self, lightning_image):
+        """
+        Returns the list of areas of the whole image, by segmenting each tile separately.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        tiles = self.tiles(lightning_image)
+
+        if self.config['workers'] > 1:
+            with ThreadPoolExecutor(max_workers=self.config['workers']) as executor:
+                tile_areas = list(executor.map(lambda tile: self.segment_tile(lightning_image, tile, True), tiles))
+        else:
+            tile_areas = [self.segment_tile(lightning_image, tile) for tile in tiles]
+
+        areas = []
+        for _areas in tile_areas:
+            areas += _areas
+
+        # A lightning, which crosses the boundary between two tiles is found as two separate areas, which both reach
+        # into the overlap of the tiles. These are combined into one again.
+        return merge_overlapping_areas(areas)
+
+    def tiles(self, lightning_image):
+        """
+        Returns a list of all the tiles of the given image. The tiles are described as areas, with the end indices
+        being exclusive.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        x_ranges = tile_ranges(lightning_image.width, self.config['tile_size'], self.config['overlap'])
+        y_ranges = tile_ranges(lightning_image.height, self.config['tile_size'], self.config['overlap'])
+        return combinations_2d(x_ranges, y_ranges)
+
+    def segment_tile(self, lightning_image, tile, is_parallel=False):
+        """
+        Runs the wrapped engine on the given tile of the image and returns the areas in the coordinates of the whole
+        image.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param tile:                The area of the tile with exclusive end indices
+        :param bool is_parallel:    Whether the tile is processed in a thread. In this case a shallow copy of the
+                                    wrapped engine is used, because the engines store intermediate results as attributes
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        (x_start, x_end), (y_start, y_end) = tile
+        # The tile is only a view, so that no part of the image is copied, that is not needed for the tile
+        tile_image = LightningImage(lightning_image.array[y_start:y_end, x_start:x_end], copy=False)
+
+        engine = copy.copy(self.config['engine']) if is_parallel else self.config['engine']
+
+        return offset_areas(engine(tile_image), x_start, y_start)
+
+
+class MultiScaleAreaSegmentationEngine(AbstractAreaSegmentationEngine):
+    """
+    The problem:
+    Segmenting the image in full resolution is mostly wasted, because most of the frame does not contain anything.
+
+    This engine builds a small image pyramid, by downsampling the image multiple times with block means. The candidate
+    areas are found on the coarsest level using another segmentation engine. These areas are then refined level by
+    level: Only the (slightly expanded) regions of the areas of the previous level are being segmented in the next
+    higher resolution, until the areas are found in the full resolution image. Thus the cost of the detection scales
+    with the size of the lit parts of the image rather than the size of the whole frame.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'engine':   None,
+        'factor':   4,
+        'levels':   2,
+        'margin':   1
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - engine:   The segmentation engine object, which is used on every level of the pyramid. DEFAULT is None, which
+                    will create a SimpleAreaSegmentationEngine with the default config.
+        - factor:   The int downsampling factor between two levels of the pyramid. DEFAULT is 4
+        - levels:   The int amount of downsampled levels. DEFAULT is 2, which means the candidates are searched in an
+                    image, that is 16 times smaller along each axis (for the default factor)
+        - margin:   The int amount of pixels of the coarser level, by which an area is expanded on each side before it
+                    is refined on the next level. DEFAULT is 1
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        AbstractAreaSegmentationEngine.__init__(self, config)
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        if self.config['engine'] is None:
+            self.config['engine'] = SimpleAreaSegmentationEngine({})
+
+    def __call__(self, lightning_image):
+        """
+        Returns the list of areas in full resolution.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        pyramid = image_pyramid(lightning_image.array, self.config['factor'], self.config['levels'])
+
+        # Finding the candidates on the coarsest level
+        areas = self.config['engine'](LightningImage(pyramid[-1], copy=False))
+
+        # Then going up the pyramid, only looking at the regions of the previous areas
+        for array in reversed(pyramid[:-1]):
+            regions = merge_overlapping_areas([self.scale_area(area, array.shape) for area in areas])
+
+            areas = []
+            for region in regions:
+                areas += self.segment_region(array, region)
+
+        return areas
+
+    def scale_area(self, area, shape):
+        """
+        Scales the given area of a coarse level up to the next higher resolution level with the given shape, while
+        expanding it by the margin and clipping it to the array.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param area:
+        :param tuple shape: The shape of the array of the higher resolution level
+        :return: Tuple(Tuple(int, int), Tuple(int, int))
+        """
+        factor = self.config['factor']
+        margin = self.config['margin']
+        return (
+            (max(0, (area[0][0] - margin) * factor), min(shape[1] - 1, (area[0][1] + margin + 1) * factor - 1)),
+            (max(0, (area[1][0] - margin) * factor), min(shape[0] - 1, (area[1][1] + margin + 1) * factor - 1))
+        )
+
+    def segment_region(self, array, region):
+        """
+        Runs the wrapped engine only on the given region of the given array and returns the found areas in the
+        coordinates of the whole array.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :param region:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        (x_start, x_end), (y_start, y_end) = region
+        region_image = LightningImage(array[y_start:y_end + 1, x_start:x_end + 1], copy=False)
+        return offset_areas(self.config['engine'](region_image), x_start, y_start)
+
+
+class XYCutAreaSegmentationEngine(AbstractAreaSegmentationEngine):
+    """
+    The problem:
+    The SimpleAreaSegmentationEngine only projects the whole image onto the two axes once. If two lightnings share some
+    rows or columns, all the combinations of their sequences become candidate areas, including phantom areas, where
+    there is nothing at all. All these candidates have to be checked afterwards.
+
+    This engine cuts the image recursively instead (the "XY cut"): The region is projected onto the x axis and split
+    into the sequences of this projection. Each of these parts is then projected onto the y axis and split again and so
+    on, until the projections of a region are contiguous in both directions. So every resulting area is tightly
+    fitted around a group of lit pixels, which can not be separated by a horizontal or vertical cut.
+    The projections of the regions are computed from the integral image of the whole frame, so each projection only
+    costs as much as the length of the region and no pixels have to be summed up again for the deeper levels.
+
+    The areas have the same format as the areas of the SimpleAreaSegmentationEngine: The end is the index after the
+    last lit row or column.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'threshold':        1.0,
+        'max_depth':        32,
+        'checking':         True,
+        'check_threshold':  0.03
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - threshold:        The float sum, which a row or column within a region has to reach to count as lit. DEFAULT
+                            is 1.0, which means any lit pixel for a binary image
+        - max_depth:        The int maximum amount of cuts in a row. DEFAULT is 32
+        - checking:         boolean flag of whether or not to check the average of the resulting areas
+        - check_threshold:  A float threshold value relative to 255 the average of an area has to have to qualify as a
+                            valid solution. DEFAULT is 0.03
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        AbstractAreaSegmentationEngine.__init__(self, config)
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        self.integral = None
+
+    def __call__(self, lightning_image):
+        """
+        Returns the list of the areas.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The integral image has the smallest exact type (see "integral_type") instead of float64
+
+        :param LightningImage lightning_image:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        self.integral = integral_image(lightning_image.array, dtype=integral_type(lightning_image.array))
+        height, width = lightning_image.array.shape
+
+        areas = self.cut(((0, width), (0, height)), 0)
+
+        if self.config['checking'] and len(areas) != 0:
+            # The areas have exclusive ends, but "area_sums" expects inclusive indices
+            areas_array = np.array(areas, np.int64).reshape(len(areas), 4) - np.array([0, 1, 0, 1])
+            sizes = (areas_array[:, 1] - areas_array[:, 0] + 1) * (areas_array[:, 3] - areas_array[:, 2] + 1)
+            averages = area_sums(self.integral, areas_array) / sizes
+            areas = [area for area, average in zip(areas, averages) if average / 255 >= self.config['check_threshold']]
+
+        return areas
+
+    def projection(self, region, axis):
+        """
+        Returns the sums of the columns (axis 0, the projection onto the x axis) or the rows (axis 1) of the given
+        region, computed from the integral image.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param region:      The region tuple ((x_start, x_end), (y_start, y_end)) with exclusive ends
+        :param int axis:    0 for the column sums and 1 for the row sums
+        :return: np.ndarray
+        """
+        (x_start, x_end), (y_start, y_end) = region
+        if axis == 0:
+            strip = self.integral[y_end, x_start:x_end + 1] - self.integral[y_start, x_start:x_end + 1]
+        else:
+            strip = self.integral[y_start:y_end + 1, x_end] - self.integral[y_start:y_end + 1, x_start]
+        return np.diff(strip)
+
+    def sequences(self, region, axis):
+        """
+        Returns the sequences of the lit columns (axis 0) or rows (axis 1) of the given region in the coordinates of the
+        whole image.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param region:      The region tuple ((x_start, x_end), (y_start, y_end)) with exclusive ends
+        :param int axis:    0 for the sequences along the x axis and 1 for the y axis
+        :return: List(Tuple(int, int))
+        """
+        offset = region[axis][0]
+        sequences = threshold_sequencing(self.projection(region, axis), self.config['threshold'])
+        return [(start + offset, end + offset) for start, end in sequences]
+
+    def cut(self, region, depth):
+        """
+        Recursively cuts the given region into the areas, whose projections are contiguous.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param region:      The region tuple ((x_start, x_end), (y_start, y_end)) with exclusive ends
+        :param int depth:   The amount of cuts so far
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        y_start, y_end = region[1]
+        x_sequences = self.sequences(region, 0)
+        if len(x_sequences) == 0:
+            return []
+
+        # If the region falls apart along the x axis, each of the parts is cut along the y axis in the next step
+        if len(x_sequences) > 1 and depth < self.config['max_depth']:
+            areas = []
+            for x_sequence in x_sequences:
+                areas += self.cut((x_sequence, (y_start, y_end)), depth + 1)
+            return areas
+
+        region = (x_sequences[0], (y_start, y_end))
+        y_sequences = self.sequences(region, 1)
+        if len(y_sequences) == 0:
+            return []
+
+        # The region is contiguous in both directions, when the projection onto the y axis is no longer split and
+        # only the empty rows at the top and bottom have been cut off
+        if len(y_sequences) == 1:
+            area = (x_sequences[0], y_sequences[0])
+            if area == region or depth >= self.config['max_depth']:
+                return [area]
+            return self.cut(area, depth + 1)
+
+        if depth >= self.config['max_depth']:
+            return [(x_sequences[0], (y_sequences[0][0], y_sequences[-1][1]))]
+
+        areas = []
+        for y_sequence in y_sequences:
+            areas += self.cut((x_sequences[0], y_sequence), depth + 1)
+        return areas
 
 
 class SimpleAreaGroupingEngine:
@@ -309,10 +943,16 @@ class SimpleAreaGroupingEngine:
     
     Changed 06.12.2018
     Changed the default formula for computation to from "d * s" to "d + math.sqrt(s)"
+
+    Changed 19.10.2026
+    The default formula uses "np.sqrt", so that it can be computed for all the pairs at once. Added "backend" and
+    "vectorized"
     """
     DEFAULT_CONFIG = {
-        'weight_function': lambda d, s: d + math.sqrt(s),
-        'threshold':       10**4
+        'weight_function': lambda d, s: d + np.sqrt(s),
+        'threshold':       10**4,
+        'backend':         None,
+        'vectorized':      True
     }
 
     def __init__(self, config):
@@ -326,6 +966,10 @@ class SimpleAreaGroupingEngine:
         - threshold:        The value which will be compared with the result of the weight function, that has been
                             computed from the pair of two areas.
                             Is the weight smalled than the threshold, the two areas are grouped, otherwise not
+        - backend:          The name of the kernel backend, which computes the weights of all the pairs. DEFAULT is None
+                            for the default backend
+        - vectorized:       Whether to try calling the weight function once with the matrices of all the distances and
+                            sizes. If the function does not support arrays, it is called for each pair. DEFAULT is True
         CHANGELOG
 
         Added 05.12.2018
@@ -376,6 +1020,9 @@ class SimpleAreaGroupingEngine:
 
         Added 05.12.2018
 
+        Changed 19.10.2026
+        The weights of all the pairs are computed in advance by the kernel backend
+
         :param areas:
         :return: List(List(Tuple(Tuple(int, int), Tuple(int, int))))
         """
@@ -387,18 +1034,15 @@ class SimpleAreaGroupingEngine:
         if len(areas) == 1:
             return [areas]
 
+        weights = self.pairwise_weights(areas)
+
         for i in range(len(areas)):
 
             for j in range(i + 1, len(areas)):
                 area_i = areas[i]
                 area_j = areas[j]
 
-                # Calculating the distance and the size and using that as parameters to the weight function
-                distance = self.area_distance(area_i, area_j)
-                size = self.area_size(area_j) + self.area_size(area_j)
-                weight = self.config['weight_function'](distance, size)
-
-                if weight < self.config['threshold']:
+                if weights[i, j] < self.config['threshold']:
                     group = group_membership[area_j] + group_membership[area_i] + [area_i, area_j]
                     # removing duplicates from that list
                     group = list(set(group))
@@ -416,6 +1060,38 @@ class SimpleAreaGroupingEngine:
 
         return groups
 
+    def pairwise_weights(self, areas):
+        """
+        Computes the matrix of the weights for all the pairs of the given areas at once. The weight of the pair (i, j)
+        with i < j is in the upper triangle of the matrix.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param areas:
+        :return: np.ndarray
+        """
+        # The coordinates are floats, because the products of the sizes would overflow for huge areas otherwise
+        bounds = np.array(areas, np.float64).reshape(len(areas), 4)
+        x_centers = (bounds[:, 0] + bounds[:, 1]) / 2
+        y_centers = (bounds[:, 2] + bounds[:, 3]) / 2
+        sizes = (bounds[:, 1] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 2])
+
+        distances = np.sqrt(
+            (x_centers[:, np.newaxis] - x_centers[np.newaxis, :]) ** 2 +
+            (y_centers[:, np.newaxis] - y_centers[np.newaxis, :]) ** 2
+        )
+        # Just like it has always been computed, the combined size of the pair is twice the size of the second area
+        combined_sizes = np.broadcast_to(2 * sizes[np.newaxis, :], distances.shape)
+
+        return get_backend(self.config['backend']).pairwise_weights(
+            self.config['weight_function'],
+            distances,
+            np.ascontiguousarray(combined_sizes),
+            self.config['vectorized']
+        )
+
     @staticmethod
     def combine_areas(areas):
         """
@@ -507,17 +1183,305 @@ class SimpleAreaGroupingEngine:
         return center
 
 
+class SkeletonVectorisationEngine(AbstractVectorisationEngine):
+    """
+    The problem:
+    To keep the geometry of a detected lightning, the whole binary mask of the detection had to be stored.
+
+    This engine thins the binarized lightning down to a skeleton with the width of one pixel. The skeleton is then
+    traced into polylines, which either connect the end points and branch points of the skeleton with each other or
+    form closed loops. The polylines are simplified and stored in a L2Vector object, which only needs a fraction of
+    the memory of the mask and makes geometric queries like the length, the orientation or the amount of branches cheap.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'threshold':    128,
+        'tolerance':    1.0
+    }
+
+    # The offsets of the 8 neighbours of a pixel. The direct (4-)neighbours come first, because they are preferred
+    # when tracing the skeleton
+    NEIGHBOUR_OFFSETS = [(-1, 0), (0, 1), (1, 0), (0, -1), (-1, 1), (1, 1), (1, -1), (-1, -1)]
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - threshold:    The grayscale value a pixel has to exceed to belong to the lightning. DEFAULT is 128, which is
+                        the same default as for the "get_mask" method of the image.
+        - tolerance:    The float maximum amount of pixels the simplified polylines are allowed to deviate from the
+                        traced skeleton. With 0 every pixel of the skeleton is kept. DEFAULT is 1.0
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        AbstractVectorisationEngine.__init__(self, config)
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+    def __call__(self, lightning_image, area=None):
+        """
+        Returns the L2Vector of the lightning in the given image, optionally only within the given area.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param area:    The area tuple of the part of the image to vectorize. DEFAULT is None for the whole image
+        :return: L2Vector
+        """
+        if area is None:
+            x_start, y_start = 0, 0
+            array = lightning_image.array
+        else:
+            (x_start, x_end), (y_start, y_end) = area
+            array = lightning_image.array[y_start:y_end + 1, x_start:x_end + 1]
+
+        skeleton = skeletonize(array > self.config['threshold'])
+        polylines, junctions = self.trace(skeleton)
+
+        # The points are traced as (row, column) indices, but the vector uses (x, y) points in the coordinates of the
+        # whole image
+        offset = np.asarray([x_start, y_start])
+        polylines = [
+            simplify_polyline(np.asarray(polyline)[:, ::-1] + offset, self.config['tolerance'])
+            for polyline in polylines
+        ]
+        junctions = [(x + x_start, y + y_start) for y, x in junctions]
+
+        return L2Vector.from_polylines(polylines, junctions)
+
+    def trace(self, skeleton):
+        """
+        Traces the given skeleton into a list of polylines, where each polyline is a list of (row, column) points. Also
+        returns the list of branch points. Each branch point is the center of a cluster of neighbouring skeleton pixels,
+        which are classified as branching by their crossing number.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray skeleton: The boolean skeleton array
+        :return: Tuple(List(List(Tuple(int, int))), List(Tuple(int, int)))
+        """
+        height, width = skeleton.shape
+        crossings = crossing_numbers(skeleton)
+
+        # The nodes are the pixels, where a polyline has to start or end: the end points and the branch points
+        pixels = set(zip(*np.nonzero(skeleton)))
+        nodes = set(zip(*np.nonzero(skeleton & (crossings != 2))))
+        branches = set(zip(*np.nonzero(skeleton & (crossings >= 3))))
+
+        def neighbours(pixel):
+            for i, j in self.NEIGHBOUR_OFFSETS:
+                neighbour = (pixel[0] + i, pixel[1] + j)
+                if neighbour in pixels:
+                    yield neighbour
+
+        visited = set()
+        visited_links = set()
+        polylines = []
+
+        def follow(path):
+            # Walks along the line until a node or a dead end is reached
+            while True:
+                current = path[-1]
+                if current in nodes and len(path) > 1:
+                    return path
+                visited.add(current)
+
+                following = None
+                for neighbour in neighbours(current):
+                    if neighbour in path[-2:]:
+                        continue
+                    if neighbour in nodes or neighbour not in visited:
+                        following = neighbour
+                        break
+
+                if following is None:
+                    return path
+                path.append(following)
+
+        for node in sorted(nodes):
+            for neighbour in neighbours(node):
+                if neighbour in nodes:
+                    # Two directly neighbouring nodes are only linked once
+                    link = tuple(sorted((node, neighbour)))
+                    if link not in visited_links:
+                        visited_links.add(link)
+                        polylines.append([node, neighbour])
+                elif neighbour not in visited:
+                    polylines.append(follow([node, neighbour]))
+
+        # All the pixels, which have not been visited yet belong to closed loops without any nodes
+        for pixel in sorted(pixels - visited - nodes):
+            if pixel not in visited:
+                loop = follow([pixel])
+                loop.append(pixel)
+                polylines.append(loop)
+
+        return polylines, self.cluster_centers(branches)
+
+    @staticmethod
+    def cluster_centers(pixels):
+        """
+        Groups the given set of pixels into clusters of 8-connected neighbours and returns the list of the (rounded)
+        center points of these clusters.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param set pixels:
+        :return: List(Tuple(int, int))
+        """
+        remaining = set(pixels)
+        centers = []
+        while remaining:
+            stack = [remaining.pop()]
+            cluster = []
+            while stack:
+                pixel = stack.pop()
+                cluster.append(pixel)
+                for i in (-1, 0, 1):
+                    for j in (-1, 0, 1):
+                        neighbour = (pixel[0] + i, pixel[1] + j)
+                        if neighbour in remaining:
+                            remaining.remove(neighbour)
+                            stack.append(neighbour)
+
+            center = np.round(np.mean(cluster, axis=0)).astype(int)
+            centers.append((int(center[0]), int(center[1])))
+
+        return sorted(centers)
+
+
+class SimpleLightningClassificationEngine:
+    """
+    The problem:
+    The guess, whether a lightning is a cloud to ground or a cloud to cloud lightning used to be made for each area
+    separately, only by comparing the width and the height of the area box, ignoring the pixels within it.
+
+    This engine computes the features of ALL the areas of a frame in one vectorized pass (see "area_features") and then
+    classifies the whole batch of areas at once. By default the guess is made by comparing the horizontal and vertical
+    extent of the LIT pixels within each area:
+    - "cross":  Cloud to cloud, if the lit pixels are a lot wider than they are high
+    - "ground": Cloud to ground, if the lit pixels are a lot higher than they are wide
+    - "???":    Couldnt make a guess
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'ratio':                    1.3,
+        'threshold':                0,
+        'classification_function':  None
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - ratio:                    The float factor by which the extent of the lit pixels along one axis has to exceed
+                                    the extent along the other axis, to guess the lightning type. DEFAULT is 1.3
+        - threshold:                The value a pixel has to exceed to count as lit. DEFAULT is 0
+        - classification_function:  Optionally a callable, which gets the dict of feature arrays and has to return a
+                                    list with one string classification per area. DEFAULT is None for the rule above
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        self.features = None
+
+    def __call__(self, lightning_image, areas):
+        """
+        Given the (preprocessed) image and the list of areas found within it, this will return a list of tuples, where
+        the first element is the string classification and the second element is the area. The computed features of
+        the areas are kept in the "features" attribute.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param list areas:
+        :return: List(Tuple(str, Tuple(Tuple(int, int), Tuple(int, int))))
+        """
+        self.features = area_features(lightning_image.array, areas, self.config['threshold'])
+
+        if self.config['classification_function'] is None:
+            classifications = self.classify(self.features)
+        else:
+            classifications = self.config['classification_function'](self.features)
+
+        return list(zip([str(classification) for classification in classifications], areas))
+
+    def classify(self, features):
+        """
+        The default classification of all areas at once, by comparing the extents of the lit pixels.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict features:
+        :return: np.ndarray
+        """
+        width = features['horizontal_extent']
+        height = features['vertical_extent']
+        ratio = self.config['ratio']
+
+        return np.where(
+            (width >= ratio * height) & (width > 0),
+            'cross',
+            np.where((height >= ratio * width) & (height > 0), 'ground', '???')
+        )
+
+
 class SimpleLightningPreprocessingEngine:
     """
 
     CHANGELOG
 
     Added 06.12.2018
+
+    Changed 19.10.2026
+    Added "run_length"
+
+    Changed 19.10.2026
+    Added the streaming mode: The max and the mean for the threshold function are taken from exponentially weighted
+    statistics of all the frames so far (see ExponentialFrameStatistics) instead of the current frame alone, which
+    gives stable thresholds on long sequences
     """
 
     DEFAULT_CONFIG = {
         'threshold_function': lambda m, a: m - m * (0.5 + 0.0002 * (255 - m - a)),
-        'static_threshold': 40
+        'static_threshold': 40,
+        # 19.10.2026
+        # Whether to return a RunLengthMask of the pixels above the threshold instead of the dense binary image
+        'run_length': False,
+        # 19.10.2026
+        # The streaming mode. The high percentile of the averaged histogram replaces the max of the frame
+        'streaming': False,
+        'smoothing': 0.05,
+        'percentile': 99.9,
+        'outlier_deviation': 4.0
     }
 
     def __init__(self, config):
@@ -528,24 +1492,79 @@ class SimpleLightningPreprocessingEngine:
 
         Added 06.12.2018
 
+        Changed 19.10.2026
+        The config can have the following parameters for the streaming mode:
+        - streaming:            Whether the threshold is derived from the statistics of all the frames so far. DEFAULT
+                                is False
+        - smoothing:            The weight of a new frame within the statistics. DEFAULT is 0.05
+        - percentile:           The percentile of the averaged histogram, which is used as the max. DEFAULT is 99.9
+        - outlier_deviation:    The frames, whose mean is further away from the averaged mean than this many standard
+                                deviations, do not change the statistics. DEFAULT is 4, None to add all the frames
+
         :param dict config:
         """
         self.config = self.DEFAULT_CONFIG.copy()
         self.config.update(config)
 
-    def __call__(self, lightning_image):
+        # 19.10.2026
+        # The statistics of the frames of the streaming mode
+        self.running_statistics = ExponentialFrameStatistics(self.config['smoothing'])
+        self.threshold = None
+
+    def reset(self):
+        """
+        Forgets the statistics of the frames so far, for example before a new sequence is processed in the streaming
+        mode
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.running_statistics = ExponentialFrameStatistics(self.config['smoothing'])
+
+    def __call__(self, lightning_image, statistics=None):
         """
         CHANGELOG
 
         Added 06.12.2018
 
+        Changed 19.10.2026
+        Added the optional statistics parameter
+
+        Changed 19.10.2026
+        Returns a RunLengthMask instead of the image, if "run_length" is set in the config
+
+        Changed 19.10.2026
+        In the streaming mode the histogram of the image updates the running statistics, from which the max and the
+        mean are taken. The used threshold is kept in the "threshold" attribute
+
         :param LightningImage lightning_image:
+        :param dict statistics:     Optionally the precomputed statistics of the image, as they are stored in the
+                                    FrameStatisticsIndex. If given, the max and the mean (or the histogram in the
+                                    streaming mode) are taken from there instead of being computed from the image.
+                                    DEFAULT is None
         :return:
         """
         # Calculating the max and the mean of the image as they will be the arguments to the function, that calculates
         # the dynamic threshold
-        image_max = np.amax(lightning_image.array)
-        image_mean = np.mean(lightning_image.array)
+        if self.config['streaming']:
+            # 19.10.2026
+            # The histogram is the only pass over the pixels and it is skipped, if it has been computed before
+            if statistics is not None:
+                histogram = statistics['histogram']
+            else:
+                histogram = np.bincount(lightning_image.array.ravel(), minlength=256)
+            self.running_statistics.update(histogram, self.config['outlier_deviation'])
+            image_max = self.running_statistics.percentile(self.config['percentile'])
+            image_mean = self.running_statistics.mean
+        elif statistics is not None:
+            image_max = statistics['max']
+            image_mean = statistics['mean']
+        else:
+            image_max = np.amax(lightning_image.array)
+            image_mean = np.mean(lightning_image.array)
 
         # Calculating the threshold by using the given function
         dynamic_threshold = self.config['threshold_function'](
@@ -554,8 +1573,14 @@ class SimpleLightningPreprocessingEngine:
         )
         static_threshold = self.config['static_threshold']
         threshold = max(dynamic_threshold, static_threshold)
+        self.threshold = threshold
         # print(threshold)
 
+        # 19.10.2026
+        # The run length mask is encoded directly from the original image, so the dense binary image is never created
+        if self.config['run_length']:
+            return RunLengthMask.from_image(lightning_image, threshold)
+
         # The binary, separated function is now computed by turning everything below the threshold into pure black
         # and everything above into pure white.
         separated_lightning_image = lightning_image.copy()  # type: LightningImage
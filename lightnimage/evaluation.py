@@ -0,0 +1,337 @@
+# 19.10.2026
+# Evaluating the accuracy of the detection together with its speed and memory. The detected areas of a pipeline are
+# matched against hand drawn bounding boxes of the lightning channels (an annotation file, see
+# "tests/source/aragats-annotations.json") and the precision, the recall and the intersection over union are reported
+# next to the runtime and the peak memory per frame. So a faster engine or an optimization of an existing one can be
+# judged on both axes in one run.
+# All the areas, the detected and the annotated ones, have exclusive ends like the areas of the segmentation engines:
+# ((x_start, x_end), (y_start, y_end)), where x_end is the index after the last column of the area.
+import os
+import json
+import time
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.engine import SimpleAreaGroupingEngine
+from lightnimage.runner import FrameDetectionEngine
+from lightnimage.memory import measure_memory
+
+
+def area_size(area):
+    """
+    Returns the amount of pixels within the given area. The ends of the area are exclusive.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The ends are exclusive like the ends of the areas of the engines. They used to be inclusive, which made every
+    detected area one pixel too large along each axis
+
+    :param tuple area:  ((x_start, x_end), (y_start, y_end))
+    :return: int
+    """
+    return max(0, area[0][1] - area[0][0]) * max(0, area[1][1] - area[1][0])
+
+
+def intersection_over_union(area1, area2):
+    """
+    Returns the size of the intersection of the two given areas divided by the size of their union. The ends of the
+    areas are exclusive.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The ends are exclusive (see "area_size")
+
+    :param tuple area1:
+    :param tuple area2:
+    :return: float
+    """
+    width = min(area1[0][1], area2[0][1]) - max(area1[0][0], area2[0][0])
+    height = min(area1[1][1], area2[1][1]) - max(area1[1][0], area2[1][0])
+    if width <= 0 or height <= 0:
+        return 0.0
+
+    intersection = width * height
+    return intersection / (area_size(area1) + area_size(area2) - intersection)
+
+
+def match_areas(detected_areas, annotated_areas, threshold=0.5):
+    """
+    Matches the detected areas to the annotated areas. The pairs are matched greedily in the order of their
+    decreasing intersection over union, every area is matched at most once and only pairs with an intersection over
+    union of at least the threshold are matched. Returns the list of (detected index, annotated index, iou) tuples.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list detected_areas:
+    :param list annotated_areas:
+    :param float threshold:     The minimal intersection over union of a match. DEFAULT is 0.5
+    :return: List(Tuple(int, int, float))
+    """
+    pairs = [
+        (intersection_over_union(detected_area, annotated_area), i, j)
+        for i, detected_area in enumerate(detected_areas)
+        for j, annotated_area in enumerate(annotated_areas)
+    ]
+    pairs.sort(key=lambda pair: pair[0], reverse=True)
+
+    matches = []
+    detected, annotated = set(), set()
+    for iou, i, j in pairs:
+        if iou < threshold:
+            break
+        if i in detected or j in annotated:
+            continue
+        detected.add(i)
+        annotated.add(j)
+        matches.append((i, j, iou))
+
+    return matches
+
+
+def load_annotations(path):
+    """
+    Loads the annotation file with the given path. Returns a list of dicts with the path of the frame, the path of its
+    reference frame and the list of the annotated area tuples, which have exclusive ends. The paths in the file are
+    relative to the folder of the file.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param str path:
+    :return: List(dict)
+    """
+    with open(path) as file:
+        data = json.load(file)
+
+    folder_path = os.path.dirname(os.path.abspath(path))
+    return [
+        {
+            'frame':        os.path.join(folder_path, entry['frame']),
+            'reference':    os.path.join(folder_path, entry['reference']),
+            'areas':        [tuple(tuple(int(index) for index in axis) for axis in area) for area in entry['areas']]
+        }
+        for entry in data['frames']
+    ]
+
+
+class DetectionPipeline:
+    """
+    The problem:
+    The engines, which are to be compared, are not all called the same way: The segmentation engines need the
+    preprocessed difference, the grouping engine the list of areas and the FrameDetectionEngine returns a tuple.
+
+    This pipeline does the whole detection of a frame and its reference: The FrameDetectionEngine and optionally the
+    SimpleAreaGroupingEngine on its areas. It returns just the list of areas, which is what the evaluation expects of
+    a pipeline. Any other callable with the same signature can be evaluated as well.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'detection':    {'classification': False},
+        'grouping':     None
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - detection:    The config dict of the FrameDetectionEngine. DEFAULT is a dict which disables the
+                        classification
+        - grouping:     The config dict of the SimpleAreaGroupingEngine, which groups the detected areas. DEFAULT is
+                        None for no grouping
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        self.detection_engine = FrameDetectionEngine(self.config['detection'])
+        self.grouping_engine = None
+        if self.config['grouping'] is not None:
+            self.grouping_engine = SimpleAreaGroupingEngine(self.config['grouping'])
+
+    def __call__(self, lightning_image, reference_image):
+        """
+        Returns the list of the areas detected within the given image
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param LightningImage reference_image:
+        :return: list
+        """
+        areas = self.detection_engine(lightning_image, reference_image)[0]
+        if self.grouping_engine is not None:
+            areas = self.grouping_engine(areas)
+        return areas
+
+
+def ratio(numerator, denominator):
+    # An empty denominator means, that there was nothing to get wrong
+    return numerator / denominator if denominator else 1.0
+
+
+def evaluate(pipeline, annotations, threshold=0.5, repeat=3, frames=None):
+    """
+    Evaluates the given pipeline on the given annotated frames. The pipeline is called with the image and the
+    reference image of each frame and has to return the list of the detected areas (or a tuple, which starts with the
+    list). Every frame is run "repeat" times for the runtime, the fastest run is taken. Then the frame is run once
+    more with the memory being traced. Returns a dict with:
+    - frames:                       The amount of evaluated frames
+    - true_positives:               The amount of detected areas, which match an annotated area
+    - false_positives:              The amount of detected areas, which do not match an annotated area
+    - false_negatives:              The amount of annotated areas, which are not matched by a detected area
+    - precision, recall, f1:        The ratios of the counts above over all the frames
+    - mean_iou:                     The mean intersection over union of the matched areas
+    - seconds_per_frame:            The mean of the fastest runtimes of the frames
+    - frames_per_second:            The inverse of the above
+    - traced_peak:                  The largest traced peak memory of a frame in bytes
+    - traced_peak_frames:           The same as a multiple of the bytes of the frame
+    - rss_peak:                     The largest peak increase of the resident set size or None
+    - results:                      The list of dicts with the areas, the matches and the measurements of each frame
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param pipeline:                A callable, which gets the image and the reference image
+    :param list annotations:        The list of the annotated frames (see "load_annotations")
+    :param float threshold:         The minimal intersection over union of a match. DEFAULT is 0.5
+    :param int repeat:              The amount of runs for the runtime of each frame. DEFAULT is 3
+    :param dict frames:             Optionally a dict, which maps the paths to already loaded LightningImages. Used to
+                                    load the frames only once, when several pipelines are evaluated. DEFAULT is None
+    :return: dict
+    """
+    frames = {} if frames is None else frames
+
+    def load(path):
+        if path not in frames:
+            frames[path] = LightningImage.from_file(path)
+        return frames[path]
+
+    results = []
+    for annotation in annotations:
+        image, reference = load(annotation['frame']), load(annotation['reference'])
+
+        seconds = []
+        for i in range(max(repeat, 1)):
+            start = time.perf_counter()
+            pipeline(image, reference)
+            seconds.append(time.perf_counter() - start)
+
+        areas, memory = measure_memory(pipeline, image, reference)
+        if isinstance(areas, tuple):
+            areas = areas[0]
+        areas = list(areas)
+
+        matches = match_areas(areas, annotation['areas'], threshold)
+        results.append({
+            'frame':                os.path.basename(annotation['frame']),
+            'areas':                areas,
+            'matches':              matches,
+            'true_positives':       len(matches),
+            'false_positives':      len(areas) - len(matches),
+            'false_negatives':      len(annotation['areas']) - len(matches),
+            'seconds':              min(seconds),
+            'traced_peak':          memory['traced_peak'],
+            'traced_peak_frames':   memory['traced_peak'] / image.array.nbytes,
+            'rss_peak':             memory['rss_peak']
+        })
+
+    true_positives = sum(result['true_positives'] for result in results)
+    false_positives = sum(result['false_positives'] for result in results)
+    false_negatives = sum(result['false_negatives'] for result in results)
+    precision = ratio(true_positives, true_positives + false_positives)
+    recall = ratio(true_positives, true_positives + false_negatives)
+    ious = [iou for result in results for i, j, iou in result['matches']]
+    seconds_per_frame = float(np.mean([result['seconds'] for result in results])) if results else 0.0
+    rss_peaks = [result['rss_peak'] for result in results if result['rss_peak'] is not None]
+
+    return {
+        'frames':               len(results),
+        'true_positives':       true_positives,
+        'false_positives':      false_positives,
+        'false_negatives':      false_negatives,
+        'precision':            precision,
+        'recall':               recall,
+        'f1':                   2 * precision * recall / (precision + recall) if precision + recall else 0.0,
+        'mean_iou':             float(np.mean(ious)) if ious else 0.0,
+        'seconds_per_frame':    seconds_per_frame,
+        'frames_per_second':    1 / seconds_per_frame if seconds_per_frame else 0.0,
+        'traced_peak':          max((result['traced_peak'] for result in results), default=0),
+        'traced_peak_frames':   max((result['traced_peak_frames'] for result in results), default=0.0),
+        'rss_peak':             max(rss_peaks) if rss_peaks else None,
+        'results':              results
+    }
+
+
+def compare(pipelines, annotations, threshold=0.5, repeat=3):
+    """
+    Evaluates all the given pipelines on the same annotated frames. The frames are only loaded once. Returns a dict,
+    which maps the names of the pipelines to their reports (see "evaluate").
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param dict pipelines:      A dict, which maps names to pipelines
+    :param list annotations:
+    :param float threshold:     DEFAULT is 0.5
+    :param int repeat:          DEFAULT is 3
+    :return: dict
+    """
+    frames = {}
+    return {
+        name: evaluate(pipeline, annotations, threshold=threshold, repeat=repeat, frames=frames)
+        for name, pipeline in pipelines.items()
+    }
+
+
+def format_reports(reports):
+    """
+    Formats the reports of several pipelines as a table with one line per pipeline
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param dict reports:    A dict, which maps the names of the pipelines to their reports
+    :return: str
+    """
+    width = max([len('pipeline')] + [len(name) for name in reports])
+    lines = ['{:<{width}}  {:>9}  {:>6}  {:>6}  {:>8}  {:>8}  {:>12}  {:>10}'.format(
+        'pipeline', 'precision', 'recall', 'iou', 'ms/frame', 'frames/s', 'peak frames', 'peak MiB',
+        width=width
+    )]
+    for name, report in reports.items():
+        lines.append('{:<{width}}  {:>9.3f}  {:>6.3f}  {:>6.3f}  {:>8.1f}  {:>8.1f}  {:>12.2f}  {:>10.1f}'.format(
+            name,
+            report['precision'],
+            report['recall'],
+            report['mean_iou'],
+            report['seconds_per_frame'] * 1000,
+            report['frames_per_second'],
+            report['traced_peak_frames'],
+            report['traced_peak'] / 2**20,
+            width=width
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,397 @@
+# 19.10.2026
+# Linking the detections of consecutive frames into lightning events. One flash usually lasts for a few frames of a
+# recording, but the segmentation treats every frame on its own. The events are built in a single pass over the
+# frames (a sweep line over the time axis), where only the events, which are still active are being kept and looked
+# up with a coarse grid.
+from collections import OrderedDict, defaultdict
+
+from lightnimage.calculate import areas_overlap
+from lightnimage.storage import DetectionLog
+
+
+class LightningEvent:
+    """
+    A single lightning event, which spans over one or more consecutive frames.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    __slots__ = ('event_id', 'first_frame', 'last_frame', 'area', 'peak_intensity', 'peak_frame', 'detection_count')
+
+    def __init__(self, event_id, frame_id, area, intensity):
+        """
+        The constructor creates the event from its first detection.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int event_id:
+        :param int frame_id:    The id of the frame of the first detection
+        :param area:            The area tuple of the first detection
+        :param intensity:       The intensity of the first detection
+        """
+        self.event_id = event_id
+        self.first_frame = frame_id
+        self.last_frame = frame_id
+        self.area = area
+        self.peak_intensity = intensity
+        self.peak_frame = frame_id
+        self.detection_count = 1
+
+    @property
+    def frame_span(self):
+        """
+        The amount of frames from the first to the last frame of the event
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.last_frame - self.first_frame + 1
+
+    def add(self, frame_id, area, intensity):
+        """
+        Adds another detection to the event.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :param area:
+        :param intensity:
+        :return: void
+        """
+        self.first_frame = min(self.first_frame, frame_id)
+        self.last_frame = max(self.last_frame, frame_id)
+        self.area = union_area(self.area, area)
+        if intensity > self.peak_intensity:
+            self.peak_intensity = intensity
+            self.peak_frame = frame_id
+        self.detection_count += 1
+
+    def merge(self, other):
+        """
+        Merges the other event into this one. This happens, when a detection connects two events, which have been
+        separate until then.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningEvent other:
+        :return: void
+        """
+        self.first_frame = min(self.first_frame, other.first_frame)
+        self.last_frame = max(self.last_frame, other.last_frame)
+        self.area = union_area(self.area, other.area)
+        if other.peak_intensity > self.peak_intensity:
+            self.peak_intensity = other.peak_intensity
+            self.peak_frame = other.peak_frame
+        self.detection_count += other.detection_count
+
+    def as_dict(self):
+        """
+        Returns all the properties of the event as a dict
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: dict
+        """
+        return {
+            'event_id':         self.event_id,
+            'first_frame':      self.first_frame,
+            'last_frame':       self.last_frame,
+            'frame_span':       self.frame_span,
+            'area':             self.area,
+            'peak_intensity':   self.peak_intensity,
+            'peak_frame':       self.peak_frame,
+            'detection_count':  self.detection_count
+        }
+
+    def __repr__(self):
+        return 'LightningEvent({})'.format(', '.join('{}={}'.format(k, v) for k, v in self.as_dict().items()))
+
+
+def union_area(area1, area2):
+    """
+    Returns the smallest area, which contains both of the given areas
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param area1:
+    :param area2:
+    :return: Tuple(Tuple(int, int), Tuple(int, int))
+    """
+    return (
+        (min(area1[0][0], area2[0][0]), max(area1[0][1], area2[0][1])),
+        (min(area1[1][0], area2[1][0]), max(area1[1][1], area2[1][1]))
+    )
+
+
+def expand_area(area, distance):
+    """
+    Returns the given area expanded by the given distance on all sides
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param area:
+    :param int distance:
+    :return: Tuple(Tuple(int, int), Tuple(int, int))
+    """
+    return (area[0][0] - distance, area[0][1] + distance), (area[1][0] - distance, area[1][1] + distance)
+
+
+class TemporalEventBuilder:
+    """
+    The problem:
+    The detections of every frame are independent lists of areas. A single flash, which lasts for several frames shows
+    up as several unrelated detections and finding the duplicates afterwards compares all the detections with each
+    other.
+
+    This class links the areas of consecutive frames into events in a single pass. The frames have to be pushed in the
+    order of their ids. An area is added to an event, if the event has a detection in one of the last "max_gap" frames
+    and the area overlaps the (union) area of the event, expanded by "distance". An area, which connects two events
+    merges them. Events, which did not get a detection within "max_gap" frames are finished and returned.
+    The active events are registered in the cells of a coarse grid, so that each area is only compared with the
+    events in the cells it covers, instead of all the active events.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'max_gap':      1,
+        'distance':     0,
+        'cell_size':    64
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - max_gap:      The int maximum amount of frames between two detections of the same event. DEFAULT is 1, which
+                        means that only directly consecutive frames are linked
+        - distance:     The int amount of pixels, by which the area of an event is expanded before checking, whether a
+                        new area overlaps with it. DEFAULT is 0
+        - cell_size:    The int edge length of the cells of the grid, which is used to look up the active events.
+                        DEFAULT is 64
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        # The active events ordered by their last frame, the least recently updated first
+        self.active = OrderedDict()
+        # Maps the (x, y) index of a grid cell to the set of ids of the active events, which cover the cell
+        self.grid = defaultdict(set)
+        # Maps the event ids to the grid cells they are registered in
+        self.cells = {}
+
+        self.event_count = 0
+        self.frame_id = None
+
+    def cells_of(self, area):
+        """
+        Returns the list of the (x, y) indices of all the grid cells, which are covered by the given area
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param area:
+        :return: List(Tuple(int, int))
+        """
+        cell_size = self.config['cell_size']
+        return [
+            (x, y)
+            for x in range(area[0][0] // cell_size, area[0][1] // cell_size + 1)
+            for y in range(area[1][0] // cell_size, area[1][1] // cell_size + 1)
+        ]
+
+    def register(self, event):
+        """
+        Registers the (expanded) area of the given event in the grid
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningEvent event:
+        :return: void
+        """
+        cells = set(self.cells_of(expand_area(event.area, self.config['distance'])))
+        for cell in cells - self.cells.get(event.event_id, set()):
+            self.grid[cell].add(event.event_id)
+        self.cells[event.event_id] = cells
+
+    def unregister(self, event):
+        """
+        Removes the given event from the grid and the active events
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningEvent event:
+        :return: void
+        """
+        for cell in self.cells.pop(event.event_id):
+            self.grid[cell].discard(event.event_id)
+            if len(self.grid[cell]) == 0:
+                del self.grid[cell]
+        del self.active[event.event_id]
+
+    def expire(self, frame_id):
+        """
+        Finishes all the active events, whose last detection is more than "max_gap" frames before the given frame.
+        Returns the list of these events.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :return: List(LightningEvent)
+        """
+        finished = []
+        # The events are ordered by their last frame, so only the events at the front have to be checked
+        while len(self.active) != 0:
+            event = next(iter(self.active.values()))
+            if frame_id - event.last_frame <= self.config['max_gap']:
+                break
+            self.unregister(event)
+            finished.append(event)
+
+        return finished
+
+    def push(self, frame_id, areas, intensities=None):
+        """
+        Adds the areas of the next frame. Returns the list of the events, which have been finished, because they did
+        not continue in this frame.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:        The id of the frame. Has to be at least the id of the previous frame
+        :param list areas:          The list of area tuples of the frame
+        :param intensities:         The list with the intensity of each area. DEFAULT is None, which uses the size of
+                                    the areas as their intensity
+        :return: List(LightningEvent)
+        """
+        if self.frame_id is not None and frame_id < self.frame_id:
+            raise ValueError('The frame {} has been pushed after the frame {}'.format(frame_id, self.frame_id))
+        self.frame_id = frame_id
+
+        finished = self.expire(frame_id)
+
+        if intensities is None:
+            intensities = [(area[0][1] - area[0][0]) * (area[1][1] - area[1][0]) for area in areas]
+
+        for area, intensity in zip(areas, intensities):
+            # Looking up the candidates only in the cells of the area and then checking the actual overlap
+            candidates = set()
+            for cell in self.cells_of(area):
+                candidates.update(self.grid.get(cell, ()))
+
+            distance = self.config['distance']
+            matches = sorted(
+                event_id for event_id in candidates
+                if areas_overlap(area, expand_area(self.active[event_id].area, distance))
+            )
+
+            if len(matches) == 0:
+                event = LightningEvent(self.event_count, frame_id, area, intensity)
+                self.event_count += 1
+            else:
+                # The area is added to the oldest event it matches and all the other events are merged into that
+                event = self.active[matches[0]]
+                event.add(frame_id, area, intensity)
+                for event_id in matches[1:]:
+                    other = self.active[event_id]
+                    self.unregister(other)
+                    event.merge(other)
+
+            self.active[event.event_id] = event
+            self.active.move_to_end(event.event_id)
+            self.register(event)
+
+        return finished
+
+    def finish(self):
+        """
+        Finishes all the events, which are still active, at the end of the recording. Returns the list of these events
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: List(LightningEvent)
+        """
+        finished = sorted(self.active.values(), key=lambda event: event.event_id)
+        for event in finished:
+            self.unregister(event)
+        self.frame_id = None
+        return finished
+
+    def build(self, frames):
+        """
+        A generator, which builds the events of a whole recording. The frames are given as an iterable of tuples of
+        the frame id, the list of areas and the list of intensities (or None). The events are yielded, as soon as they
+        are finished.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param frames:
+        :return: Generator(LightningEvent)
+        """
+        for frame_id, areas, intensities in frames:
+            for event in self.push(frame_id, areas, intensities):
+                yield event
+
+        for event in self.finish():
+            yield event
+
+
+def events_from_log(reader, intensity_feature=None, config=None):
+    """
+    Builds the lightning events of all the detections in the given detection log.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param DetectionLogReader reader:
+    :param str intensity_feature:   The name of the feature column, which is used as the intensity of the detections.
+                                    DEFAULT is None for the size of the areas
+    :param dict config:             The config of the TemporalEventBuilder. DEFAULT is None for the default config
+    :return: List(LightningEvent)
+    """
+    def frames():
+        for frame_id in reader.frame_ids:
+            intensities = None
+            if intensity_feature is not None:
+                column = reader.detections(frame_id)[DetectionLog.feature_column_name(intensity_feature)]
+                intensities = [float(value) for value in column]
+            yield int(frame_id), reader.areas(frame_id), intensities
+
+    return list(TemporalEventBuilder(config or {}).build(frames()))
@@ -1,6 +1,7 @@
 import numpy as np
 
-import copy
+from lightnimage.kernel import get_backend
+from lightnimage.mask import PackedMask
 
 
 class LightningImage:
@@ -14,7 +15,7 @@ class LightningImage:
     @author Jonas Teufel
     """
 
-    def __init__(self, img):
+    def __init__(self, img, copy=True):
         """
         The constructor.
 
@@ -30,22 +31,64 @@ class LightningImage:
         creation of a copy of that image.
         Added a original field
 
+        Changed 19.10.2026
+        Added the "copy" parameter. If it is False the array is NOT copied, which means the image is only a view on
+        the given array (or memory map). This is used to process parts of very large images without duplicating them.
+
         @param np.ndarray img: The array should be two dimensions, which means only grayscale images
+        @param bool copy:      Whether to copy the given array. DEFAULT is True
         """
-        if isinstance(img, LightningImage):
+        array = img.array if isinstance(img, LightningImage) else img
+
+        if copy:
             # If the input was another lightning image object it gets copied, which means
             # the original also gets copied
-            self.array = copy.deepcopy(img.array)
-            #self.original = copy.deepcopy(img.original)
+            self.array = np.copy(array)
         else:
-            self.array = copy.deepcopy(img)
-            #self.original = copy.deepcopy(img)
+            self.array = array
 
         # 06.11.2018
         # Saving the height and the width of the image and thus the dimensions of the array as well
         self.width = self.array.shape[1]
         self.height = self.array.shape[0]
 
+    @classmethod
+    def from_memmap(cls, path, shape, dtype=np.uint8, offset=0):
+        """
+        Creates a new image object, whose array is a read only memory map of the raw pixel data in the given file.
+        Only the parts of the image, which are actually accessed are being loaded into memory.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        @param str path:    The path of the file containing the raw pixel data
+        @param tuple shape: The (height, width) tuple of the image
+        @param dtype:       The data type of the pixel values. DEFAULT is uint8
+        @param int offset:  The amount of bytes at the start of the file, before the pixel data starts
+        @return: LightningImage
+        """
+        array = np.memmap(path, dtype=dtype, mode='r', offset=offset, shape=shape)
+        return cls(array, copy=False)
+
+    @classmethod
+    def from_file(cls, path):
+        """
+        Loads the image file (for example a JPEG frame) with the given path as a grayscale image. pillow is only
+        imported, when this is used for the first time.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        @param str path:    The path of the image file
+        @return: LightningImage
+        """
+        from PIL import Image
+
+        with Image.open(path) as image:
+            return cls(np.array(image.convert('L')), copy=False)
+
     def copy(self):
         """
         Returns a copy of the image object
@@ -54,11 +97,14 @@ class LightningImage:
 
         Added 19.11.2018
 
+        Changed 19.10.2026
+        The array is copied only once by the constructor, instead of being deep copied before that
+
         @return: LightningImage
         """
-        return LightningImage(copy.deepcopy(self.array))
+        return LightningImage(self.array)
 
-    def get_mask(self, threshold=128):
+    def get_mask(self, threshold=128, packed=False):
         """
         This method will return an array object with the same shape as the image. Based on a
         threshold value this array will contain a 1 if the image value exceeds the threshold at that
@@ -68,25 +114,28 @@ class LightningImage:
 
         Added 19.11.2018
 
+        Changed 19.10.2026
+        The threshold function also works with arrays, so it is applied to the whole image at once
+
+        Changed 19.10.2026
+        Added the "packed" parameter
+
+        Changed 19.10.2026
+        The mask is the result of the comparison itself, instead of an element wise transformation of a copy, which
+        needed the index arrays of all the pixels
+
         @param threshold:
+        @param bool packed: Whether to return a PackedMask with one bit per pixel instead. DEFAULT is False
         @return:
         """
-        # Creating a function, which will return 1 if the value of the element ist greater than the
-        # threshold and 0 otherwise.
-        # This function will be applied as a element wise transformation, thus creating a mask array
-        def threshold_mask(value, i, j):
-            if value > threshold:
-                return 1
-            else:
-                return 0
+        if packed:
+            return PackedMask(np.packbits(self.array > threshold, axis=1), self.array.shape)
 
-        # The transformation is applied on a copy of image, so that the creation of the mask doesnt
-        # influence the array.
-        cpy = self.copy()
-        cpy.transform_element_wise(threshold_mask)
-        return cpy.array
+        # 19.10.2026
+        # The boolean array is reinterpreted as 8 bit integers without copying it, a True is a 1
+        return np.greater(self.array, threshold).view(np.uint8)
 
-    def transform_masked(self, f, mask, replace=None):
+    def transform_masked(self, f, mask, replace=None, backend=None, vectorized=False):
         """
         Given a function and a mask, the function will be applied to each element, where the mask evaluates to True.
 
@@ -94,45 +143,34 @@ class LightningImage:
 
         Added 16.11.2018
 
+        Changed 19.10.2026
+        The transformation is done by a kernel backend. With the vectorized flag, the function is called only once
+        with the arrays of all the masked values and indices.
+
+        Changed 19.10.2026
+        The mask can also be a packed or run length encoded mask
+
         @param f:           The function to be applied to each element. has to return a float value between 0 and 255.
                             Has to accept 3 arguments: the old element value, axis0 index, axis1 index
         @param mask:        An array, that has exactly the same dimensions as the image to transform. Contains only
                             0 and 1 (True and False). The given function will only be applied to elements at indices,
                             where the mask element evaluates to True.
+                            Can also be a PackedMask or a RunLengthMask (see the module "mask").
         @param replace:     Optionally an int in the range between 0 and 255. Every pixel, that is not being masked will
                             be replaced with this constant value in the transformed image.
                             If it is None, the new image will have the same value as the old image in a unmasked element
                             DEFAULT is None.
+        @param backend:     The name of the kernel backend, either "numpy" or "numba". DEFAULT is None for the default
+                            backend
+        @param vectorized:  Whether the function also works with arrays of values and indices. DEFAULT is False
         @return:
         """
-        new = np.zeros(self.array.shape, np.uint8)
-        it = np.nditer(self.array, flags=['multi_index'])
-        it_new = np.nditer(new, op_flags=['writeonly'])
-        it_mask = np.nditer(mask)
-        while not it.finished:
-            # Only doing anything if the current pixel is masked
-            if it_mask[0]:
-                # Retrieving the value for the transformed array as the transformation of the current array element
-                it_new[0] = f(it[0], it.multi_index[0], it.multi_index[1])
-
-            else:
-                # In case there is a replace value given. All other elements, that are not masked are replaced by this
-                # constant value
-                if replace is not None:
-                    it_new[0] = replace
-                # Otherwise the value from the original matrix will be kept
-                else:
-                    it_new[0] = it[0]
-
-            # Iterating to the next element
-            it.iternext()
-            it_new.iternext()
-            it_mask.iternext()
-
-        # Switching to the new array
-        self.array = new
-
-    def transform_element_wise(self, f):
+        # 19.10.2026
+        # The loop over the pixels is done by a kernel backend, which calls the function with all the masked pixels at
+        # once if possible and otherwise only loops over the masked pixels
+        self.array = get_backend(backend).masked_transform(f, self.array, mask, replace, vectorized)
+
+    def transform_element_wise(self, f, backend=None, vectorized=False):
         """
         Given a function, this function will be applied to each element of the matrix.
 
@@ -140,26 +178,37 @@ class LightningImage:
 
         Added 16.11.2018
 
-        @param f:   The function to be applied to the elements. Has to return a 8 bit integer. Has to accept 3
-                    arguments: The old element value, the axis0 index, the axis1 index
-        @return:
-        """
-        # Creating a new empty matrix with the same dimensions
-        new = np.zeros(self.array.shape, np.uint8)
-        it = np.nditer(self.array, flags=['multi_index'])
-        it_new = np.nditer(new, op_flags=['writeonly'])
-        while not it.finished:
-            # Retrieving the value for the transformed array as the transformation of the current array element
-            value = f(it[0], it.multi_index[0], it.multi_index[1])
-            # Setting the element of the new matrix
-            it_new[0] = value
+        Changed 19.10.2026
+        The transformation is done by a kernel backend, just like the masked transformation
 
-            # Incrementing the iterators
-            it.iternext()
-            it_new.iternext()
+        Changed 19.10.2026
+        A vectorized function is called with the whole array and broadcast index arrays, instead of the index arrays
+        of all the pixels
 
-        # Switching to the new array
-        self.array = new
+        Changed 19.10.2026
+        The loop is not a masked transformation with a full mask anymore, which needed the index arrays and the float
+        values of all the pixels
+
+        @param f:           The function to be applied to the elements. Has to return a 8 bit integer. Has to accept
+                            3 arguments: The old element value, the axis0 index, the axis1 index
+        @param backend:     The name of the kernel backend. DEFAULT is None for the default backend
+        @param vectorized:  Whether the function also works with arrays of values and indices. DEFAULT is False
+        @return:
+        """
+        # 19.10.2026
+        # The row and the column indices only need to be a column and a row vector, which numpy broadcasts
+        if vectorized:
+            rows, columns = np.ogrid[:self.height, :self.width]
+            values = get_backend(backend).vectorized(f, (self.array, rows, columns), self.array.shape)
+            if values is not None:
+                new = np.empty(self.array.shape, np.uint8)
+                new[...] = values
+                self.array = new
+                return
+
+        # 19.10.2026
+        # The loop goes over the rows and columns directly, without the index arrays of all the pixels
+        self.array = get_backend(backend).element_transform(f, self.array)
 
     def transform(self, f):
         """
@@ -186,15 +235,14 @@ class LightningImage:
 
         Added 04.11.2018
 
+        Changed 19.10.2026
+        The pixels are replaced by numpy at once instead of one by one
+
         @param int threshold:   All the pixels, that are smaller than this will be replaced. This has to be 8 bit int
         @param int replace:     The fixed value to replace with
         @return: void
         """
-        it = np.nditer(self.array, flags=['multi_index'], op_flags=['writeonly'])
-        while not it.finished:
-            if it[0] <= threshold:
-                it[0] = replace
-            it.iternext()
+        self.array[self.array <= threshold] = replace
 
     def lighten(self, threshold, replace=255):
         """
@@ -205,16 +253,15 @@ class LightningImage:
 
         Added 04.11.2018
 
+        Changed 19.10.2026
+        The pixels are replaced by numpy at once instead of one by one
+
         @param int threshold:   All values, that are bigger than this will be replaced. This has to be in the range 0
                                 to 255
         @param int replace:     The fixed value to replace all the pixels with, that are bigger than the threshold
         @return: void
         """
-        it = np.nditer(self.array, flags=['multi_index'], op_flags=['writeonly'])
-        while not it.finished:
-            if it[0] >= threshold:
-                it[0] = replace
-            it.iternext()
+        self.array[self.array >= threshold] = replace
 
     def invert(self):
         """
@@ -224,12 +271,12 @@ class LightningImage:
 
         Added 04.11.2018
 
+        Changed 19.10.2026
+        The pixels are inverted by numpy at once instead of one by one
+
         @return: void
         """
-        it = np.nditer(self.array, flags=['multi_index'], op_flags=['writeonly'])
-        while not it.finished:
-            it[0] = 255 - it[0]
-            it.iternext()
+        np.subtract(255, self.array, out=self.array, casting='unsafe')
 
     def difference(self, other, threshold=10, replace=255, invert=False, ):
         """
@@ -250,6 +297,13 @@ class LightningImage:
 
         Added 04.11.2018
 
+        Changed 19.10.2026
+        The resulting image is now 8 bit instead of float64 and the difference is no longer computed pixel by pixel
+
+        Changed 19.10.2026
+        The difference is computed in 8 bit as the maximum minus the minimum and then modified in place, which needs
+        less than half the temporary memory of the 16 bit subtraction
+
         @param LightningImage other:    The other image, which is supposed to be subtracted from this one
         @param int threshold:           Every resulting difference value below this given int will be replaced with a
                                         fixed value. If this is 0 no replacements will be made
@@ -257,23 +311,21 @@ class LightningImage:
         @param bool invert:
         @return LightningImage:         The new image
         """
-        new = np.zeros(self.array.shape)
-        it = np.nditer(new, flags=['multi_index'], op_flags=['writeonly'])
-        while not it.finished:
-            value_self = self.array[it.multi_index]
-            value_other = other.array[it.multi_index]
-            diff = abs(int(value_self) - int(value_other))
-
-            if diff < threshold:
-                it[0] = replace
-            else:
-                it[0] = abs(int(value_self) - int(value_other))
-                if invert:
-                    it[0] = 255 - it[0]
-
-            it.iternext()
-
-        return LightningImage(new)
+        # 19.10.2026
+        # The difference is computed as a whole instead of iterating each pixel, and the resulting image is 8 bit
+        # instead of float64, because the difference of two 8 bit images can never exceed 255 anyways. The maximum
+        # minus the minimum is never negative, so no wider integers are needed for the intermediate results
+        array = self.array.astype(np.uint8, copy=False)
+        other_array = other.array.astype(np.uint8, copy=False)
+        new = np.maximum(array, other_array)
+        new -= np.minimum(array, other_array)
+
+        below = new < threshold
+        if invert:
+            np.subtract(255, new, out=new)
+        new[below] = replace
+
+        return LightningImage(new, copy=False)
 
     def column_sum(self, scale=None):
         """
@@ -320,6 +372,9 @@ class LightningImage:
 
         Added 06.11.2018
 
+        Changed 19.10.2026
+        The sums are computed by numpy now and no longer overflow for 8 bit images
+
         @param int axis:    Either 0 or 1. A 1 would be the sum of all rows and 0 the sum of all columns
         @param int scale:   An integer, which sets the maximum value for the sums. All values get scaled
                             relative to this value.
@@ -330,20 +385,11 @@ class LightningImage:
         # will contain the sum values of each row.
         # For a two dimensional array (as the image is one), the second item of the shape attribute will contain the
         # length of a column and thus the amount of rows
-        sum_array = np.ndarray(self.array.shape[axis], np.float64)
-
-        # Iterating through all the rows of the array ans summing up the individual elements
-        for i in range(self.array.shape[axis]):
-            temp_sum = 0
-            for j in range(self.array.shape[1 - axis]):
-                # Numpy arrays support multi indexing in a single bracket for higher dimensions and this is also the
-                # more efficient way
-                if axis:
-                    temp_sum += self.array[j, i]
-                else:
-                    temp_sum += self.array[i, j]
-
-            sum_array[i] = temp_sum
+        # 19.10.2026
+        # The sums are now computed by numpy as a whole. The accumulation is explicitly done in float64, because the
+        # sums of an 8 bit image would otherwise overflow. numpy does the conversion in small buffered chunks, so the
+        # image is never copied as a whole (which is important for memory mapped images).
+        sum_array = np.sum(self.array, axis=1 - axis, dtype=np.float64)
 
         # If there is a scale value given, all the values in the array will be scaled, so that the maximum value is
         # at most the scale value
@@ -0,0 +1,629 @@
+# 19.10.2026
+# Pluggable backends for the kernels, which are inherently sequential scans over an array with a custom callback
+# function: The sequencing with custom start and stop predicates, the masked transformations with index dependent
+# functions and the pairwise weights of the area grouping.
+#
+# If the caller knows, that the callback also works with whole arrays (comparisons and arithmetic usually do), the
+# kernels call it ONCE with the arrays, which is evaluated at numpy speed by both backends. Otherwise, or if the callback
+# turns out not to support arrays (because it uses "if" or the "math" module for example), the kernel falls back to a
+# loop, which calls the callback for each element. The "numpy" backend runs these loops in the interpreter, the
+# "numba" backend compiles the loops TOGETHER with the callback, if numba is installed.
+# The loops are written as plain functions, so that both backends run the exact same code.
+import dis
+import types
+import time
+import weakref
+import importlib.util
+
+import numpy as np
+
+
+# THE LOOPS #
+
+
+def sequence_scan_loop(start_function, stop_function, array, sequences):
+    """
+    Scans the given array for sequences, which begin at the first element, for which the start function is True and
+    end at the following element, for which the stop function is True. The (start, end) index tuples of the
+    sequences are written into the given (n, 2) array. Returns the amount of sequences.
+    A sequence, which is still going on at the end of the array is closed with the length of the array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param start_function:          A function with the parameters index, value and the whole array
+    :param stop_function:           A function with the parameters index, value and the whole array
+    :param np.ndarray array:        The one dimensional array to be scanned
+    :param np.ndarray sequences:    An int array of the shape (len(array) // 2 + 1, 2) for the result
+    :return: int
+    """
+    count = 0
+    sequence_start = -1
+    for i in range(array.shape[0]):
+        if sequence_start < 0:
+            if start_function(i, array[i], array):
+                sequence_start = i
+        elif stop_function(i, array[i], array):
+            sequences[count, 0] = sequence_start
+            sequences[count, 1] = i
+            count += 1
+            sequence_start = -1
+
+    if sequence_start >= 0:
+        sequences[count, 0] = sequence_start
+        sequences[count, 1] = array.shape[0]
+        count += 1
+
+    return count
+
+
+def masked_transform_loop(function, array, rows, columns, values):
+    """
+    Writes the result of the function for each of the pixels at the given rows and columns into the given values
+    array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param function:            A function with the parameters value, row index and column index
+    :param np.ndarray array:    The two dimensional image array
+    :param np.ndarray rows:     The row indices of the pixels to be transformed
+    :param np.ndarray columns:  The column indices of the pixels to be transformed
+    :param np.ndarray values:   The float array for the results, with the same length as rows and columns
+    :return: void
+    """
+    for k in range(rows.shape[0]):
+        values[k] = function(array[rows[k], columns[k]], rows[k], columns[k])
+
+
+def element_transform_loop(function, array, new, values):
+    """
+    Writes the result of the function for each of the pixels of the given array into the given new array. The results
+    of a row are collected in the given values array first, so that only one row of floats is needed in addition.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param function:            A function with the parameters value, row index and column index
+    :param np.ndarray array:    The two dimensional image array
+    :param np.ndarray new:      The uint8 array for the result with the same shape
+    :param np.ndarray values:   The float array for the results of one row
+    :return: void
+    """
+    for i in range(array.shape[0]):
+        for j in range(array.shape[1]):
+            values[j] = function(array[i, j], i, j)
+        new[i, :] = values
+
+
+def pairwise_weights_loop(weight_function, distances, sizes, weights):
+    """
+    Writes the weight of each pair of areas (i, j) with i < j into the upper triangle of the given weights matrix.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param weight_function:         A function with the parameters distance and size
+    :param np.ndarray distances:    The (n, n) matrix of the distances between the areas
+    :param np.ndarray sizes:        The (n, n) matrix of the combined sizes of the areas
+    :param np.ndarray weights:      The (n, n) float matrix for the result
+    :return: void
+    """
+    n = distances.shape[0]
+    for i in range(n):
+        for j in range(i + 1, n):
+            weights[i, j] = weight_function(distances[i, j], sizes[i, j])
+
+
+def masked_indices(mask, block_pixels=None):
+    """
+    Generates the (rows, columns) index arrays of the pixels of the given mask. An array mask is split into blocks of
+    rows with about the given amount of pixels, so that the index arrays of a dense mask stay small. By default a
+    block has a 64th of the pixels of the mask, but at most 16384, so that the index arrays and the values of a block
+    (32 bytes per pixel) take at most about half the memory of an 8 bit image of the same shape. The packed and run
+    length masks provide the indices of all their pixels at once without being unpacked, because they are meant for
+    sparse masks.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param mask:                An array or a PackedMask or RunLengthMask
+    :param int block_pixels:    The approximate amount of pixels of a block. DEFAULT is None for the size above
+    :return: Generator(Tuple(np.ndarray, np.ndarray))
+    """
+    if not isinstance(mask, np.ndarray) and hasattr(mask, 'nonzero'):
+        yield mask.nonzero()
+        return
+
+    mask = np.asarray(mask)
+    if block_pixels is None:
+        block_pixels = min(2**14, mask.size // 64)
+    step = max(1, block_pixels // max(1, mask.shape[1]))
+    for start in range(0, mask.shape[0], step):
+        rows, columns = np.nonzero(mask[start:start + step])
+        yield rows + start, columns
+
+
+# THE BACKENDS #
+
+
+class NumpyKernelBackend:
+    """
+    The backend, which is always available. Callbacks, that do not support arrays, are called from a loop in the
+    interpreter.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    name = 'numpy'
+
+    def __init__(self):
+        self.sequence_scan_loop = sequence_scan_loop
+        self.masked_transform_loop = masked_transform_loop
+        self.element_transform_loop = element_transform_loop
+        self.pairwise_weights_loop = pairwise_weights_loop
+
+    def loop(self, loop, function, *arguments):
+        """
+        Runs the given loop with the given callback function and arguments. The numba backend overwrites this to run
+        the compiled loop instead.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param loop:        One of the loop functions of this module
+        :param function:    The callback function
+        :param arguments:   The remaining arguments of the loop
+        :return: The return value of the loop
+        """
+        return loop(*((function, ) + arguments))
+
+    @staticmethod
+    def vectorized(function, arguments, shape):
+        """
+        Calls the given function once with the given arrays as arguments and returns the result as an array of the
+        given shape. Returns None, if the function does not support being called with arrays.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param function:
+        :param tuple arguments:
+        :param tuple shape:     The shape the result is supposed to have
+        :return: np.ndarray
+        """
+        try:
+            result = np.asarray(function(*arguments))
+        except (TypeError, ValueError):
+            return None
+
+        # A constant result is fine, but a result of any other shape means, that the function does not actually work
+        # element wise
+        if result.shape != shape and result.ndim != 0:
+            return None
+
+        return np.broadcast_to(result, shape)
+
+    def sequence_scan(self, start_function, stop_function, array, vectorized=False):
+        """
+        Returns the list of the (start, end) tuples of the sequences within the given one dimensional array. A
+        sequence begins at the first element, for which the start function is True and ends at the following element,
+        for which the stop function is True.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param start_function:      A function with the parameters index, value and the whole array
+        :param stop_function:       A function with the parameters index, value and the whole array
+        :param np.ndarray array:
+        :param bool vectorized:     Whether to try calling the functions with the arrays of all indices and values
+        :return: List(Tuple(int, int))
+        """
+        array = np.asarray(array)
+        if len(array) == 0:
+            return []
+
+        starts, stops = None, None
+        if vectorized:
+            indices = np.arange(len(array))
+            starts = self.vectorized(start_function, (indices, array, array), array.shape)
+            stops = self.vectorized(stop_function, (indices, array, array), array.shape)
+
+        if starts is None or stops is None:
+            sequences = np.zeros((len(array) // 2 + 1, 2), np.int64)
+            count = self.loop(self.sequence_scan_loop, start_function, stop_function, array, sequences)
+            return [(int(start), int(end)) for start, end in sequences[:count]]
+
+        # With the flags for all the elements, the sequences can be found by jumping from one to the next with a
+        # binary search instead of visiting each element
+        starts = np.flatnonzero(starts)
+        stops = np.flatnonzero(stops)
+        sequences = []
+        position = 0
+        while True:
+            k = np.searchsorted(starts, position)
+            if k == len(starts):
+                break
+            start = int(starts[k])
+
+            # The stop function is only checked for the elements AFTER the start
+            k = np.searchsorted(stops, start, side='right')
+            if k == len(stops):
+                sequences.append((start, len(array)))
+                break
+            end = int(stops[k])
+
+            sequences.append((start, end))
+            position = end + 1
+
+        return sequences
+
+    def masked_transform(self, function, array, mask, replace=None, vectorized=False):
+        """
+        Returns a new uint8 array, where the given function was applied to each pixel of the given array, where the
+        mask is True. The other pixels are set to the replace value or keep their value, if replace is None.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The pixels of an array mask are transformed in blocks of rows (see "masked_indices"), so that the index arrays
+        of a dense mask do not take many times the memory of the image
+
+        :param function:            A function with the parameters value, row index and column index
+        :param np.ndarray array:    The two dimensional image array
+        :param mask:                An array with the same shape, which evaluates to True for the pixels to transform or
+                                    a PackedMask or RunLengthMask
+        :param replace:             The value for the pixels, that are not masked. DEFAULT is None to keep them
+        :param bool vectorized:     Whether to try calling the function with the arrays of all the masked values and
+                                    indices
+        :return: np.ndarray
+        """
+        if replace is None:
+            new = array.astype(np.uint8)
+        else:
+            new = np.full(array.shape, replace, np.uint8)
+
+        for rows, columns in masked_indices(mask):
+            if len(rows) == 0:
+                continue
+
+            values = None
+            if vectorized:
+                values = self.vectorized(function, (array[rows, columns], rows, columns), rows.shape)
+                # The function does not support arrays, so the remaining blocks do not need to try it either
+                vectorized = values is not None
+            if values is None:
+                values = np.zeros(rows.shape, np.float64)
+                self.loop(self.masked_transform_loop, function, array, rows, columns, values)
+
+            new[rows, columns] = values
+
+        return new
+
+    def element_transform(self, function, array):
+        """
+        Returns a new uint8 array, where the given function was applied to each pixel of the given array. Unlike a
+        masked transformation with a full mask, this does not need the index arrays of all the pixels.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param function:            A function with the parameters value, row index and column index
+        :param np.ndarray array:    The two dimensional image array
+        :return: np.ndarray
+        """
+        new = np.empty(array.shape, np.uint8)
+        values = np.zeros(array.shape[1], np.float64)
+        self.loop(self.element_transform_loop, function, array, new, values)
+        return new
+
+    def pairwise_weights(self, weight_function, distances, sizes, vectorized=False):
+        """
+        Returns the (n, n) matrix of the weights of all the pairs of areas from the given matrices of their distances
+        and combined sizes. Only the upper triangle (i < j) of the matrix is guaranteed to be computed.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param weight_function:         A function with the parameters distance and size
+        :param np.ndarray distances:
+        :param np.ndarray sizes:
+        :param bool vectorized:         Whether to try calling the function with the whole matrices
+        :return: np.ndarray
+        """
+        weights = None
+        if vectorized:
+            weights = self.vectorized(weight_function, (distances, sizes), distances.shape)
+        if weights is None:
+            weights = np.zeros(distances.shape, np.float64)
+            self.loop(self.pairwise_weights_loop, weight_function, distances, sizes, weights)
+
+        return weights
+
+
+def referenced_values(function, instructions):
+    """
+    Returns the current values of the variables of the closure and the globals, which the given function reads.
+    Builtins are not returned.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param function:
+    :param list instructions:   The instructions of the code of the function
+    :return: list
+    """
+    values = [cell.cell_contents for cell in (function.__closure__ or ()) if cell_is_set(cell)]
+    for instruction in instructions:
+        if instruction.opname == 'LOAD_GLOBAL' and instruction.argval in function.__globals__:
+            values.append(function.__globals__[instruction.argval])
+    return values
+
+
+def cell_is_set(cell):
+    try:
+        cell.cell_contents
+    except ValueError:
+        return False
+    return True
+
+
+def is_constant_reference(value):
+    # Modules and functions are effectively constant, everything else might be changed after the compilation
+    return isinstance(value, types.ModuleType) or callable(value)
+
+
+class NumbaKernelBackend(NumpyKernelBackend):
+    """
+    The backend, which compiles the loops together with the callback functions using numba. The compiled callbacks are
+    cached, so callbacks should be defined once and not be created anew for every call. If a callback can not be
+    compiled, the loop falls back to the interpreter.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    name = 'numba'
+
+    def __init__(self):
+        NumpyKernelBackend.__init__(self)
+        import numba
+
+        self.numba = numba
+        self.sequence_scan_loop = numba.njit(sequence_scan_loop)
+        self.masked_transform_loop = numba.njit(masked_transform_loop)
+        self.element_transform_loop = numba.njit(element_transform_loop)
+        self.pairwise_weights_loop = numba.njit(pairwise_weights_loop)
+
+        # Maps the original callback functions to their compiled version or None, if they could not be compiled. The
+        # references are weak, so that callbacks, which are created on the fly do not pile up
+        self.compiled = weakref.WeakKeyDictionary()
+
+    def compile(self, function):
+        """
+        Returns the compiled version of the given function or None, if it can not be compiled.
+        Functions, which assign to variables outside of their own scope are not compiled, because numba freezes these
+        variables as constants, so that the assignments would be lost silently.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Functions, which read variables outside of their own scope (closures and globals), are not compiled either,
+        unless these are modules or functions. numba freezes them as constants at the first call, so a later change of
+        an array, which is read by the callback, would be ignored by the cached compiled version.
+
+        :param function:
+        :return:
+        """
+        # Functions, which have already been decorated by the user
+        if hasattr(function, 'py_func'):
+            return function
+
+        # Builtins and other callable objects can not be compiled (and also not be referenced weakly)
+        code = getattr(function, '__code__', None)
+        if code is None:
+            return None
+
+        if function not in self.compiled:
+            instructions = list(dis.get_instructions(code))
+            if any(i.opname in ('STORE_DEREF', 'STORE_GLOBAL') for i in instructions):
+                self.compiled[function] = None
+            elif not all(is_constant_reference(value) for value in referenced_values(function, instructions)):
+                self.compiled[function] = None
+            else:
+                self.compiled[function] = self.numba.njit(function)
+
+        return self.compiled[function]
+
+    def loop(self, loop, function, *arguments):
+        """
+        Runs the compiled version of the given loop with the compiled callback functions (all the arguments, which are
+        callable). If the compilation fails, the loop is run in the interpreter.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param loop:        One of the compiled loops of this backend
+        :param function:    The callback function
+        :param arguments:   The remaining arguments of the loop
+        :return: The return value of the loop
+        """
+        arguments = (function, ) + arguments
+        compiled_arguments = tuple(self.compile(argument) if callable(argument) else argument for argument in arguments)
+
+        if not any(argument is None for argument in compiled_arguments):
+            try:
+                return loop(*compiled_arguments)
+            except self.numba.core.errors.NumbaError:
+                # The numba decorator compiles lazily, so a callback, which uses unsupported python features only
+                # fails here. It is marked, so that it is not being compiled again
+                for argument in arguments:
+                    if callable(argument):
+                        self.compiled[argument] = None
+
+        return loop.py_func(*arguments)
+
+
+BACKENDS = {
+    'numpy':    NumpyKernelBackend,
+    'numba':    NumbaKernelBackend
+}
+
+# The backend, that is used, when no backend is given explicitly. numba has to be selected explicitly, because it
+# changes the semantics of callbacks, which read variables outside of their own scope (see "NumbaKernelBackend.compile")
+DEFAULT_BACKEND = 'numpy'
+
+_backend_instances = {}
+
+
+def available_backends():
+    """
+    Returns the list of the names of the backends, which can be used in the current environment.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :return: List(str)
+    """
+    names = ['numpy']
+    # Only checking, whether numba is installed without actually importing it, because that takes quite a while
+    if importlib.util.find_spec('numba') is not None:
+        names.append('numba')
+    return names
+
+
+def set_default_backend(name):
+    """
+    Sets the backend, that is used, when no backend is given explicitly. Either "numpy", "numba" or "auto", which
+    chooses numba, if it is installed.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param str name:
+    :return: void
+    """
+    global DEFAULT_BACKEND
+    if name != 'auto':
+        get_backend(name)
+    DEFAULT_BACKEND = name
+
+
+def get_backend(name=None):
+    """
+    Returns the backend object of the given name. Raises a ValueError for an unknown name and an ImportError, if numba
+    is requested, but not installed.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param name:    The name of the backend. DEFAULT is None for the default backend
+    :return: NumpyKernelBackend
+    """
+    if isinstance(name, NumpyKernelBackend):
+        return name
+
+    if name is None:
+        name = DEFAULT_BACKEND
+    if name == 'auto':
+        name = available_backends()[-1]
+
+    if name not in BACKENDS:
+        raise ValueError('There is no kernel backend "{}", only {}'.format(name, ', '.join(BACKENDS.keys())))
+
+    if name not in _backend_instances:
+        _backend_instances[name] = BACKENDS[name]()
+
+    return _backend_instances[name]
+
+
+# THE BENCHMARK #
+
+
+def benchmark_start_function(i, v, a):
+    if v > 100:
+        return True
+    return False
+
+
+def benchmark_stop_function(i, v, a):
+    if v <= 100:
+        return True
+    return False
+
+
+def benchmark_transform_function(value, i, j):
+    if value > 128:
+        return 255 - value
+    return value
+
+
+def benchmark_weight_function(distance, size):
+    if size > 0:
+        return distance + size ** 0.5
+    return distance
+
+
+def benchmark(backends=None, size=512, repeat=3):
+    """
+    Compares the run times of the kernels for the given backends. The benchmark uses callbacks, that can NOT be called
+    with arrays, so that the loops are actually being measured. Returns a dict with the backend names as keys and
+    dicts as values, which map the kernel names to the best time out of the repetitions in seconds.
+    The compilation of the numba backend is done before the measurement.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param backends:    The list of backend names. DEFAULT is None for all the available backends
+    :param int size:    The edge length of the random image
+    :param int repeat:  The amount of repetitions of each kernel
+    :return: dict
+    """
+    random = np.random.RandomState(0)
+    array = random.randint(0, 256, (size, size)).astype(np.uint8)
+    mask = random.rand(size, size) > 0.5
+    profile = array[0].astype(np.float64)
+    distances = random.rand(size // 4, size // 4) * 100
+    sizes = random.rand(size // 4, size // 4) * 1000
+
+    kernels = {
+        'sequence_scan': lambda b: b.sequence_scan(benchmark_start_function, benchmark_stop_function, profile),
+        'masked_transform': lambda b: b.masked_transform(benchmark_transform_function, array, mask),
+        'pairwise_weights': lambda b: b.pairwise_weights(benchmark_weight_function, distances, sizes)
+    }
+
+    results = {}
+    for name in (backends or available_backends()):
+        backend = get_backend(name)
+        results[name] = {}
+        for kernel_name, kernel in kernels.items():
+            kernel(backend)
+            times = []
+            for i in range(repeat):
+                start = time.perf_counter()
+                kernel(backend)
+                times.append(time.perf_counter() - start)
+            results[name][kernel_name] = min(times)
+
+    return results
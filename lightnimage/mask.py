@@ -0,0 +1,828 @@
+# 19.10.2026
+# Compact representations for the binary masks of the lightning. After the preprocessing usually well under one percent
+# of the pixels of a frame are lit, so storing and processing the whole dense array is mostly wasted effort. And the
+# static exclusion masks of the regions of a camera, which are never searched for lightning.
+import numpy as np
+
+
+class RunLengthMask:
+    """
+    The problem:
+    After the preprocessing only very few pixels of a frame are white, but all the later steps (row and column sums, the
+    area checks) still process the whole dense array.
+
+    This class stores only the horizontal runs of lit pixels: For each run the row, the start column and the (exclusive)
+    end column. The runs are sorted by row and then by column and an additional offset array points to the first run of
+    each row. All the queries work on the runs directly, so the memory and the computation scale with the amount of
+    lit pixels instead of the size of the frame.
+
+    All the lit pixels have the same value (255 by DEFAULT), so that the sums and averages are the same, as they would
+    be for the dense binary image. The mask can be passed to the SimpleAreaSegmentationEngine and the
+    CustomSequenceAreaSegmentationEngine instead of a LightningImage.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    # The amount of rows, which are encoded at once, so that the temporary arrays of the encoding stay small
+    CHUNK_ROWS = 256
+
+    def __init__(self, shape, rows, starts, ends, value=255):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param tuple shape:         The (height, width) shape of the frame
+        :param np.ndarray rows:     The row of each run
+        :param np.ndarray starts:   The first column of each run
+        :param np.ndarray ends:     The column after the last column of each run
+        :param int value:           The value of the lit pixels. DEFAULT is 255
+        """
+        self.shape = tuple(shape)
+        self.height, self.width = self.shape
+        self.value = value
+
+        self.rows = np.asarray(rows, np.int32)
+        self.starts = np.asarray(starts, np.int32)
+        self.ends = np.asarray(ends, np.int32)
+
+        # The runs of the row i are the runs from offsets[i] to offsets[i + 1]
+        self.offsets = np.zeros(self.height + 1, np.int64)
+        np.cumsum(np.bincount(self.rows, minlength=self.height), out=self.offsets[1:])
+
+    @classmethod
+    def from_array(cls, array, threshold=1, value=255):
+        """
+        Creates the run length mask of all the pixels of the given array, which are bigger or equal to the threshold.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:    The two dimensional image array
+        :param threshold:           The smallest value of a lit pixel. DEFAULT is 1 for all the non zero pixels
+        :param int value:           The value of the lit pixels within the mask. DEFAULT is 255
+        :return: RunLengthMask
+        """
+        height, width = array.shape
+        rows, starts, ends = [], [], []
+        padded = np.zeros((min(cls.CHUNK_ROWS, height), width + 2), np.int8)
+
+        for chunk_start in range(0, height, cls.CHUNK_ROWS):
+            chunk = array[chunk_start:chunk_start + cls.CHUNK_ROWS]
+            chunk_padded = padded[:len(chunk)]
+            # The columns left and right of the image stay 0, so that every run has a rising and a falling edge
+            np.greater_equal(chunk, threshold, out=chunk_padded[:, 1:-1], casting='unsafe')
+
+            edges = np.diff(chunk_padded, axis=1)
+            start_rows, start_columns = np.nonzero(edges == 1)
+            ends.append(np.nonzero(edges == -1)[1])
+            rows.append(start_rows + chunk_start)
+            starts.append(start_columns)
+
+        return cls(array.shape, np.concatenate(rows), np.concatenate(starts), np.concatenate(ends), value)
+
+    @classmethod
+    def from_image(cls, lightning_image, threshold=1, value=255):
+        """
+        Creates the run length mask of all the pixels of the given image, which are bigger or equal to the threshold.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param threshold:   The smallest value of a lit pixel. DEFAULT is 1 for all the non zero pixels
+        :param int value:   The value of the lit pixels within the mask. DEFAULT is 255
+        :return: RunLengthMask
+        """
+        return cls.from_array(lightning_image.array, threshold, value)
+
+    def __len__(self):
+        """
+        The amount of runs
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return len(self.rows)
+
+    @property
+    def lengths(self):
+        """
+        The amount of pixels of each run
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: np.ndarray
+        """
+        return self.ends - self.starts
+
+    @property
+    def nbytes(self):
+        """
+        The amount of bytes needed to store the mask
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.rows.nbytes + self.starts.nbytes + self.ends.nbytes + self.offsets.nbytes
+
+    def to_array(self, dtype=np.uint8):
+        """
+        Returns the dense array of the mask, where the lit pixels have the value of the mask and all the others are 0.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dtype:
+        :return: np.ndarray
+        """
+        # Marking the start and the end of each run in the flattened array and summing up these marks fills the runs
+        marks = np.zeros(self.height * self.width + 1, np.int32)
+        flat_rows = self.rows.astype(np.int64) * self.width
+        np.add.at(marks, flat_rows + self.starts, 1)
+        np.add.at(marks, flat_rows + self.ends, -1)
+        lit = np.cumsum(marks[:-1]).reshape(self.shape) > 0
+        return (lit * self.value).astype(dtype)
+
+    def count(self, area=None):
+        """
+        Returns the amount of lit pixels within the given area. Like in "average_2d" the area indices are inclusive.
+        Only the runs of the rows of the area are being visited.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param area:    The area tuple ((x_start, x_end), (y_start, y_end)). DEFAULT is None for the whole mask
+        :return: int
+        """
+        if area is None:
+            return int(np.sum(self.lengths, dtype=np.int64))
+
+        (x_start, x_end), (y_start, y_end) = area
+        first = self.offsets[max(0, y_start)]
+        last = self.offsets[min(self.height, y_end + 1)]
+
+        # Clipping all the runs of these rows to the columns of the area. Runs outside of the area get negative lengths
+        lengths = np.minimum(self.ends[first:last], x_end + 1) - np.maximum(self.starts[first:last], x_start)
+        return int(np.sum(lengths[lengths > 0], dtype=np.int64))
+
+    def average(self, area=None):
+        """
+        Returns the average value within the given area, the same as "average_2d" of the dense array would. The area
+        indices are inclusive.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param area:    The area tuple ((x_start, x_end), (y_start, y_end)). DEFAULT is None for the whole mask
+        :return: float
+        """
+        if area is None:
+            size = self.height * self.width
+        else:
+            (x_start, x_end), (y_start, y_end) = area
+            size = (min(self.width, x_end + 1) - max(0, x_start)) * (min(self.height, y_end + 1) - max(0, y_start))
+
+        if size <= 0:
+            return float('nan')
+
+        return self.count(area) * self.value / size
+
+    def directional_sum(self, axis, scale=None):
+        """
+        Calculates the sums of the values of either the rows or the columns, the same as
+        "LightningImage.directional_sum" would for the dense image.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int axis:    Either 0 or 1. A 1 would be the sum of all rows and 0 the sum of all columns
+        :param scale:       The new maximum value to scale the sums to. DEFAULT is None for no scaling
+        :return: np.ndarray
+        """
+        if axis == 0:
+            sums = np.bincount(self.rows, weights=self.lengths, minlength=self.height)
+        else:
+            # Each run adds one to all the columns from its start to its end. So instead of visiting every column of
+            # every run, only the start and end are marked and then summed up
+            marks = np.zeros(self.width + 1, np.int64)
+            np.add.at(marks, self.starts, 1)
+            np.add.at(marks, self.ends, -1)
+            sums = np.cumsum(marks[:-1]).astype(np.float64)
+
+        sums = sums * self.value
+        if scale is not None:
+            sums = sums / np.amax(sums) * scale
+
+        return sums
+
+    def row_sum(self, scale=None):
+        """
+        The same as "LightningImage.row_sum": An array with as many elements as the mask is wide.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param scale:
+        :return: np.ndarray
+        """
+        return self.directional_sum(1, scale)
+
+    def column_sum(self, scale=None):
+        """
+        The same as "LightningImage.column_sum": An array with as many elements as the mask is high.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param scale:
+        :return: np.ndarray
+        """
+        return self.directional_sum(0, scale)
+
+    def bounding_box(self):
+        """
+        Returns the bounding box of all the lit pixels as the area tuple ((x_start, x_end), (y_start, y_end)) with
+        exclusive ends like the areas of the segmentation engines or None, if there are no lit pixels.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The ends are exclusive instead of inclusive
+
+        :return: tuple
+        """
+        if len(self) == 0:
+            return None
+
+        # The runs are sorted by row, so the first and last row are simply the first and the last run
+        return (
+            (int(np.amin(self.starts)), int(np.amax(self.ends))),
+            (int(self.rows[0]), int(self.rows[-1]) + 1)
+        )
+
+    def connected_runs(self, connectivity=8):
+        """
+        Labels the runs by the connected component of lit pixels they belong to. Two runs are connected, if they are in
+        neighbouring rows and overlap (or touch diagonally for the connectivity 8). Returns an array with a label for
+        each run, the labels are numbered from 0 without gaps.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int connectivity:    Either 4 or 8. DEFAULT is 8
+        :return: np.ndarray
+        """
+        if len(self) == 0:
+            return np.zeros(0, np.int64)
+
+        diagonal = 1 if connectivity == 8 else 0
+
+        # Finding the overlapping runs of the next row with a binary search. Combining the row and the column into one
+        # key makes the keys of all the runs one sorted array, so all the searches are done at once
+        stride = np.int64(self.width + 2)
+        rows = self.rows.astype(np.int64)
+        start_keys = rows * stride + self.starts
+        end_keys = rows * stride + self.ends
+        # The first run of the next row, which ends after the start and the run after the last run of the next row,
+        # which starts before the end
+        first = np.searchsorted(end_keys, (rows + 1) * stride + self.starts - diagonal, side='right')
+        last = np.searchsorted(start_keys, (rows + 1) * stride + self.ends + diagonal, side='left')
+
+        counts = np.maximum(last - first, 0)
+        pairs_a = np.repeat(np.arange(len(self)), counts)
+        # The index of each pair within the pairs of its run is added to the first overlapping run
+        pairs_b = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(np.sum(counts))
+
+        # Propagating the smallest run index through the connected runs, until nothing changes anymore
+        labels = np.arange(len(self))
+        while True:
+            minimum = np.minimum(labels[pairs_a], labels[pairs_b])
+            new_labels = labels.copy()
+            np.minimum.at(new_labels, pairs_a, minimum)
+            np.minimum.at(new_labels, pairs_b, minimum)
+            new_labels = new_labels[new_labels]
+            if np.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+
+        return np.unique(labels, return_inverse=True)[1].ravel()
+
+    def component_areas(self, connectivity=8):
+        """
+        Returns the list of the bounding boxes of all the connected components of lit pixels. The areas are tuples
+        ((x_start, x_end), (y_start, y_end)) with exclusive ends like the areas of the segmentation engines, ordered by
+        the first run of the component.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The ends are exclusive instead of inclusive
+
+        :param int connectivity:    Either 4 or 8. DEFAULT is 8
+        :return: List(tuple)
+        """
+        labels = self.connected_runs(connectivity)
+        if len(labels) == 0:
+            return []
+
+        count = np.amax(labels) + 1
+        x_min = np.full(count, self.width, np.int64)
+        x_max = np.zeros(count, np.int64)
+        y_min = np.full(count, self.height, np.int64)
+        y_max = np.zeros(count, np.int64)
+        np.minimum.at(x_min, labels, self.starts)
+        np.maximum.at(x_max, labels, self.ends)
+        np.minimum.at(y_min, labels, self.rows)
+        np.maximum.at(y_max, labels, self.rows)
+
+        return [
+            ((int(x_min[i]), int(x_max[i])), (int(y_min[i]), int(y_max[i]) + 1))
+            for i in range(count)
+        ]
+
+    def nonzero(self):
+        """
+        Returns the row and the column indices of all the lit pixels in row major order, like "np.nonzero" of the
+        dense array. This way the mask can be used for "LightningImage.transform_masked".
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: Tuple(np.ndarray, np.ndarray)
+        """
+        lengths = self.lengths
+        rows = np.repeat(self.rows.astype(np.int64), lengths)
+        # The offset of each pixel within its run is added to the start of the run
+        columns = np.repeat(self.starts.astype(np.int64) - np.cumsum(lengths) + lengths, lengths) + np.arange(len(rows))
+        return rows, columns
+
+
+# The amount of set bits for every possible byte value
+POPCOUNT = np.array([bin(i).count('1') for i in range(256)], np.uint8)
+
+
+class PackedMask:
+    """
+    The problem:
+    The masks returned by "LightningImage.get_mask" use a whole byte for each pixel, which only is either 0 or 1. So
+    they take eight times the memory they would need and archiving the masks for training or auditing takes a lot of
+    space.
+
+    This class stores a binary mask with a single bit per pixel. Each row is packed into bytes separately (with
+    "np.packbits"), so the rows stay aligned and the bits, which pad the last byte of a row are always 0. The logical
+    operations, the counts and the bounding box are computed on the packed bytes directly.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+
+    def __init__(self, words, shape):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray words:    The uint8 array of the shape (height, ceil(width / 8)) with the packed rows
+        :param tuple shape:         The (height, width) shape of the mask
+        """
+        self.words = words
+        self.shape = tuple(int(length) for length in shape)
+        self.height, self.width = self.shape
+
+    @classmethod
+    def from_array(cls, array, threshold=1):
+        """
+        Creates the packed mask of all the pixels of the given array, which are bigger or equal to the threshold.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :param threshold:   The smallest value of a lit pixel. DEFAULT is 1 for all the non zero pixels
+        :return: PackedMask
+        """
+        return cls(np.packbits(np.asarray(array) >= threshold, axis=1), array.shape)
+
+    @classmethod
+    def from_mask(cls, mask):
+        """
+        Creates the packed mask from a mask of 0 and 1 (or False and True) values, as it is returned by
+        "LightningImage.get_mask".
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray mask:
+        :return: PackedMask
+        """
+        return cls(np.packbits(np.asarray(mask) != 0, axis=1), mask.shape)
+
+    def to_mask(self):
+        """
+        Returns the dense uint8 mask of 0 and 1 values in the same format as "LightningImage.get_mask".
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: np.ndarray
+        """
+        return np.unpackbits(self.words, axis=1, count=self.width)
+
+    @property
+    def nbytes(self):
+        """
+        The amount of bytes of the packed mask
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.words.nbytes
+
+    def check_shape(self, other):
+        """
+        Raises a ValueError, if the other mask does not have the same shape
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param PackedMask other:
+        :return: void
+        """
+        if self.shape != other.shape:
+            raise ValueError('The masks of the shapes {} and {} can not be combined'.format(self.shape, other.shape))
+
+    def __and__(self, other):
+        self.check_shape(other)
+        return PackedMask(np.bitwise_and(self.words, other.words), self.shape)
+
+    def __or__(self, other):
+        self.check_shape(other)
+        return PackedMask(np.bitwise_or(self.words, other.words), self.shape)
+
+    def __xor__(self, other):
+        self.check_shape(other)
+        return PackedMask(np.bitwise_xor(self.words, other.words), self.shape)
+
+    def __invert__(self):
+        words = np.invert(self.words)
+        # The bits, which pad the last byte of each row have to stay 0, otherwise they would be counted
+        padding = self.words.shape[1] * 8 - self.width
+        if padding:
+            words[:, -1] &= np.uint8((0xFF << padding) & 0xFF)
+        return PackedMask(words, self.shape)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedMask) and self.shape == other.shape and np.array_equal(self.words, other.words)
+
+    def count(self, area=None):
+        """
+        Returns the amount of set bits (the popcount) within the given area. The area indices are inclusive, like in
+        "average_2d". Only the bytes covering the area are being counted, the bits of the first and the last byte,
+        which are outside of the area are masked.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param area:    The area tuple ((x_start, x_end), (y_start, y_end)). DEFAULT is None for the whole mask
+        :return: int
+        """
+        if area is None:
+            return int(np.sum(POPCOUNT[self.words], dtype=np.int64))
+
+        (x_start, x_end), (y_start, y_end) = area
+        x_start, x_end = max(0, x_start), min(self.width - 1, x_end)
+        y_start, y_end = max(0, y_start), min(self.height - 1, y_end)
+        if x_start > x_end or y_start > y_end:
+            return 0
+
+        words = self.words[y_start:y_end + 1, x_start // 8:x_end // 8 + 1].copy()
+        # The bits are packed with the first pixel in the most significant bit
+        words[:, 0] &= np.uint8(0xFF >> (x_start % 8))
+        words[:, -1] &= np.uint8((0xFF << (7 - x_end % 8)) & 0xFF)
+        return int(np.sum(POPCOUNT[words], dtype=np.int64))
+
+    def bounding_box(self):
+        """
+        Returns the bounding box of all the set bits as the area tuple ((x_start, x_end), (y_start, y_end)) with
+        exclusive ends like the areas of the segmentation engines or None, if no bit is set.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The ends are exclusive instead of inclusive
+
+        :return: tuple
+        """
+        rows = np.flatnonzero(np.any(self.words, axis=1))
+        if len(rows) == 0:
+            return None
+
+        # Combining all the rows into one, which has a bit set for every column, that has a set bit in any row. Only
+        # this single row has to be unpacked
+        columns = np.flatnonzero(np.unpackbits(np.bitwise_or.reduce(self.words, axis=0), count=self.width))
+        return (int(columns[0]), int(columns[-1]) + 1), (int(rows[0]), int(rows[-1]) + 1)
+
+    def nonzero(self):
+        """
+        Returns the row and the column indices of all the set bits in row major order, like "np.nonzero" of the dense
+        mask. Only the bytes, which have any bits set are being unpacked. This way the mask can be used for
+        "LightningImage.transform_masked".
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: Tuple(np.ndarray, np.ndarray)
+        """
+        word_rows, word_columns = np.nonzero(self.words)
+        bits = np.unpackbits(self.words[word_rows, word_columns][:, np.newaxis], axis=1)
+        indices, positions = np.nonzero(bits)
+        return word_rows[indices], word_columns[indices] * 8 + positions
+
+    def save(self, path):
+        """
+        Saves the mask as a compressed numpy archive. Because the sparse masks mostly consist of zero bytes, they
+        compress very well.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :return: void
+        """
+        with open(path, mode='wb') as file:
+            np.savez_compressed(file, words=self.words, shape=np.array(self.shape, np.int64))
+
+    @classmethod
+    def load(cls, path):
+        """
+        Loads a mask, which was saved with "save".
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :return: PackedMask
+        """
+        with np.load(path) as archive:
+            return cls(archive['words'], archive['shape'])
+
+
+# The burned in overlays of the aragats camera, which change from frame to frame: The clock in the upper left corner,
+# the date and the time in the lower right corner and the name of the camera in the lower left corner
+ARAGATS_OVERLAYS = [
+    ((0, 328), (0, 24)),
+    ((-152, None), (-48, None)),
+    ((0, 208), (-24, None))
+]
+
+
+class ExclusionMask:
+    """
+    The problem:
+    The frames of a camera carry burned in overlays like timestamps, which change from frame to frame and thus show up
+    in the difference to the reference. They were filtered out after the segmentation by the position of the areas,
+    so they still cost computing time and still polluted the row and column sums of the segmentation.
+
+    This class describes the static regions of a camera, which are excluded from the detection: A list of rectangles
+    and/or a bitmap. The pixels of the excluded regions are set to 0 in the preprocessed difference, before any of the
+    sums are computed. The rectangles are given in the area format with exclusive ends like the areas of the
+    segmentation engines. Negative indices count from the end and None reaches to the border, so that the rectangles
+    in the corners do not depend on the size of the frame. The bitmap has to have the shape of the frames and is non
+    zero for the excluded pixels.
+
+    Everything, which depends on the shape of the frames, is computed only once for each shape. Additionally the
+    region, which is left after the exclusion, can be used to crop the frames, so that the excluded borders are not
+    processed at all.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The ends of the rectangles are exclusive instead of inclusive and can be None for the border
+    """
+    def __init__(self, rectangles=(), bitmap=None):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param list rectangles:     The list of the excluded ((x_start, x_end), (y_start, y_end)) rectangles with
+                                    exclusive ends. DEFAULT is an empty tuple
+        :param bitmap:              A np.ndarray or a PackedMask, which is non zero for the excluded pixels. DEFAULT is
+                                    None for none
+        """
+        self.rectangles = [
+            tuple(tuple(None if index is None else int(index) for index in axis) for axis in rectangle)
+            for rectangle in rectangles
+        ]
+        if isinstance(bitmap, PackedMask):
+            bitmap = bitmap.to_mask()
+        self.bitmap = None if bitmap is None else np.asarray(bitmap) != 0
+
+        # Maps the shapes to the dicts of the bounds, the mask and the region computed for them
+        self.cache = {}
+
+    @classmethod
+    def create(cls, value):
+        """
+        Creates the exclusion mask from the value of a config: None for no exclusion mask, an ExclusionMask, which is
+        returned as it is, or a list of rectangles.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param value:
+        :return: ExclusionMask
+        """
+        if value is None or isinstance(value, cls):
+            return value
+        return cls(value)
+
+    @staticmethod
+    def position(index, length, default):
+        """
+        Returns the position within an axis of the given length for the given index of a rectangle: Negative indices
+        count from the end and None is the given default.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int index:
+        :param int length:
+        :param int default:
+        :return: int
+        """
+        if index is None:
+            return default
+        return index + length if index < 0 else index
+
+    def prepare(self, shape):
+        """
+        Returns the dict of everything, which is derived from the given frame shape:
+        - bounds:   The list of (row start, row end, column start, column end) tuples of the rectangles with exclusive
+                    ends, clipped to the shape
+        - mask:     The read only bool array of the excluded pixels, or None if there is no bitmap
+        - region:   The tuple of the row slice and the column slice of the smallest region, which contains all the
+                    pixels, that are not excluded
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param tuple shape: The (height, width) of the frames
+        :return: dict
+        """
+        shape = tuple(int(length) for length in shape[-2:])
+        if shape in self.cache:
+            return self.cache[shape]
+
+        height, width = shape
+        bounds = []
+        for (x_start, x_end), (y_start, y_end) in self.rectangles:
+            x_start, x_end = max(self.position(x_start, width, 0), 0), min(self.position(x_end, width, width), width)
+            y_start = max(self.position(y_start, height, 0), 0)
+            y_end = min(self.position(y_end, height, height), height)
+            if x_start < x_end and y_start < y_end:
+                bounds.append((y_start, y_end, x_start, x_end))
+
+        mask = None
+        if self.bitmap is not None:
+            if self.bitmap.shape != shape:
+                raise ValueError('The bitmap has the shape {}, but the frames have the shape {}'.format(
+                    self.bitmap.shape,
+                    shape
+                ))
+            mask = self.bitmap.copy()
+            for y_start, y_end, x_start, x_end in bounds:
+                mask[y_start:y_end, x_start:x_end] = True
+            mask.setflags(write=False)
+
+        # The region is found from the excluded rows and columns. Only whole excluded rows and columns at the borders
+        # can be cropped away
+        excluded = mask
+        if excluded is None:
+            excluded = np.zeros(shape, bool)
+            for y_start, y_end, x_start, x_end in bounds:
+                excluded[y_start:y_end, x_start:x_end] = True
+        rows = np.flatnonzero(~np.all(excluded, axis=1))
+        columns = np.flatnonzero(~np.all(excluded, axis=0))
+        if len(rows) == 0:
+            region = (slice(0, 0), slice(0, 0))
+        else:
+            region = (slice(int(rows[0]), int(rows[-1]) + 1), slice(int(columns[0]), int(columns[-1]) + 1))
+
+        self.cache[shape] = {'bounds': bounds, 'mask': mask, 'region': region}
+        return self.cache[shape]
+
+    def region(self, shape):
+        """
+        Returns the tuple of the row slice and the column slice of the working region of the given frame shape, which
+        is left after the exclusion.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param tuple shape:
+        :return: Tuple(slice, slice)
+        """
+        return self.prepare(shape)['region']
+
+    def crop(self, array):
+        """
+        Returns the view of the working region of the given array. The frames are the last two axes of the array, so a
+        whole stack of frames can be cropped at once.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :return: np.ndarray
+        """
+        return array[(Ellipsis, ) + self.region(array.shape)]
+
+    def apply(self, array, shape=None, replace=0):
+        """
+        Sets all the excluded pixels of the given array to the replace value in place. The frames are the last two axes
+        of the array. The rectangles are set with slices, only a bitmap needs a pass over the whole array.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :param tuple shape:     The (height, width) of the whole frames, if the array has already been cropped to the
+                                working region. DEFAULT is None for the shape of the array
+        :param replace:         DEFAULT is 0
+        :return: np.ndarray
+        """
+        prepared = self.prepare(array.shape if shape is None else shape)
+        # The offset of the cropped array within the whole frame
+        row_offset, column_offset = 0, 0
+        if shape is not None:
+            row_offset, column_offset = prepared['region'][0].start, prepared['region'][1].start
+
+        if prepared['mask'] is not None:
+            mask = prepared['mask'] if shape is None else prepared['mask'][prepared['region']]
+            np.copyto(array, replace, where=mask)
+            return array
+
+        for y_start, y_end, x_start, x_end in prepared['bounds']:
+            array[
+                ...,
+                max(y_start - row_offset, 0):max(y_end - row_offset, 0),
+                max(x_start - column_offset, 0):max(x_end - column_offset, 0)
+            ] = replace
+        return array
+
+
+# The exclusion mask of the aragats camera. It is shared, so that its cache is shared as well
+ARAGATS_EXCLUSION = ExclusionMask(ARAGATS_OVERLAYS)
@@ -0,0 +1,133 @@
+# 19.10.2026
+# Measuring the memory, which is needed by a single operation, for the memory regression tests and the evaluation of
+# the engines. The allocations of python and numpy are traced with tracemalloc, which finds the exact peak of the
+# memory allocated during the operation. Additionally the resident set size of the process is sampled by a
+# background thread, which also catches the memory, that is allocated outside of the traced allocators.
+import os
+import time
+import threading
+import tracemalloc
+
+
+def resident_set_size():
+    """
+    Returns the current resident set size of the process in bytes or None, if it can not be determined on this
+    platform.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :return: int
+    """
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ResidentSetSampler:
+    """
+    Samples the resident set size of the process on a background thread and keeps the maximum. Used as a context
+    manager.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, interval=0.001):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float interval:  The amount of seconds between two samples. DEFAULT is 0.001
+        """
+        self.interval = interval
+        self.baseline = None
+        self.peak = None
+
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        size = resident_set_size()
+        if size is not None and (self.peak is None or size > self.peak):
+            self.peak = size
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.sample()
+
+    def __enter__(self):
+        self.baseline = resident_set_size()
+        self.peak = self.baseline
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.sample()
+        self.stopped.set()
+        self.thread.join()
+
+    @property
+    def extra(self):
+        """
+        The maximum amount of bytes, by which the resident set size exceeded the size at the start, or None if the
+        resident set size is not available
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        if self.baseline is None:
+            return None
+        return self.peak - self.baseline
+
+
+def measure_memory(function, *args, **kwargs):
+    """
+    Calls the given function with the given arguments and measures its memory. Returns a tuple of the result of the
+    function and a dict with:
+    - traced_peak:  The peak amount of bytes traced by tracemalloc during the call, above the amount at the start
+    - traced_kept:  The amount of traced bytes, which are still allocated after the call (including the result)
+    - rss_peak:     The peak increase of the resident set size (or None, if it is not available)
+    - seconds:      The duration of the call
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param function:
+    :return: Tuple(result, dict)
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+
+        with ResidentSetSampler() as sampler:
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            seconds = time.perf_counter() - start
+
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if not tracing:
+            tracemalloc.stop()
+
+    return result, {
+        'traced_peak':  peak - baseline,
+        'traced_kept':  current - baseline,
+        'rss_peak':     sampler.extra,
+        'seconds':      seconds
+    }
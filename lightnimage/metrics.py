@@ -0,0 +1,500 @@
+# 19.10.2026
+# The metrics of long running detections: Counters, gauges and latency histograms, which are fed by the detection
+# stages, the batch runner and the detection service. They can be exported in the Prometheus text format (as a file
+# for the textfile collector or at the "/metrics" endpoint of the service) and as JSON snapshots. Only the standard
+# library is used, so that the metrics can be imported everywhere.
+import os
+import json
+import time
+import bisect
+import threading
+from collections import OrderedDict
+
+
+# The default histogram buckets for latencies in seconds
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# The default histogram buckets for counts, for example the amount of candidate areas per frame
+COUNT_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256)
+
+
+class Counter:
+    """
+    A value, which only ever increases, for example the amount of processed frames
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    TYPE = 'counter'
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+
+    def inc(self, amount=1):
+        """
+        Increases the counter by the given amount
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param amount:  DEFAULT is 1
+        :return: void
+        """
+        with self.lock:
+            self.value += amount
+
+    def samples(self):
+        """
+        Returns the list of the (suffix, extra labels, value) tuples of the metric for the export
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: list
+        """
+        return [('', (), self.value)]
+
+    def snapshot(self):
+        return self.value
+
+
+class Gauge(Counter):
+    """
+    A value, which can go up and down, for example the depth of a queue
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    TYPE = 'gauge'
+
+    def set(self, value):
+        """
+        Sets the gauge to the given value
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param value:
+        :return: void
+        """
+        self.value = value
+
+    def dec(self, amount=1):
+        self.inc(-amount)
+
+
+class Histogram:
+    """
+    Counts the observed values in a fixed set of buckets, for example the latencies of a stage. An observation only
+    needs a binary search over the bucket bounds and an increment, so it can be used in the hot paths. The sum and the
+    count of all the observed values are kept as well.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    TYPE = 'histogram'
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param buckets:     The ascending upper bounds of the buckets. DEFAULT is LATENCY_BUCKETS
+        """
+        self.buckets = tuple(buckets)
+        # The last count is for the values above the largest bound
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        """
+        Adds an observed value
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float value:
+        :return: void
+        """
+        index = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self):
+        """
+        Returns a context manager, which observes the amount of seconds spent within it
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: Timer
+        """
+        return Timer(self)
+
+    def samples(self):
+        with self.lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+
+        samples = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'), ), counts):
+            cumulative += bucket_count
+            samples.append(('_bucket', (('le', format_value(bound)), ), cumulative))
+        samples.append(('_sum', (), total))
+        samples.append(('_count', (), count))
+        return samples
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'buckets':  dict(zip([format_value(bound) for bound in self.buckets + (float('inf'), )], self.counts)),
+                'sum':      self.sum,
+                'count':    self.count
+            }
+
+
+class Timer:
+    """
+    The context manager of "Histogram.time"
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, histogram):
+        self.histogram = histogram
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+def format_value(value):
+    """
+    Formats a number for the Prometheus text format
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param value:
+    :return: str
+    """
+    if value == float('inf'):
+        return '+Inf'
+    if value == float('-inf'):
+        return '-Inf'
+    if isinstance(value, float) and value.is_integer():
+        return '{:.1f}'.format(value)
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def format_labels(labels):
+    """
+    Formats the tuple of (name, value) label tuples for the Prometheus text format
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param tuple labels:
+    :return: str
+    """
+    if not labels:
+        return ''
+    escaped = [
+        (name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in labels
+    ]
+    return '{' + ','.join('{}="{}"'.format(name, value) for name, value in escaped) + '}'
+
+
+class MetricsRegistry:
+    """
+    The problem:
+    A long running detection gave no insight into its throughput, its latencies or the amount of candidates the
+    engines produced, so drops of the throughput or regressions of the config went unnoticed.
+
+    This registry holds named metric families. Every family has a type, a help text and one metric for each
+    combination of label values. The metrics are created on their first use, so the code, which feeds them, just asks
+    the registry for the metric by name and labels:
+
+        registry.counter('frames_total', 'The processed frames', {'status': 'skipped'}).inc()
+
+    The module level REGISTRY is the default registry, which is used by the runner and the service.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, prefix='lightnimage_'):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str prefix:  The prefix of all the metric names. DEFAULT is "lightnimage_"
+        """
+        self.prefix = prefix
+        # Maps the names to the families, which are dicts with the type, the help, the arguments and the metrics
+        self.families = OrderedDict()
+        self.lock = threading.Lock()
+
+    def metric(self, cls, name, help, labels, arguments=()):
+        """
+        Returns the metric of the given class with the given name and labels, creating it if it does not exist yet
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param cls:
+        :param str name:
+        :param str help:
+        :param dict labels:
+        :param tuple arguments: The arguments for creating a new metric
+        :return: The metric
+        """
+        name = self.prefix + name
+        key = tuple(sorted((labels or {}).items()))
+
+        family = self.families.get(name)
+        if family is not None and key in family['metrics']:
+            return family['metrics'][key]
+
+        with self.lock:
+            family = self.families.setdefault(name, {'type': cls.TYPE, 'help': help, 'metrics': OrderedDict()})
+            if family['type'] != cls.TYPE:
+                raise ValueError('The metric {} is a {}, not a {}'.format(name, family['type'], cls.TYPE))
+            if key not in family['metrics']:
+                family['metrics'][key] = cls(*arguments)
+            return family['metrics'][key]
+
+    def counter(self, name, help='', labels=None):
+        """
+        Returns the counter with the given name and labels
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:    The name without the prefix of the registry
+        :param str help:    The description of the metric
+        :param dict labels: The dict of the label names and values. DEFAULT is None for no labels
+        :return: Counter
+        """
+        return self.metric(Counter, name, help, labels)
+
+    def gauge(self, name, help='', labels=None):
+        """
+        Returns the gauge with the given name and labels
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param str help:
+        :param dict labels:
+        :return: Gauge
+        """
+        return self.metric(Gauge, name, help, labels)
+
+    def histogram(self, name, help='', labels=None, buckets=LATENCY_BUCKETS):
+        """
+        Returns the histogram with the given name and labels
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param str help:
+        :param dict labels:
+        :param buckets:     The upper bounds of the buckets of a new histogram. DEFAULT is LATENCY_BUCKETS
+        :return: Histogram
+        """
+        return self.metric(Histogram, name, help, labels, (buckets, ))
+
+    def clear(self):
+        """
+        Removes all the metrics
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        with self.lock:
+            self.families.clear()
+
+    def to_prometheus(self):
+        """
+        Returns all the metrics in the Prometheus text exposition format
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: str
+        """
+        lines = []
+        with self.lock:
+            families = [(name, family, list(family['metrics'].items())) for name, family in self.families.items()]
+
+        for name, family, metrics in families:
+            lines.append('# HELP {} {}'.format(name, family['help'].replace('\\', '\\\\').replace('\n', '\\n')))
+            lines.append('# TYPE {} {}'.format(name, family['type']))
+            for key, metric in metrics:
+                for suffix, extra, value in metric.samples():
+                    lines.append('{}{}{} {}'.format(name, suffix, format_labels(key + extra), format_value(value)))
+
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self):
+        """
+        Returns a JSON serializable dict with the current values of all the metrics. Each name maps to a list of dicts
+        with the labels and the value of each metric of the family.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: dict
+        """
+        with self.lock:
+            families = [(name, list(family['metrics'].items())) for name, family in self.families.items()]
+
+        return {
+            name: [{'labels': dict(key), 'value': metric.snapshot()} for key, metric in metrics]
+            for name, metrics in families
+        }
+
+    def write_prometheus(self, path):
+        """
+        Writes the metrics in the Prometheus text format into the file with the given path. The file is replaced
+        atomically, so that a collector never reads a partial file.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :return: void
+        """
+        temp_path = '{}.tmp'.format(path)
+        with open(temp_path, mode='w') as file:
+            file.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def write_snapshot(self, path):
+        """
+        Appends the snapshot together with the current time as one JSON line to the file with the given path
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :return: void
+        """
+        with open(path, mode='a') as file:
+            file.write(json.dumps({'time': time.time(), 'metrics': self.snapshot()}) + '\n')
+
+
+REGISTRY = MetricsRegistry()
+
+
+class MetricsExporter:
+    """
+    Periodically writes the metrics of a registry into a Prometheus text file and/or appends JSON snapshots to a file
+    on a background thread.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, registry=None, prometheus_path=None, snapshot_path=None, interval=10.0):
+        """
+        The constructor. Starts the background thread.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param MetricsRegistry registry:    DEFAULT is None for the module level REGISTRY
+        :param str prometheus_path:         The path of the Prometheus text file. DEFAULT is None for none
+        :param str snapshot_path:           The path of the JSON lines file of the snapshots. DEFAULT is None for none
+        :param float interval:              The amount of seconds between two exports. DEFAULT is 10
+        """
+        self.registry = registry or REGISTRY
+        self.prometheus_path = prometheus_path
+        self.snapshot_path = snapshot_path
+        self.interval = interval
+
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def export(self):
+        """
+        Writes the metrics once
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        if self.prometheus_path is not None:
+            self.registry.write_prometheus(self.prometheus_path)
+        if self.snapshot_path is not None:
+            self.registry.write_snapshot(self.snapshot_path)
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self.export()
+
+    def stop(self):
+        """
+        Stops the background thread and writes the metrics a last time
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.stopped.set()
+        self.thread.join()
+        self.export()
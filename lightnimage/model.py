@@ -1,20 +1,211 @@
+import math
+
+import numpy as np
 
 
 class L2Vector:
     """
+    The compact vector representation of the (two dimensional) geometry of a lightning. Instead of storing the whole
+    binary mask of a detection, only the skeleton of the lightning is stored as a set of polylines and the branch
+    points, where these polylines meet.
+
+    The points of ALL the polylines are stored in one contiguous (N, 2) array "coordinates", where each row is a
+    (x, y) point. The polylines are defined by the array "offsets", which contains the start index of each polyline
+    within the coordinates and as the last element the total amount of points. The polyline i thus consists of the
+    points coordinates[offsets[i]:offsets[i + 1]]. The (K, 2) array "junctions" contains the branch points.
 
     CHANGELOG
 
     Added 05.11.2018
 
+    Changed 19.10.2026
+    Implemented the array based polyline model
     """
+    __slots__ = ('coordinates', 'offsets', 'junctions')
 
-    def __init__(self):
+    def __init__(self, coordinates=None, offsets=None, junctions=None):
         """
+        The constructor.
 
         CHANGELOG
 
         Added 05.11.2018
+
+        Changed 19.10.2026
+        Added the parameters for the coordinate arrays
+
+        :param np.ndarray coordinates:  The (N, 2) array with the (x, y) points of all the polylines
+        :param np.ndarray offsets:      The array with the start indices of the polylines and the amount of points as
+                                        the last element
+        :param np.ndarray junctions:    The (K, 2) array of the (x, y) branch points
+        """
+        self.coordinates = np.zeros((0, 2), np.int32) if coordinates is None else np.asarray(coordinates, np.int32)
+        self.offsets = np.zeros(1, np.int32) if offsets is None else np.asarray(offsets, np.int32)
+        self.junctions = np.zeros((0, 2), np.int32) if junctions is None else np.asarray(junctions, np.int32)
+
+    @classmethod
+    def from_polylines(cls, polylines, junctions=None):
+        """
+        Creates a new vector object from a list of polylines, where each polyline is a list of (x, y) points.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param list polylines:
+        :param list junctions:
+        :return: L2Vector
+        """
+        lengths = [len(polyline) for polyline in polylines]
+        offsets = np.concatenate(([0], np.cumsum(lengths, dtype=np.int64)))
+        if len(polylines) == 0:
+            coordinates = np.zeros((0, 2), np.int32)
+        else:
+            coordinates = np.concatenate([np.asarray(polyline, np.int32).reshape((-1, 2)) for polyline in polylines])
+
+        if junctions is None or len(junctions) == 0:
+            junctions = np.zeros((0, 2), np.int32)
+
+        return cls(coordinates, offsets, np.asarray(junctions, np.int32).reshape((-1, 2)))
+
+    def __len__(self):
+        """
+        The amount of polylines
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return len(self.offsets) - 1
+
+    def polyline(self, index):
+        """
+        Returns the (n, 2) array of the points of the polyline with the given index. The array is a view and NOT a copy.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int index:
+        :return: np.ndarray
+        """
+        return self.coordinates[self.offsets[index]:self.offsets[index + 1]]
+
+    def polylines(self):
+        """
+        Returns a list with the point arrays of all the polylines
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: List(np.ndarray)
+        """
+        return [self.polyline(i) for i in range(len(self))]
+
+    def lengths(self):
+        """
+        Returns an array with the euclidean length of each polyline.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: np.ndarray
+        """
+        if len(self.coordinates) < 2:
+            return np.zeros(len(self), np.float64)
+
+        # The lengths of all the segments between consecutive points. The segments between the last point of a
+        # polyline and the first point of the next polyline are not part of the geometry and thus set to 0
+        segments = np.sqrt(np.sum(np.diff(self.coordinates.astype(np.float64), axis=0) ** 2, axis=1))
+        segments = np.append(segments, 0)
+        segments[self.offsets[1:-1] - 1] = 0
+
+        lengths = np.zeros(len(self), np.float64)
+        not_empty = self.offsets[1:] > self.offsets[:-1]
+        lengths[not_empty] = np.add.reduceat(segments, self.offsets[:-1][not_empty])
+        return lengths
+
+    @property
+    def length(self):
+        """
+        The total length of all polylines
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: float
+        """
+        return float(np.sum(self.lengths()))
+
+    @property
+    def branch_count(self):
+        """
+        The amount of branch points of the lightning
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return len(self.junctions)
+
+    @property
+    def orientation(self):
+        """
+        The angle of the main axis of the lightning in degrees, relative to the x axis. The angle is in the range from
+        0 to 180, where 90 is a vertical lightning. The main axis is the axis of the largest variance of all the points.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: float
+        """
+        if len(self.coordinates) < 2:
+            return 0.0
+
+        centered = self.coordinates - np.mean(self.coordinates, axis=0)
+        covariance = np.dot(centered.T, centered)
+        eigenvalues, eigenvectors = np.linalg.eigh(covariance)
+        x, y = eigenvectors[:, np.argmax(eigenvalues)]
+        return math.degrees(math.atan2(y, x)) % 180
+
+    def bounding_box(self):
+        """
+        Returns the area tuple of the bounding box of all points, in the same format as the areas of the segmentation
+        engines (with exclusive ends). Returns None for an empty vector.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The ends are exclusive like the areas of the segmentation engines instead of being the largest coordinates
+
+        :return: Tuple(Tuple(int, int), Tuple(int, int))
+        """
+        if len(self.coordinates) == 0:
+            return None
+
+        minimum = np.amin(self.coordinates, axis=0)
+        maximum = np.amax(self.coordinates, axis=0)
+        return (int(minimum[0]), int(maximum[0]) + 1), (int(minimum[1]), int(maximum[1]) + 1)
+
+    @property
+    def nbytes(self):
         """
-        pass
+        The amount of bytes needed to store the vector data
+
+        CHANGELOG
 
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.coordinates.nbytes + self.offsets.nbytes + self.junctions.nbytes
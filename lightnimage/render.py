@@ -0,0 +1,272 @@
+# 19.10.2026
+# A headless renderer for the detection results. Instead of plotting with matplotlib, the areas and their labels are
+# drawn directly into an RGB array. pillow is only used to render the label texts (once per distinct text) and to
+# encode the images as PNG or JPEG. It is imported lazily, so that importing this module is cheap.
+import os
+import io
+import functools
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lightnimage.calculate import block_mean
+
+
+DEFAULT_COLOR = (255, 0, 0)
+
+
+def to_rgb(array):
+    """
+    Converts the given grayscale (or already RGB) array into a new uint8 RGB array of the shape (height, width, 3).
+    Arrays, that are not 8 bit are clipped to the range from 0 to 255.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:
+    :return: np.ndarray
+    """
+    if array.dtype != np.uint8:
+        array = np.clip(array, 0, 255).astype(np.uint8)
+
+    if array.ndim == 3:
+        return array[:, :, :3].copy()
+
+    return np.repeat(array[:, :, np.newaxis], 3, axis=2)
+
+
+def draw_rectangle(rgb, area, color=DEFAULT_COLOR, thickness=1):
+    """
+    Draws the outline of the given area into the given RGB array (in place). Each of the four edges is drawn as one
+    slice assignment. The area is clipped to the array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray rgb:  The (height, width, 3) array to draw into
+    :param area:            The area tuple ((x_start, x_end), (y_start, y_end))
+    :param tuple color:     The RGB color of the outline
+    :param int thickness:   The width of the outline in pixels
+    :return: void
+    """
+    height, width = rgb.shape[:2]
+    (x_start, x_end), (y_start, y_end) = area
+    x_start, x_end = max(0, x_start), min(width - 1, x_end)
+    y_start, y_end = max(0, y_start), min(height - 1, y_end)
+    if x_start > x_end or y_start > y_end:
+        return
+
+    rgb[y_start:min(y_start + thickness, y_end + 1), x_start:x_end + 1] = color
+    rgb[max(y_end - thickness + 1, y_start):y_end + 1, x_start:x_end + 1] = color
+    rgb[y_start:y_end + 1, x_start:min(x_start + thickness, x_end + 1)] = color
+    rgb[y_start:y_end + 1, max(x_end - thickness + 1, x_start):x_end + 1] = color
+
+
+@functools.lru_cache(maxsize=256)
+def text_mask(text):
+    """
+    Returns a boolean array, which contains the given text rendered with the default font of pillow. There are only a
+    few different labels, so the masks are cached and the text only has to be rendered once.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param str text:
+    :return: np.ndarray
+    """
+    from PIL import Image, ImageDraw, ImageFont
+
+    font = ImageFont.load_default()
+    image = Image.new('1', (8 * len(text) + 16, 32))
+    ImageDraw.Draw(image).text((0, 0), text, fill=1, font=font)
+
+    bounding_box = image.getbbox()
+    if bounding_box is None:
+        return np.zeros((0, 0), np.bool_)
+
+    mask = np.array(image.crop(bounding_box), np.bool_)
+    mask.setflags(write=False)
+    return mask
+
+
+def draw_text(rgb, text, position, color=DEFAULT_COLOR):
+    """
+    Draws the given text into the given RGB array (in place), with the upper left corner at the given (x, y) position.
+    The text is clipped to the array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray rgb:
+    :param str text:
+    :param tuple position:  The (x, y) position of the upper left corner of the text
+    :param tuple color:
+    :return: void
+    """
+    mask = text_mask(text)
+    height, width = rgb.shape[:2]
+    x, y = position
+
+    # Clipping the mask of the text to the part, that is within the array
+    x_start, y_start = max(0, x), max(0, y)
+    x_end, y_end = min(width, x + mask.shape[1]), min(height, y + mask.shape[0])
+    if x_start >= x_end or y_start >= y_end:
+        return
+
+    clipped = mask[y_start - y:y_end - y, x_start - x:x_end - x]
+    rgb[y_start:y_end, x_start:x_end][clipped] = color
+
+
+def render_areas(array, areas, labels=None, color=DEFAULT_COLOR, thickness=1):
+    """
+    Renders the given image array with the outlines of the given areas and optionally their labels into a new uint8
+    RGB array. The label of an area is drawn just above it, or inside of it, if there is no space above.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:    The grayscale image
+    :param list areas:          The list of area tuples
+    :param list labels:         A list with one string for each area. DEFAULT is None for no labels
+    :param tuple color:         The RGB color of the outlines and labels. DEFAULT is red
+    :param int thickness:       The width of the outlines in pixels
+    :return: np.ndarray
+    """
+    rgb = to_rgb(array)
+
+    for i, area in enumerate(areas):
+        draw_rectangle(rgb, area, color, thickness)
+
+        if labels is not None:
+            text_height = text_mask(labels[i]).shape[0]
+            x, y = area[0][0], area[1][0] - text_height - 2
+            if y < 0:
+                y = area[1][0] + thickness + 1
+            draw_text(rgb, labels[i], (x, y), color)
+
+    return rgb
+
+
+def encode_image(rgb, image_format='PNG', quality=90):
+    """
+    Encodes the given RGB (or grayscale) array into the bytes of an image file of the given format
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray rgb:
+    :param str image_format:    Either "PNG" or "JPEG". DEFAULT is PNG
+    :param int quality:         The quality for the JPEG encoding. DEFAULT is 90
+    :return: bytes
+    """
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    options = {'quality': quality} if image_format.upper() in ('JPEG', 'JPG') else {}
+    Image.fromarray(rgb).save(buffer, format='JPEG' if image_format.upper() == 'JPG' else image_format, **options)
+    return buffer.getvalue()
+
+
+def save_image(rgb, path, quality=90):
+    """
+    Saves the given RGB (or grayscale) array as an image file. The format is derived from the file extension of the
+    path (".png", ".jpg" or ".jpeg")
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray rgb:
+    :param str path:
+    :param int quality: The quality for the JPEG encoding. DEFAULT is 90
+    :return: void
+    """
+    extension = os.path.splitext(path)[1].lower()
+    image_format = 'JPEG' if extension in ('.jpg', '.jpeg') else 'PNG'
+    with open(path, mode='wb') as file:
+        file.write(encode_image(rgb, image_format, quality))
+
+
+def render_job(job):
+    """
+    Renders and saves a single job of a batch. The job is a tuple of the image array, the list of areas, the list of
+    labels (or None) and the path of the file to save to. Returns the path.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param tuple job:
+    :return: str
+    """
+    array, areas, labels, path = job
+    save_image(render_areas(array, areas, labels), path)
+    return path
+
+
+def render_batch(jobs, workers=None):
+    """
+    Renders and saves a whole batch of detection results on a pool of worker processes. Each job is a tuple of the
+    image array, the list of areas, the list of labels (or None) and the path of the image file to be created.
+    Returns the list of the created paths.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param jobs:            An iterable of job tuples
+    :param int workers:     The amount of worker processes. DEFAULT is None for as many as there are CPUs. With 1 the
+                            jobs are rendered in the current process
+    :return: List(str)
+    """
+    if workers == 1:
+        return [render_job(job) for job in jobs]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(render_job, jobs))
+
+
+def contact_sheet(arrays, columns=4, factor=1, spacing=2, background=0):
+    """
+    Arranges the given images into one montage image with the given amount of columns, for example to review the
+    detections of many frames at a glance. All images are downsampled by the given factor (by block means) and have to
+    have the same shape.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list arrays:     The list of grayscale or RGB images
+    :param int columns:     The amount of images per row of the sheet. DEFAULT is 4
+    :param int factor:      The downsampling factor of the images. DEFAULT is 1 for the original size
+    :param int spacing:     The amount of pixels between two images. DEFAULT is 2
+    :param int background:  The grayscale value of the background. DEFAULT is 0
+    :return: np.ndarray
+    """
+    thumbnails = []
+    for array in arrays:
+        rgb = to_rgb(array)
+        if factor > 1:
+            rgb = np.stack([block_mean(rgb[:, :, channel], factor) for channel in range(3)], axis=2).astype(np.uint8)
+        thumbnails.append(rgb)
+
+    height, width = thumbnails[0].shape[:2]
+    rows = (len(thumbnails) + columns - 1) // columns
+    sheet = np.full(
+        (rows * height + (rows - 1) * spacing, columns * width + (columns - 1) * spacing, 3),
+        background,
+        np.uint8
+    )
+
+    for i, thumbnail in enumerate(thumbnails):
+        y = (i // columns) * (height + spacing)
+        x = (i % columns) * (width + spacing)
+        sheet[y:y + height, x:x + width] = thumbnail
+
+    return sheet
@@ -0,0 +1,1092 @@
+# 19.10.2026
+# Running the lightning detection unattended on all the frames of a recording. The frames are read from a frame source
+# (a folder of image files or a raw frame store), the detection is run on a pool of worker processes and the results
+# are written in the order of the frames into a detection log (see the storage module). The throughput, the latency
+# percentiles and the skipped frames are reported while the batch is running.
+import os
+import json
+import math
+import time
+import bisect
+import shutil
+import hashlib
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.engine import SimpleAreaSegmentationEngine, CustomSequenceAreaSegmentationEngine
+from lightnimage.engine import TiledAreaSegmentationEngine, MultiScaleAreaSegmentationEngine
+from lightnimage.engine import XYCutAreaSegmentationEngine, SimpleLightningClassificationEngine
+from lightnimage.stats import FrameStatisticsIndex, ReferenceFrameSelector, frame_statistics, difference_energy
+from lightnimage.storage import DetectionLog, DetectionLogWriter, DetectionLogReader
+from lightnimage.metrics import REGISTRY, COUNT_BUCKETS
+from lightnimage.mask import ExclusionMask, ARAGATS_EXCLUSION
+from lightnimage.calculate import offset_areas
+
+
+# The segmentation engines, which can be chosen by name
+ENGINES = {
+    'simple':       SimpleAreaSegmentationEngine,
+    'custom':       CustomSequenceAreaSegmentationEngine,
+    'tiled':        TiledAreaSegmentationEngine,
+    'multiscale':   MultiScaleAreaSegmentationEngine,
+    'xycut':        XYCutAreaSegmentationEngine
+}
+
+# The features of the classification engine, which are stored in the detection log
+FEATURES = [
+    'width', 'height', 'aspect_ratio', 'fill_ratio', 'intensity_sum', 'intensity_max', 'centroid_x', 'centroid_y',
+    'horizontal_extent', 'vertical_extent'
+]
+
+
+class AbstractFrameSource:
+    """
+    The abstract base class for the sources of the frames of a batch run. Every frame is identified by a key (for
+    example the file name), which has to be picklable, because the frames are loaded within the worker processes.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self):
+        self.keys = []
+
+    def __len__(self):
+        return len(self.keys)
+
+    def load(self, key):
+        """
+        Returns the frame with the given key as a LightningImage
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param key:
+        :return: LightningImage
+        """
+        raise NotImplementedError()
+
+    def timestamp(self, key):
+        """
+        Returns the float timestamp of the frame with the given key
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param key:
+        :return: float
+        """
+        raise NotImplementedError()
+
+    def statistics(self, start=0):
+        """
+        A generator, which yields a tuple of the key and the statistics dict (see "frame_statistics") including the
+        difference energy to the predecessor of every frame in order. By default the statistics are computed from the
+        loaded frames.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the start parameter
+
+        :param int start:   The position of the first frame. DEFAULT is 0
+        :return: Generator(Tuple(key, dict))
+        """
+        previous = self.load(self.keys[start - 1]).array if 0 < start <= len(self.keys) else None
+        for key in self.keys[start:]:
+            array = self.load(key).array
+            statistics = frame_statistics(array)
+            statistics['difference_energy'] = np.nan if previous is None else difference_energy(array, previous)
+            previous = array
+            yield key, statistics
+
+    def references(self, mode='auto', window=10, start=0):
+        """
+        Returns a list with the key of the reference frame for every frame of the source from the given start position
+        on. The first frame has no reference and thus None. The mode can either be "previous" for simply using the
+        preceding frame or "auto" for choosing the best frame out of a window of preceding frames (see
+        ReferenceFrameSelector).
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the start parameter. The reference of a frame only depends on the window of the frames before it, so
+        only the statistics of the frames from "window" frames before the start on are needed. A resumed batch run
+        does not compute the statistics of the whole archive again
+
+        :param str mode:    Either "auto" or "previous". DEFAULT is "auto"
+        :param int window:  The amount of preceding frames for the "auto" mode. DEFAULT is 10
+        :param int start:   The position of the first frame, for which the reference is returned. DEFAULT is 0
+        :return: list
+        """
+        if mode == 'previous':
+            return ([None] + self.keys[:-1])[start:]
+        if mode != 'auto':
+            raise ValueError('The reference mode has to be "auto" or "previous", not "{}"'.format(mode))
+        if start >= len(self.keys):
+            return []
+
+        selector = ReferenceFrameSelector({'window': window})
+        references = []
+        first = max(0, start - window)
+        for position, (key, statistics) in enumerate(self.statistics(first), first):
+            if position >= start:
+                references.append(selector.reference())
+            selector.push(key, statistics)
+
+        return references
+
+
+class FolderFrameSource(AbstractFrameSource):
+    """
+    The frames are the image files within a folder, in the order of their file names. The timestamp of a frame is the
+    modification time of its file. The statistics for the automatic reference selection are taken from the sidecar
+    file of a FrameStatisticsIndex, so that they are only computed once for each frame.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, folder_path, pattern='*.jpg'):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str folder_path:
+        :param str pattern:     The file name pattern of the frames. DEFAULT is "*.jpg"
+        """
+        AbstractFrameSource.__init__(self)
+        self.folder_path = folder_path
+        self.pattern = pattern
+        self.index = FrameStatisticsIndex(folder_path, pattern)
+        self.keys = self.index.frame_names()
+
+    def load(self, key):
+        return LightningImage.from_file(os.path.join(self.folder_path, key))
+
+    def timestamp(self, key):
+        return os.path.getmtime(os.path.join(self.folder_path, key))
+
+    def statistics(self, start=0):
+        self.index.update()
+        for key in self.keys[start:]:
+            yield key, self.index.statistics(key)
+
+    def __getstate__(self):
+        # The worker processes do not need the statistics
+        state = self.__dict__.copy()
+        state['index'] = None
+        return state
+
+
+class RawFrameSource(AbstractFrameSource):
+    """
+    The frames are stored one after another as raw 8 bit grayscale pixels in a single frame store file, as it is
+    written by the recording servers. The frames are memory mapped, so that only the frames, which are currently being
+    processed are in memory. The key of a frame is its position within the file and its timestamp is the position
+    divided by the frame rate.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, path, shape, fps=1.0, offset=0):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:    The path of the frame store file
+        :param tuple shape: The (height, width) tuple of the frames
+        :param float fps:   The frame rate of the recording. DEFAULT is 1.0, for which the timestamp is the position
+        :param int offset:  The amount of bytes at the start of the file, before the first frame. DEFAULT is 0
+        """
+        AbstractFrameSource.__init__(self)
+        self.path = path
+        self.shape = tuple(shape)
+        self.fps = fps
+        self.offset = offset
+
+        self.frame_size = self.shape[0] * self.shape[1]
+        self.keys = list(range((os.path.getsize(path) - offset) // self.frame_size))
+
+    def load(self, key):
+        return LightningImage.from_memmap(self.path, self.shape, offset=self.offset + key * self.frame_size)
+
+    def timestamp(self, key):
+        return key / self.fps
+
+
+class FrameDetectionEngine:
+    """
+    The problem:
+    The detection of a single frame ("tools.simple_lightning_detection") prints every step, is fixed to the simple
+    segmentation engine and throws away the computed features.
+
+    This engine does the same steps (the difference to the reference, the lightening of the difference, the
+    exclusion of the timestamp overlays, the segmentation and the classification), but the segmentation engine can be
+    chosen and it returns the classifications and the features of the areas, so that they can be stored.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    Replaced "timestamp_fraction", which removed the areas in the lower right corner after the segmentation, with the
+    static "exclusion" mask, which is applied to the difference before the segmentation. Added "crop"
+    """
+    DEFAULT_CONFIG = {
+        'engine':                   'simple',
+        'engine_config':            {},
+        'difference_threshold':     70,
+        'lighten_threshold':        30,
+        'exclusion':                ARAGATS_EXCLUSION,
+        'crop':                     False,
+        'classification':           True
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - engine:                   The name of the segmentation engine (see ENGINES). DEFAULT is "simple"
+        - engine_config:            The config dict of the segmentation engine. DEFAULT is an empty dict
+        - difference_threshold:     The threshold for the difference to the reference image. DEFAULT is 70
+        - lighten_threshold:        All pixels of the difference above this are set to 255. DEFAULT is 30
+        - exclusion:                The ExclusionMask or the list of the rectangles of the regions, which are
+                                    excluded from the detection. DEFAULT is ARAGATS_EXCLUSION, None for no exclusion
+        - crop:                     Whether only the working region, which is left after the exclusion, is processed.
+                                    DEFAULT is False
+        - classification:           Whether the areas are classified. DEFAULT is True
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        if self.config['engine'] not in ENGINES:
+            raise ValueError('The engine "{}" does not exist. Choose one of {}'.format(
+                self.config['engine'],
+                ', '.join(sorted(ENGINES))
+            ))
+        self.area_engine = ENGINES[self.config['engine']](self.config['engine_config'])
+        self.classification_engine = SimpleLightningClassificationEngine({})
+        self.exclusion = ExclusionMask.create(self.config['exclusion'])
+
+        # The durations of the stages and the amount of candidate areas of the segmentation of the last call
+        self.timings = {}
+        self.candidate_count = 0
+
+    def __call__(self, lightning_image, reference_image):
+        """
+        Detects the lightning areas within the given image. Returns a tuple of the list of areas, the list of
+        classifications and the dict of the feature arrays. The last two are None if the classification is disabled.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param LightningImage lightning_image:
+        :param LightningImage reference_image:
+        :return: Tuple(list, list, dict)
+        """
+        start = time.perf_counter()
+        differences = self.preprocess(lightning_image.array[np.newaxis], reference_image.array[np.newaxis])
+        preprocessing = time.perf_counter() - start
+
+        result = self.detect(LightningImage(differences[0], copy=False), lightning_image.array.shape)
+        self.timings['preprocessing'] = preprocessing
+        return result
+
+    def preprocess(self, arrays, reference_arrays):
+        """
+        Computes the lightening of the thresholded differences (the same as "LightningImage.difference" followed by
+        "LightningImage.lighten") for a whole stack of frames at once. Returns the uint8 stack of the differences.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The excluded regions are set to 0. If "crop" is set, only the differences of the working region are computed
+        and returned
+
+        :param np.ndarray arrays:           The (count, height, width) uint8 stack of the frames
+        :param np.ndarray reference_arrays: The stack of the reference frames with the same shape
+        :return: np.ndarray
+        """
+        shape = arrays.shape[-2:]
+        if self.exclusion is not None and self.config['crop']:
+            arrays, reference_arrays = self.exclusion.crop(arrays), self.exclusion.crop(reference_arrays)
+
+        # The absolute difference of two uint8 arrays without the detour over int16
+        differences = np.maximum(arrays, reference_arrays)
+        differences -= np.minimum(arrays, reference_arrays)
+
+        differences[differences < self.config['difference_threshold']] = 0
+        differences[differences >= self.config['lighten_threshold']] = 255
+
+        if self.exclusion is not None:
+            self.exclusion.apply(differences, shape if self.config['crop'] else None)
+        return differences
+
+    def detect(self, difference, shape=None):
+        """
+        Segments and classifies the areas of the given preprocessed difference image. Returns the same tuple as
+        calling the engine. The durations of the segmentation and the classification are kept in the "timings"
+        attribute.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Removed the filter of the timestamp areas, they are excluded in the preprocessing now. Added the shape
+        parameter for the cropped differences
+
+        :param LightningImage difference:
+        :param tuple shape:                 The (height, width) of the frame. If "crop" is set, the difference only
+                                            is the working region of the frame and the areas and the centroids are
+                                            moved back into the frame. DEFAULT is None for the shape of the difference
+        :return: Tuple(list, list, dict)
+        """
+        # The offset of the cropped difference within the frame
+        x_offset, y_offset = 0, 0
+        if self.exclusion is not None and self.config['crop'] and shape is not None:
+            rows, columns = self.exclusion.region(shape)
+            x_offset, y_offset = columns.start, rows.start
+
+        start = time.perf_counter()
+        areas = self.area_engine(difference)
+        self.candidate_count = len(areas)
+        self.timings = {'segmentation': time.perf_counter() - start}
+
+        if not self.config['classification']:
+            return offset_areas(areas, x_offset, y_offset), None, None
+
+        start = time.perf_counter()
+        area_types = self.classification_engine(difference, areas)
+        features = self.classification_engine.features
+        if x_offset or y_offset:
+            features = dict(features)
+            features['centroid_x'] = features['centroid_x'] + x_offset
+            features['centroid_y'] = features['centroid_y'] + y_offset
+        self.timings['classification'] = time.perf_counter() - start
+        return offset_areas(areas, x_offset, y_offset), [guess for guess, area in area_types], features
+
+
+def observe_detection(registry, engine, timings, candidate_count, detection_count):
+    """
+    Feeds the stage latencies, the amount of candidates of the segmentation engine and the amount of detections of
+    one frame into the given metrics registry.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param MetricsRegistry registry:
+    :param str engine:              The name of the segmentation engine
+    :param dict timings:            The dict of the stage names and their durations in seconds
+    :param int candidate_count:
+    :param int detection_count:
+    :return: void
+    """
+    for stage, duration in timings.items():
+        registry.histogram('stage_latency_seconds', 'The duration of the detection stages', {'stage': stage}).observe(
+            duration
+        )
+    registry.histogram(
+        'candidates_per_frame',
+        'The amount of candidate areas of the segmentation engine per frame',
+        {'engine': engine},
+        COUNT_BUCKETS
+    ).observe(candidate_count)
+    registry.histogram(
+        'detections_per_frame',
+        'The amount of detected areas per frame',
+        buckets=COUNT_BUCKETS
+    ).observe(detection_count)
+
+
+# The state of a worker process, which is set up once by "initialize_worker"
+WORKER_STATE = {}
+
+
+def initialize_worker(source, config):
+    """
+    Sets up the frame source and the detection engine of a worker process.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param AbstractFrameSource source:
+    :param dict config:     The config of the FrameDetectionEngine
+    :return: void
+    """
+    WORKER_STATE['source'] = source
+    WORKER_STATE['engine'] = FrameDetectionEngine(config)
+    WORKER_STATE['reference'] = (None, None)
+
+
+def detect_frame(job):
+    """
+    Runs the detection for a single job tuple of the frame id, the key of the frame and the key of its reference
+    within a worker process. Returns a tuple of the frame id, the result tuple of the FrameDetectionEngine (or None),
+    the reason for skipping the frame (or None), the latency in seconds and a tuple of the stage timings and the
+    amount of candidates (or None).
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param tuple job:
+    :return: Tuple(int, tuple, str, float, tuple)
+    """
+    start = time.perf_counter()
+    frame_id, key, reference_key = job
+    source = WORKER_STATE['source']
+
+    if reference_key is None:
+        return frame_id, None, 'no_reference', time.perf_counter() - start, None
+
+    try:
+        image = source.load(key)
+        # Many consecutive frames share the same reference, so the last one is kept
+        if WORKER_STATE['reference'][0] != reference_key:
+            WORKER_STATE['reference'] = (reference_key, source.load(reference_key))
+        reference = WORKER_STATE['reference'][1]
+    except (OSError, ValueError):
+        return frame_id, None, 'load_error', time.perf_counter() - start, None
+
+    if image.array.shape != reference.array.shape:
+        return frame_id, None, 'shape_mismatch', time.perf_counter() - start, None
+
+    engine = WORKER_STATE['engine']
+    result = engine(image, reference)
+    return frame_id, result, None, time.perf_counter() - start, (engine.timings, engine.candidate_count)
+
+
+def bounded_map(executor, function, jobs, size):
+    """
+    A generator, which yields the results of the given function for all the given jobs in the order of the jobs, like
+    "executor.map". But only the given amount of jobs is submitted to the executor at once and the next job is only
+    taken from the jobs, once the oldest result has been yielded. So neither the jobs nor the futures and results of a
+    whole archive are kept in memory and the pool can not run ahead of the consumer of the results. The jobs, which
+    are still waiting, are cancelled, when the generator is closed.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param Executor executor:
+    :param function:
+    :param jobs:        An iterable of the jobs, which may be a generator
+    :param int size:    The maximum amount of jobs, which are submitted but not yet yielded
+    :return: Generator
+    """
+    futures = deque()
+    try:
+        for job in jobs:
+            futures.append(executor.submit(function, job))
+            if len(futures) >= size:
+                yield futures.popleft().result()
+        while len(futures) != 0:
+            yield futures.popleft().result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+class ThroughputReport:
+    """
+    Collects the latencies and the skipped frames of a batch run and summarizes the throughput.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    PERCENTILES = [50, 90, 99]
+
+    def __init__(self, total):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int total:   The total amount of frames of the batch
+        """
+        self.total = total
+        self.start = time.perf_counter()
+        self.latencies = []
+        self.skipped = Counter()
+        self.detection_count = 0
+
+    def add(self, latency, skip_reason=None, detection_count=0):
+        """
+        Adds a finished frame.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float latency:       The processing time of the frame in seconds
+        :param str skip_reason:     The reason, why the frame was skipped. DEFAULT is None for a processed frame
+        :param int detection_count: The amount of areas detected in the frame
+        :return: void
+        """
+        self.latencies.append(latency)
+        if skip_reason is not None:
+            self.skipped[skip_reason] += 1
+        self.detection_count += detection_count
+
+    def summary(self):
+        """
+        Returns a dict with the amount of frames, the amount of processed and skipped frames (by reason), the amount of
+        detections, the elapsed time, the frames per second and the mean and percentiles of the latency in ms.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: dict
+        """
+        elapsed = time.perf_counter() - self.start
+        finished = len(self.latencies)
+        latencies = np.array(self.latencies) * 1000 if finished > 0 else np.zeros(1)
+
+        latency = {'mean': float(np.mean(latencies))}
+        for percentile, value in zip(self.PERCENTILES, np.percentile(latencies, self.PERCENTILES)):
+            latency['p{}'.format(percentile)] = float(value)
+
+        return {
+            'frames':               self.total,
+            'finished':             finished,
+            'processed':            finished - sum(self.skipped.values()),
+            'skipped':              dict(self.skipped),
+            'detections':           self.detection_count,
+            'elapsed':              elapsed,
+            'frames_per_second':    finished / elapsed if elapsed > 0 else 0.0,
+            'latency_ms':           latency
+        }
+
+
+def canonical_value(value):
+    """
+    Returns a JSON serializable stand in for the values of a config, which are not JSON serializable themselves, so
+    that the same config always gives the same text: The rectangles and the digest of the bitmap of an exclusion mask,
+    the digest of an array, the class and the config of an engine and the qualified name of a function.
+
+    Raises a ValueError for the values, which can not be identified across runs: Lambdas and closures, which would all
+    have the same name for different code, and objects, whose only representation contains their memory address.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    Objects with a config dict (the engines) are represented by their class and their config. An engine object used
+    to fall back to its representation, which contains its memory address, so that the hash changed on every call.
+    Lambdas and closures raise a ValueError instead of being represented by a name, which does not identify them
+
+    :param value:
+    :return: The JSON serializable value
+    """
+    if isinstance(value, ExclusionMask):
+        return {
+            'rectangles':   value.rectangles,
+            'bitmap':       None if value.bitmap is None else canonical_value(np.packbits(value.bitmap))
+        }
+    if isinstance(value, np.ndarray):
+        return hashlib.sha256(np.ascontiguousarray(value).tobytes()).hexdigest()
+    if isinstance(getattr(value, 'config', None), dict):
+        # The values, which are the defaults of the class, are identified by the class. This also keeps the default
+        # lambdas of the engines out of the hash
+        defaults = getattr(type(value), 'DEFAULT_CONFIG', {})
+        return {
+            'class':    '{}.{}'.format(type(value).__module__, type(value).__qualname__),
+            'config':   {
+                key: item for key, item in value.config.items()
+                if not (key in defaults and item is defaults[key])
+            }
+        }
+    if callable(value):
+        name = getattr(value, '__qualname__', None)
+        if name is None or '<lambda>' in name or '<locals>' in name or getattr(value, '__closure__', None):
+            raise ValueError('The function {!r} in the config can not be identified across runs. Use a function '
+                             'defined on the module level instead'.format(value))
+        return '{}.{}'.format(getattr(value, '__module__', ''), name)
+    if ' at 0x' in repr(value):
+        raise ValueError('The value {!r} in the config can not be identified across runs'.format(value))
+    return repr(value)
+
+
+def config_hash(config, reference='auto', window=10):
+    """
+    Returns the hex digest of everything, which determines the results of a batch run: The complete config of the
+    FrameDetectionEngine (including its defaults) and the reference selection
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param dict config:
+    :param str reference:
+    :param int window:
+    :return: str
+    """
+    complete_config = FrameDetectionEngine.DEFAULT_CONFIG.copy()
+    complete_config.update(config or {})
+    text = json.dumps(
+        {'config': complete_config, 'reference': reference, 'window': window},
+        sort_keys=True,
+        default=canonical_value
+    )
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def keys_hash(keys):
+    """
+    Returns the hex digest of the given list of frame keys
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list keys:
+    :return: str
+    """
+    return hashlib.sha256('\n'.join(str(key) for key in keys).encode('utf-8')).hexdigest()
+
+
+def ranges_contain(ranges, value):
+    """
+    Returns whether the given value is within one of the given sorted list of [start, end) ranges
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list ranges:
+    :param int value:
+    :return: bool
+    """
+    index = bisect.bisect_right(ranges, [value, math.inf]) - 1
+    return index >= 0 and ranges[index][1] > value
+
+
+def ranges_add(ranges, value):
+    """
+    Adds the given value to the given sorted list of [start, end) ranges in place. Neighbouring values are merged into
+    one range, so the list stays small, when the values are added in order.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param list ranges:
+    :param int value:
+    :return: void
+    """
+    if ranges_contain(ranges, value):
+        return
+
+    index = bisect.bisect_right(ranges, [value, math.inf])
+    before = ranges[index - 1] if index > 0 else None
+    after = ranges[index] if index < len(ranges) else None
+
+    if before is not None and before[1] == value:
+        before[1] += 1
+        if after is not None and after[0] == before[1]:
+            before[1] = after[1]
+            del ranges[index]
+    elif after is not None and after[0] == value + 1:
+        after[0] = value
+    else:
+        ranges.insert(index, [value, value + 1])
+
+
+def copy_log_frame(reader, writer, position):
+    """
+    Writes the frame at the given position of the given detection log with all its detections into the given writer
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param DetectionLogReader reader:
+    :param DetectionLogWriter writer:
+    :param int position:
+    :return: void
+    """
+    frame_id = int(reader.frame_ids[position])
+    detections = reader.detections(frame_id)
+    classifications = reader.classifications(frame_id)
+    writer.write(
+        frame_id,
+        float(reader.timestamps[position]),
+        reader.areas(frame_id),
+        None if None in classifications else classifications,
+        {feature: detections[DetectionLog.feature_column_name(feature)] for feature in reader.features}
+    )
+
+
+class BatchCheckpoint:
+    """
+    The problem:
+    A batch run over a large archive takes hours. When a worker crashed or the run was stopped, it had to be started
+    again from the first frame, because nothing recorded the progress.
+
+    The checkpoint records the progress of a batch run in the file "checkpoint.json" within the detection log: The
+    ranges of the completed frame ids, the hash of the config, the digest of the frame keys and the sizes of the
+    column files of the log (see "DetectionLogWriter.sync"). It is written atomically, so that a crash never leaves a
+    partial checkpoint. A resumed run truncates the log to the state of the checkpoint, skips the completed frames and
+    refuses to continue, if the config or the frames have changed, because the earlier results would not match.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The frames, which could not be loaded, are completed as well and recorded as the "failed" ranges. Retrying them
+    within a resumed run would append them after frames with higher ids and break the order of the log
+    """
+    FILE_NAME = 'checkpoint.json'
+
+    def __init__(self, config_hash, keys=(), completed=(), output=None, failed=()):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the failed parameter
+
+        :param str config_hash:     The hash of the config of the run (see "config_hash")
+        :param list keys:           The keys of the frames of the source
+        :param list completed:      The list of the [start, end) ranges of the completed frame ids. DEFAULT is none
+        :param dict output:         The amount of frames, the amount of detections and the offsets of the files of the
+                                    log. DEFAULT is None for an empty log
+        :param list failed:         The list of the [start, end) ranges of the completed frame ids, which could not be
+                                    loaded. DEFAULT is none
+        """
+        self.config_hash = config_hash
+        self.key_count = len(keys)
+        self.keys_hash = keys_hash(keys)
+        self.completed = [[int(start), int(end)] for start, end in completed]
+        self.failed = [[int(start), int(end)] for start, end in failed]
+        self.output = output or {'frames': 0, 'detections': 0, 'offsets': {}}
+
+    @classmethod
+    def path(cls, output_path):
+        return os.path.join(output_path, cls.FILE_NAME)
+
+    @classmethod
+    def load(cls, output_path):
+        """
+        Loads the checkpoint of the detection log at the given path. Returns None, if there is none.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str output_path:
+        :return: BatchCheckpoint
+        """
+        if not os.path.exists(cls.path(output_path)):
+            return None
+
+        with open(cls.path(output_path), mode='r') as file:
+            data = json.load(file)
+        checkpoint = cls(data['config_hash'], completed=data['completed'], output=data['output'], failed=data['failed'])
+        checkpoint.key_count = data['key_count']
+        checkpoint.keys_hash = data['keys_hash']
+        return checkpoint
+
+    def save(self, output_path, output):
+        """
+        Saves the checkpoint together with the given state of the log. The file is replaced atomically.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str output_path:
+        :param dict output:     The dict with the frames, the detections and the offsets of the log
+        :return: void
+        """
+        self.output = output
+        temp_path = self.path(output_path) + '.tmp'
+        with open(temp_path, mode='w') as file:
+            json.dump({
+                'config_hash':  self.config_hash,
+                'key_count':    self.key_count,
+                'keys_hash':    self.keys_hash,
+                'completed':    self.completed,
+                'failed':       self.failed,
+                'output':       self.output
+            }, file, indent=4)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.path(output_path))
+
+    def check(self, config_hash, keys):
+        """
+        Raises a ValueError, if the given config hash or the given frame keys do not match the checkpoint. Frames,
+        which have been added to the end of the source since the checkpoint, are allowed. Updates the keys of the
+        checkpoint to the given keys.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str config_hash:
+        :param list keys:
+        :return: void
+        """
+        if config_hash != self.config_hash:
+            raise ValueError('The config has changed since the checkpoint, so the earlier results are invalid. Restart '
+                             'the batch run to discard them')
+        if len(keys) < self.key_count or keys_hash(keys[:self.key_count]) != self.keys_hash:
+            raise ValueError('The frames of the source have changed since the checkpoint. Restart the batch run to '
+                             'discard the earlier results')
+        self.key_count = len(keys)
+        self.keys_hash = keys_hash(keys)
+
+    def __contains__(self, frame_id):
+        return ranges_contain(self.completed, frame_id)
+
+    def __len__(self):
+        return sum(end - start for start, end in self.completed)
+
+    def add(self, frame_id, failed=False):
+        """
+        Marks the frame with the given id as completed. Neighbouring ids are merged into one range, so the checkpoint
+        stays small, when the frames are completed in order.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the failed parameter. The ranges are kept by "ranges_add"
+
+        :param int frame_id:
+        :param bool failed:     Whether the frame could not be loaded. DEFAULT is False
+        :return: void
+        """
+        ranges_add(self.completed, frame_id)
+        if failed:
+            ranges_add(self.failed, frame_id)
+
+
+def run_batch(source, output_path, config=None, reference='auto', window=10, workers=1, progress=None,
+              progress_interval=1.0, metrics=None, checkpoint_interval=30.0, restart=False, retry_failed=False):
+    """
+    Runs the detection on all the frames of the given source and writes the results into the detection log at the
+    given path. The frame id of a frame is its position within the source. Frames, which could not be processed (no
+    reference, not loadable, wrong shape) are skipped and not written to the log. Returns the summary dict of the
+    ThroughputReport. The metrics of the frames are fed into the given metrics registry.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    The progress is saved periodically as a BatchCheckpoint within the log. If the log has a checkpoint, the run is
+    resumed from it: The log is truncated to the checkpoint and only the frames, which are not completed, are processed.
+    The frames, which could not be loaded, are not completed, so that they are tried again. The summary contains the
+    amount of "resumed" frames, which were completed before
+
+    Changed 19.10.2026
+    The frames, which could not be loaded, are completed as well, because processing them within a resumed run appended
+    them after frames with higher ids. They are only processed again with "retry_failed", which rewrites the log in the
+    order of the frame ids. The summary contains the amount of "retried" frames
+
+    Changed 19.10.2026
+    The worker processes get the jobs from "bounded_map" instead of "executor.map", which submitted all the jobs of the
+    archive at once. Only two jobs per worker are in flight, so the memory does not grow with the archive. A stopped
+    run cancels the jobs, which have not been started, instead of finishing all of them before the checkpoint is saved
+
+    :param AbstractFrameSource source:
+    :param str output_path:         The path of the detection log
+    :param dict config:             The config of the FrameDetectionEngine. DEFAULT is None for the default config
+    :param str reference:           The reference mode, either "auto" or "previous". DEFAULT is "auto"
+    :param int window:              The window of the "auto" reference mode. DEFAULT is 10
+    :param int workers:             The amount of worker processes. DEFAULT is 1 for running in the current process.
+                                    None for as many as there are CPUs
+    :param progress:                A callable, which gets the current summary dict. DEFAULT is None
+    :param float progress_interval: The minimum amount of seconds between two progress calls. DEFAULT is 1.0
+    :param MetricsRegistry metrics: DEFAULT is None for the module level registry of the metrics module
+    :param float checkpoint_interval:   The minimum amount of seconds between two checkpoints. DEFAULT is 30
+    :param bool restart:            Whether the results of an earlier run in the log are discarded instead of
+                                    resuming it. Raises a ValueError, if the config of the checkpoint is different and
+                                    restart is not set. DEFAULT is False
+    :param bool retry_failed:       Whether the frames of the checkpoint, which could not be loaded, are processed
+                                    again. The log is rewritten into the folder "<output_path>.retry", which replaces
+                                    it, once the run is complete. DEFAULT is False
+    :return: dict
+    """
+    config = config or {}
+    metrics = metrics or REGISTRY
+    engine = config.get('engine', FrameDetectionEngine.DEFAULT_CONFIG['engine'])
+    classification = config.get('classification', FrameDetectionEngine.DEFAULT_CONFIG['classification'])
+
+    # Without a checkpoint the frames are appended to an existing log, a restart starts with an empty log
+    digest = config_hash(config, reference, window)
+    checkpoint = None if restart else BatchCheckpoint.load(output_path)
+    failed = []
+    if checkpoint is not None:
+        checkpoint.check(digest, source.keys)
+        frame_count = checkpoint.output['frames']
+        if retry_failed:
+            failed, checkpoint.failed = checkpoint.failed, []
+    else:
+        checkpoint = BatchCheckpoint(digest, source.keys)
+        frame_count = 0 if restart else None
+
+    def is_job(frame_id):
+        return frame_id not in checkpoint or ranges_contain(failed, frame_id)
+
+    # Only the references from the first frame on, which is not completed, are selected, so that a resumed run does
+    # not compute the statistics of the completed frames again
+    start = next((frame_id for frame_id in range(len(source)) if is_job(frame_id)), len(source))
+    references = source.references(reference, window, start)
+
+    # The jobs are only created, when the pool is ready for them (see "bounded_map")
+    jobs = (
+        (frame_id, source.keys[frame_id], references[frame_id - start])
+        for frame_id in range(start, len(source)) if is_job(frame_id)
+    )
+    job_count = sum(1 for frame_id in range(len(source)) if is_job(frame_id))
+    retried = sum(end - start for start, end in failed)
+    resumed = len(source) - job_count
+    report = ThroughputReport(job_count)
+    pending = metrics.gauge('pending_frames', 'The amount of frames, which have been queued but are not finished')
+    pending.set(job_count)
+    last_progress = time.perf_counter()
+
+    features = FEATURES if classification else ()
+    writer = DetectionLogWriter(output_path, features=features, frame_count=frame_count)
+    previous = None
+    if retried > 0:
+        # The retried frames lie between the frames of the log, so the log is rewritten in the order of the frame ids
+        # into a new folder. The log and its checkpoint stay untouched, until the new folder is complete
+        writer.close()
+        previous = DetectionLogReader(output_path)
+        shutil.rmtree(output_path + '.retry', ignore_errors=True)
+        writer = DetectionLogWriter(output_path + '.retry', features=features)
+    copied = 0
+
+    def copy_previous(frame_id):
+        # Copies the frames of the previous log, which come before the frame with the given id
+        nonlocal copied
+        while previous is not None and copied < len(previous) and previous.frame_ids[copied] < frame_id:
+            copy_log_frame(previous, writer, copied)
+            copied += 1
+
+    def save_checkpoint():
+        offsets = writer.sync()
+        checkpoint.save(writer.path, {
+            'frames':       writer.frame_count,
+            'detections':   writer.detection_count,
+            'offsets':      offsets
+        })
+
+    executor = None
+    complete = False
+    try:
+        if workers == 1:
+            initialize_worker(source, config)
+            results = map(detect_frame, jobs)
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=initialize_worker,
+                initargs=(source, config)
+            )
+            # Two jobs per worker keep the workers busy, while the results are written
+            results = bounded_map(executor, detect_frame, jobs, 2 * (workers or os.cpu_count()))
+
+        last_checkpoint = time.perf_counter()
+        # The results are returned in the order of the jobs, so the log is ordered by the frame ids
+        for frame_id, result, skip_reason, latency, stages in results:
+            pending.dec()
+            metrics.histogram('frame_latency_seconds', 'The processing time of the frames').observe(latency)
+
+            if result is None:
+                report.add(latency, skip_reason)
+                metrics.counter('frames_total', 'The finished frames', {'status': skip_reason}).inc()
+            else:
+                areas, classifications, frame_features = result
+                copy_previous(frame_id)
+                writer.write(frame_id, source.timestamp(source.keys[frame_id]), areas, classifications, frame_features)
+                report.add(latency, detection_count=len(areas))
+                metrics.counter('frames_total', 'The finished frames', {'status': 'processed'}).inc()
+                observe_detection(metrics, engine, stages[0], stages[1], len(areas))
+
+            checkpoint.add(frame_id, failed=skip_reason == 'load_error')
+
+            metrics.gauge('frames_per_second', 'The throughput of the current batch').set(
+                len(report.latencies) / max(time.perf_counter() - report.start, 1e-9)
+            )
+
+            if previous is None and time.perf_counter() - last_checkpoint >= checkpoint_interval:
+                save_checkpoint()
+                last_checkpoint = time.perf_counter()
+
+            if progress is not None and time.perf_counter() - last_progress >= progress_interval:
+                progress(report.summary())
+                last_progress = time.perf_counter()
+
+        copy_previous(math.inf)
+        complete = True
+    finally:
+        if executor is not None:
+            # A stopped run does not wait for the jobs, which have not been started yet
+            executor.shutdown(cancel_futures=True)
+        # The progress is saved even if the run was interrupted, only a failed writer does not get a checkpoint. A
+        # rewritten log is discarded, if it is not complete
+        try:
+            if previous is None or complete:
+                save_checkpoint()
+        finally:
+            writer.close()
+            if previous is not None and not complete:
+                shutil.rmtree(writer.path, ignore_errors=True)
+
+    if previous is not None:
+        shutil.rmtree(output_path + '.old', ignore_errors=True)
+        os.rename(output_path, output_path + '.old')
+        os.rename(writer.path, output_path)
+        shutil.rmtree(output_path + '.old')
+
+    summary = report.summary()
+    summary['resumed'] = resumed
+    summary['retried'] = retried
+    if progress is not None:
+        progress(summary)
+    return summary
@@ -0,0 +1,651 @@
+# 19.10.2026
+# A local detection service. Several producer processes (the camera capture, the replay of archives) send their
+# frames to one warm process, which keeps the engines loaded, instead of each of them setting up its own detection.
+# The frames of concurrent requests are grouped into micro batches, whose differences are computed as one stack, and
+# the segmentation of the frames of a batch is then run on a pool of worker threads. The service is a small HTTP
+# server, which listens either on a TCP port or on a Unix socket.
+import json
+import time
+import queue
+import socket
+import threading
+import http.client
+import socketserver
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import Future, ThreadPoolExecutor
+from urllib.parse import urlsplit, parse_qs, urlencode
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.runner import FrameDetectionEngine, observe_detection
+from lightnimage.metrics import REGISTRY, COUNT_BUCKETS
+
+
+class MicroBatchingDetector:
+    """
+    The problem:
+    Processing every frame on its own as soon as it arrives has a fixed overhead per frame and with many producers
+    the requests compete for the CPU instead of being processed together.
+
+    This detector collects the submitted frames in a queue. A dispatcher thread takes the first waiting frame and then
+    waits at most "max_wait" seconds for more frames, until the batch has "max_batch_size" frames. The differences of
+    all the frames of a batch with the same shape are computed at once on the stacked arrays and the segmentation of
+    each frame is then done on a pool of worker threads. A larger batch size and wait time increase the throughput at
+    the cost of the latency of the single frames.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'max_batch_size':   8,
+        'max_wait':         0.005,
+        'workers':          2,
+        'detection':        {},
+        'metrics':          None
+    }
+
+    def __init__(self, config):
+        """
+        The constructor. Starts the dispatcher thread.
+
+        The config dict can have the following parameters:
+        - max_batch_size:   The int maximum amount of frames in a batch. DEFAULT is 8
+        - max_wait:         The float maximum amount of seconds to wait for more frames, after the first frame of a
+                            batch has arrived. DEFAULT is 0.005
+        - workers:          The int amount of worker threads for the segmentation. DEFAULT is 2
+        - detection:        The config dict of the FrameDetectionEngine. DEFAULT is an empty dict
+        - metrics:          The MetricsRegistry, which is fed with the batch sizes, the queue depth, the latencies and
+                            the candidate counts. DEFAULT is None for the module level registry of the metrics module
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        # Only the preprocessing of the stacks is done with this engine. The segmentation engines keep the results of
+        # the last call in their attributes, thus every worker thread uses its own engine
+        self.engine = FrameDetectionEngine(self.config['detection'])
+        self.local = threading.local()
+        self.metrics = self.config['metrics'] or REGISTRY
+
+        self.batch_count = 0
+        self.frame_count = 0
+        self.largest_batch = 0
+
+        self.queue = queue.Queue()
+        self.executor = ThreadPoolExecutor(max_workers=self.config['workers'])
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def submit(self, array, reference_array):
+        """
+        Adds a frame to the queue. Returns a future, whose result will be the result tuple of the FrameDetectionEngine.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:            The uint8 frame
+        :param np.ndarray reference_array:  The uint8 reference frame with the same shape
+        :return: Future
+        """
+        if array.shape != reference_array.shape:
+            raise ValueError('The frame shape {} does not match the reference shape {}'.format(
+                array.shape,
+                reference_array.shape
+            ))
+
+        future = Future()
+        future.submitted = time.perf_counter()
+        self.queue.put((array, reference_array, future))
+        return future
+
+    def collect(self):
+        """
+        Blocks until the next batch has been collected. Returns the list of the queued items or None, if the detector
+        has been closed.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: list
+        """
+        item = self.queue.get()
+        if item is None:
+            return None
+
+        batch = [item]
+        deadline = time.monotonic() + self.config['max_wait']
+        while len(batch) < self.config['max_batch_size']:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self.queue.get(timeout=remaining) if remaining > 0 else self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                # The closing marker has to stay in the queue for the next call
+                self.queue.put(None)
+                break
+            batch.append(item)
+
+        return batch
+
+    def run(self):
+        """
+        The loop of the dispatcher thread.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        while True:
+            batch = self.collect()
+            if batch is None:
+                break
+
+            self.batch_count += 1
+            self.frame_count += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            self.metrics.histogram('batch_size', 'The amount of frames per batch', buckets=COUNT_BUCKETS).observe(
+                len(batch)
+            )
+            self.metrics.gauge('queue_depth', 'The amount of frames waiting for a batch').set(self.queue.qsize())
+
+            shapes = {}
+            for item in batch:
+                shapes.setdefault(item[0].shape, []).append(item)
+
+            for items in shapes.values():
+                try:
+                    start = time.perf_counter()
+                    differences = self.engine.preprocess(
+                        np.stack([array for array, reference_array, future in items]),
+                        np.stack([reference_array for array, reference_array, future in items])
+                    )
+                    self.metrics.histogram(
+                        'stage_latency_seconds',
+                        'The duration of the detection stages',
+                        {'stage': 'batch_preprocessing'}
+                    ).observe(time.perf_counter() - start)
+                except Exception as error:
+                    for item in items:
+                        item[2].set_exception(error)
+                    continue
+
+                for difference, (array, reference_array, future) in zip(differences, items):
+                    self.executor.submit(self.detect, difference, future, array.shape)
+
+    def detect(self, difference, future, shape=None):
+        """
+        Segments a single preprocessed difference within a worker thread and sets the result of its future.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the shape parameter for the cropped differences
+
+        :param np.ndarray difference:
+        :param Future future:
+        :param tuple shape:             The shape of the frame, whose difference may be cropped. DEFAULT is None
+        :return: void
+        """
+        if not hasattr(self.local, 'engine'):
+            self.local.engine = FrameDetectionEngine(self.config['detection'])
+        engine = self.local.engine
+
+        try:
+            result = engine.detect(LightningImage(difference, copy=False), shape)
+        except Exception as error:
+            future.set_exception(error)
+            return
+
+        observe_detection(self.metrics, engine.config['engine'], engine.timings, engine.candidate_count, len(result[0]))
+        self.metrics.counter('frames_total', 'The finished frames', {'status': 'processed'}).inc()
+        self.metrics.histogram('request_latency_seconds', 'The time from submitting a frame to its result').observe(
+            time.perf_counter() - future.submitted
+        )
+        future.set_result(result)
+
+    def statistics(self):
+        """
+        Returns a dict with the amount of processed batches and frames, the mean and the largest batch size
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: dict
+        """
+        return {
+            'batches':          self.batch_count,
+            'frames':           self.frame_count,
+            'mean_batch_size':  self.frame_count / self.batch_count if self.batch_count > 0 else 0.0,
+            'largest_batch':    self.largest_batch
+        }
+
+    def close(self):
+        """
+        Stops the dispatcher thread after the queued frames and waits for the worker threads.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.queue.put(None)
+        self.thread.join()
+        self.executor.shutdown()
+
+
+class DetectionService:
+    """
+    The frames of a producer are identified by the name of their stream. Each stream has its own reference frame,
+    which is either set explicitly (and then kept) or otherwise the previous frame of the stream.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, config):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config: The config of the MicroBatchingDetector
+        """
+        self.detector = MicroBatchingDetector(config)
+        self.lock = threading.Lock()
+        # Maps the stream names to tuples of the reference array and whether it was set explicitly
+        self.references = {}
+
+    def set_reference(self, stream, array):
+        """
+        Sets the fixed reference frame of the given stream
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str stream:
+        :param np.ndarray array:
+        :return: void
+        """
+        with self.lock:
+            self.references[stream] = (array, True)
+
+    def detect(self, stream, array):
+        """
+        Detects the lightning within the given frame of the given stream. Returns a dict with the list of the areas and
+        the list of the classifications (or None) or with the reason, why the frame was skipped.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str stream:
+        :param np.ndarray array:
+        :return: dict
+        """
+        with self.lock:
+            reference, fixed = self.references.get(stream, (None, False))
+            if not fixed:
+                self.references[stream] = (array, False)
+
+        skip_reason = None
+        if reference is None:
+            skip_reason = 'no_reference'
+        elif reference.shape != array.shape:
+            skip_reason = 'shape_mismatch'
+
+        if skip_reason is not None:
+            self.detector.metrics.counter('frames_total', 'The finished frames', {'status': skip_reason}).inc()
+            return {'skipped': skip_reason}
+
+        areas, classifications, features = self.detector.submit(array, reference).result()
+        return {
+            'areas':            [[list(map(int, area[0])), list(map(int, area[1]))] for area in areas],
+            'classifications':  classifications
+        }
+
+    def close(self):
+        self.detector.close()
+
+
+class DetectionRequestHandler(BaseHTTPRequestHandler):
+    """
+    Handles the requests to the detection service:
+    - POST /detect?stream=NAME&shape=HEIGHTxWIDTH:      The body is the raw uint8 frame. Responds with the JSON result
+    - PUT /reference?stream=NAME&shape=HEIGHTxWIDTH:    The body is the raw uint8 reference frame of the stream
+    - GET /statistics:                                  Responds with the JSON statistics of the batching
+    - GET /metrics:                                     Responds with the metrics in the Prometheus text format
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def read_body(self):
+        """
+        Reads the whole body of the request, as it is declared by the Content-Length header. The body always has to be
+        read before responding, even to an invalid request, because the connection is kept alive and the rest of the
+        body would be parsed as the next request otherwise. If the length is invalid, the connection is closed after
+        the response instead.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: bytes
+        """
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.close_connection = True
+            raise ValueError('Invalid Content-Length {}'.format(self.headers.get('Content-Length')))
+
+        return self.rfile.read(length)
+
+    def read_frame(self, parameters, body):
+        """
+        Returns the frame in the given body of the request with the shape given in the parameters
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The body is read beforehand by "read_body", so that it is also consumed, if the shape is invalid
+
+        :param dict parameters:
+        :param bytes body:
+        :return: np.ndarray
+        """
+        height, width = (int(part) for part in parameters['shape'][0].lower().split('x'))
+        if len(body) != height * width:
+            raise ValueError('The body has {} bytes, but the shape {}x{} needs {}'.format(
+                len(body),
+                height,
+                width,
+                height * width
+            ))
+        return np.frombuffer(body, np.uint8).reshape((height, width))
+
+    def respond(self, status, content=None):
+        """
+        Sends the response with the given status code and the given content as JSON
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int status:
+        :param content:
+        :return: void
+        """
+        body = b'' if content is None else json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def handle_frame(self, method):
+        """
+        Handles the requests, which send a frame in their body
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The body is read before any response, also before the 404 and 400 responses. An exception of the detection is
+        responded with a 500 instead of dropping the connection
+
+        :param str method:
+        :return: void
+        """
+        url = urlsplit(self.path)
+        parameters = parse_qs(url.query)
+        stream = parameters.get('stream', ['default'])[0]
+
+        try:
+            body = self.read_body()
+        except ValueError as error:
+            self.respond(400, {'error': str(error)})
+            return
+
+        if (method, url.path) not in (('POST', '/detect'), ('PUT', '/reference')):
+            self.respond(404, {'error': 'Unknown path {}'.format(url.path)})
+            return
+
+        try:
+            array = self.read_frame(parameters, body)
+        except (KeyError, ValueError) as error:
+            self.respond(400, {'error': str(error)})
+            return
+
+        try:
+            if url.path == '/reference':
+                self.server.service.set_reference(stream, array)
+                content = {}
+            else:
+                content = self.server.service.detect(stream, array)
+        except Exception as error:
+            self.respond(500, {'error': '{}: {}'.format(type(error).__name__, error)})
+            return
+
+        self.respond(200, content)
+
+    def do_POST(self):
+        self.handle_frame('POST')
+
+    def do_PUT(self):
+        self.handle_frame('PUT')
+
+    def do_GET(self):
+        path = urlsplit(self.path).path
+        # 19.10.2026
+        # A GET request usually has no body, but if it declares one, it has to be consumed as well
+        try:
+            self.read_body()
+        except ValueError as error:
+            self.respond(400, {'error': str(error)})
+            return
+
+        if path == '/statistics':
+            self.respond(200, self.server.service.detector.statistics())
+        elif path == '/metrics':
+            body = self.server.service.detector.metrics.to_prometheus().encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        else:
+            self.respond(404, {'error': 'Unknown path {}'.format(self.path)})
+
+    def log_message(self, format, *args):
+        # The service runs unattended, so the single requests are not logged
+        pass
+
+
+class UnixHTTPServer(socketserver.ThreadingUnixStreamServer):
+    """
+    A threading HTTP server, which listens on a Unix socket instead of a TCP port
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    daemon_threads = True
+
+    def get_request(self):
+        request, client_address = socketserver.ThreadingUnixStreamServer.get_request(self)
+        # The request handler expects a tuple of host and port
+        return request, ('local', 0)
+
+
+def create_server(service, address):
+    """
+    Creates the HTTP server for the given service. The address is either a tuple of the host and the port or the
+    string path of a Unix socket. Call "serve_forever" on the returned server to start it.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param DetectionService service:
+    :param address:
+    :return: socketserver.BaseServer
+    """
+    if isinstance(address, str):
+        server = UnixHTTPServer(address, DetectionRequestHandler)
+    else:
+        server = ThreadingHTTPServer(tuple(address), DetectionRequestHandler)
+        server.daemon_threads = True
+
+    server.service = service
+    return server
+
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    A HTTP connection over a Unix socket
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, path, timeout=None):
+        http.client.HTTPConnection.__init__(self, 'localhost', timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+class DetectionClient:
+    """
+    The client for the detection service. Every client keeps its own connection, so every producer thread should use
+    its own client.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, address, stream='default', timeout=None):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param address:         The tuple of the host and port or the path of the Unix socket of the service
+        :param str stream:      The name of the stream of the frames. DEFAULT is "default"
+        :param float timeout:   The timeout of the requests in seconds. DEFAULT is None for no timeout
+        """
+        self.stream = stream
+        if isinstance(address, str):
+            self.connection = UnixHTTPConnection(address, timeout=timeout)
+        else:
+            self.connection = http.client.HTTPConnection(address[0], address[1], timeout=timeout)
+
+    def request(self, method, path, array=None):
+        """
+        Sends a request with the given frame as the body and returns the decoded JSON response
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str method:
+        :param str path:
+        :param np.ndarray array:    DEFAULT is None for no body
+        :return: dict
+        """
+        body = None
+        if array is not None:
+            array = np.ascontiguousarray(array, np.uint8)
+            path = '{}?{}'.format(path, urlencode({
+                'stream':   self.stream,
+                'shape':    '{}x{}'.format(*array.shape)
+            }))
+            body = array.tobytes()
+
+        self.connection.request(method, path, body=body)
+        response = self.connection.getresponse()
+        content = json.loads(response.read().decode() or 'null')
+        if response.status != 200:
+            raise ValueError('The service responded with {}: {}'.format(response.status, content))
+        return content
+
+    def set_reference(self, array):
+        """
+        Sets the fixed reference frame of the stream of this client
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :return: void
+        """
+        self.request('PUT', '/reference', array)
+
+    def detect(self, array):
+        """
+        Sends the frame to the service and returns the dict with the list of the areas (as area tuples) and the list
+        of the classifications or with the reason, why the frame was skipped
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :return: dict
+        """
+        result = self.request('POST', '/detect', array)
+        if 'areas' in result:
+            result['areas'] = [(tuple(area[0]), tuple(area[1])) for area in result['areas']]
+        return result
+
+    def statistics(self):
+        return self.request('GET', '/statistics')
+
+    def metrics(self):
+        """
+        Returns the metrics of the service in the Prometheus text format
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: str
+        """
+        self.connection.request('GET', '/metrics')
+        return self.connection.getresponse().read().decode()
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,297 @@
+# 19.10.2026
+# Passing the decoded frames from the decoder processes to the detector processes without copying them. Sending a
+# frame through a multiprocessing queue pickles it, which copies the pixels once into the pipe and once more out of
+# it. Instead the frames are decoded into the slots of a ring buffer in shared memory and only the small slot indices
+# are passed between the processes.
+import queue
+import multiprocessing
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+
+
+class SharedFrameRing:
+    """
+    The problem:
+    Decoding and detection have to run in separate processes to use multiple cores, but every frame, that is passed
+    between processes, is copied twice by the pickling.
+
+    This ring buffer keeps a fixed amount of uint8 frame slots of a fixed shape in one shared memory block. The slots
+    are handed off between the processes with two queues, which only contain the slot indices:
+    - A producer (decoder) takes a free slot with "acquire", writes the frame into "frame(slot)" and hands it to the
+      consumers with "publish", together with the frame id and the timestamp.
+    - A consumer (detector) gets a filled slot with "receive", wraps it with "image(slot)" as a LightningImage, which
+      is a read only view on the shared memory, and gives the slot back with "release", once it is done with it.
+    If all the slots are filled, "acquire" blocks, until a consumer releases a slot. So the producers can never be more
+    than "slots" frames ahead of the consumers (backpressure) and the memory stays constant.
+
+    The ring is created in the parent process and passed to the child processes as an argument. The shared memory is
+    attached again by its name in the child processes. The creating process has to "unlink" the ring at the end.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    # The slot index, which tells a consumer, that there are no more frames
+    FINISHED = -1
+
+    def __init__(self, shape, slots=8, context=None):
+        """
+        The constructor. Creates the shared memory block.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param tuple shape:     The (height, width) shape of the frames
+        :param int slots:       The amount of frame slots. DEFAULT is 8
+        :param context:         The multiprocessing context for the queues. DEFAULT is None for the default context
+        """
+        if slots < 1:
+            raise ValueError('The ring needs at least one slot, not {}'.format(slots))
+
+        self.shape = tuple(shape)
+        self.slots = slots
+        context = context or multiprocessing.get_context()
+
+        # The layout of the block: The frame ids (int64) and the timestamps (float64) of all slots, then the frames
+        self.frame_size = self.shape[0] * self.shape[1]
+        self.memory = shared_memory.SharedMemory(create=True, size=slots * (16 + self.frame_size))
+        self.name = self.memory.name
+        self.owner = True
+        self.attach()
+
+        self.free = context.Queue()
+        self.filled = context.Queue()
+        for slot in range(slots):
+            self.free.put(slot)
+
+    def attach(self):
+        """
+        Creates the numpy views on the shared memory block
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        buffer = self.memory.buf
+        self.frame_ids = np.ndarray((self.slots, ), np.int64, buffer, offset=0)
+        self.timestamps = np.ndarray((self.slots, ), np.float64, buffer, offset=self.slots * 8)
+        self.frames = np.ndarray((self.slots, ) + self.shape, np.uint8, buffer, offset=self.slots * 16)
+
+    def __getstate__(self):
+        # The shared memory itself is not pickled, only its name, so that it can be attached in the other process
+        state = self.__dict__.copy()
+        for name in ('memory', 'frame_ids', 'timestamps', 'frames'):
+            del state[name]
+        state['owner'] = False
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.memory = shared_memory.SharedMemory(name=self.name)
+        self.attach()
+
+    @property
+    def nbytes(self):
+        """
+        The size of the shared memory block in bytes
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.memory.size
+
+    def acquire(self, timeout=None):
+        """
+        Returns the index of a free slot. Blocks, while all the slots are filled.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float timeout:   The maximum amount of seconds to block. DEFAULT is None to block until a slot is free
+        :raises TimeoutError:   If no slot was released within the timeout
+        :return: int
+        """
+        try:
+            return self.free.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('No free slot within {} seconds, the consumers are not keeping up'.format(timeout))
+
+    def frame(self, slot):
+        """
+        Returns the writable array of the given slot, into which the producer writes the frame
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int slot:
+        :return: np.ndarray
+        """
+        return self.frames[slot]
+
+    def publish(self, slot, frame_id, timestamp=0.0):
+        """
+        Hands the filled slot over to the consumers
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int slot:
+        :param int frame_id:
+        :param float timestamp: DEFAULT is 0.0
+        :return: void
+        """
+        self.frame_ids[slot] = frame_id
+        self.timestamps[slot] = timestamp
+        self.filled.put(slot)
+
+    def put(self, array, frame_id, timestamp=0.0, timeout=None):
+        """
+        Copies the given frame into a free slot and publishes it. This is the only copy of the frame. Blocks, while all
+        the slots are filled.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param array:           The frame as an array or a LightningImage
+        :param int frame_id:
+        :param float timestamp: DEFAULT is 0.0
+        :param float timeout:   DEFAULT is None to block until a slot is free
+        :return: void
+        """
+        array = array.array if isinstance(array, LightningImage) else array
+        if array.shape != self.shape:
+            raise ValueError('The frame shape {} does not match the ring shape {}'.format(array.shape, self.shape))
+
+        slot = self.acquire(timeout)
+        self.frames[slot] = array
+        self.publish(slot, frame_id, timestamp)
+
+    def finish(self, consumers=1):
+        """
+        Tells the given amount of consumers, that there are no more frames. Each consumer stops after receiving one
+        of the markers.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int consumers:   DEFAULT is 1
+        :return: void
+        """
+        for i in range(consumers):
+            self.filled.put(self.FINISHED)
+
+    def receive(self, timeout=None):
+        """
+        Returns a tuple of the index, the frame id and the timestamp of the next filled slot or None, if the producer
+        has finished.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float timeout:   DEFAULT is None to block until a slot is filled
+        :raises TimeoutError:   If no slot was filled within the timeout
+        :return: Tuple(int, int, float)
+        """
+        try:
+            slot = self.filled.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError('No frame within {} seconds'.format(timeout))
+
+        if slot == self.FINISHED:
+            return None
+        return slot, int(self.frame_ids[slot]), float(self.timestamps[slot])
+
+    def image(self, slot):
+        """
+        Returns the frame in the given slot as a LightningImage, which is a read only view on the shared memory. The
+        image is only valid until the slot is released.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int slot:
+        :return: LightningImage
+        """
+        view = self.frames[slot].view()
+        view.flags.writeable = False
+        return LightningImage(view, copy=False)
+
+    def release(self, slot):
+        """
+        Gives the slot back to the producers
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int slot:
+        :return: void
+        """
+        self.free.put(slot)
+
+    def images(self, timeout=None):
+        """
+        A generator for the consumers, which yields a tuple of the frame id, the timestamp and the image of every
+        received frame, until the producer has finished. The slot of a frame is released, when the next frame is
+        requested, so the image must not be used after that.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float timeout:   DEFAULT is None to block until a slot is filled
+        :return: Generator(Tuple(int, float, LightningImage))
+        """
+        while True:
+            received = self.receive(timeout)
+            if received is None:
+                break
+
+            slot, frame_id, timestamp = received
+            try:
+                yield frame_id, timestamp, self.image(slot)
+            finally:
+                self.release(slot)
+
+    def close(self):
+        """
+        Closes the access to the shared memory in this process. All the arrays of the ring become invalid.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.frame_ids = self.timestamps = self.frames = None
+        self.memory.close()
+
+    def unlink(self):
+        """
+        Closes and frees the shared memory. Has to be called once by the process, which created the ring.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.close()
+        if self.owner:
+            self.memory.unlink()
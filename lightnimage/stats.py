@@ -0,0 +1,562 @@
+import os
+import math
+import fnmatch
+from collections import deque
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+
+
+def frame_statistics(array):
+    """
+    Computes the compact statistics of a single grayscale frame. Returns a dict with the following values:
+    - histogram:        An array with the amount of pixels for each of the 256 grayscale values
+    - mean:             The mean grayscale value
+    - max:              The maximum grayscale value
+    - row_profile:      The mean grayscale value of each row
+    - column_profile:   The mean grayscale value of each column
+    The mean and the maximum are derived from the histogram, so that the frame only has to be counted once.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array:    The 8 bit grayscale frame
+    :return: dict
+    """
+    histogram = np.bincount(np.asarray(array, np.uint8).ravel(), minlength=256)
+    values = np.flatnonzero(histogram)
+
+    return {
+        'histogram':        histogram,
+        'mean':             np.dot(histogram, np.arange(256)) / array.size,
+        'max':              values[-1] if len(values) > 0 else 0,
+        'row_profile':      np.mean(array, axis=1, dtype=np.float64),
+        'column_profile':   np.mean(array, axis=0, dtype=np.float64)
+    }
+
+
+def difference_energy(array1, array2):
+    """
+    Computes the mean absolute difference of the two given frames, which is a measure for how much changed between them
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray array1:
+    :param np.ndarray array2:
+    :return: float
+    """
+    return float(np.mean(np.abs(array1.astype(np.int16) - array2.astype(np.int16))))
+
+
+def histogram_percentile(histogram, percentile):
+    """
+    Returns the grayscale value below which the given percentage of the pixels of the histogram are
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param np.ndarray histogram:    The array with the 256 counts of the grayscale values
+    :param float percentile:        The percentage between 0 and 100
+    :return: int
+    """
+    cumulative = np.cumsum(histogram)
+    return int(np.searchsorted(cumulative, cumulative[-1] * percentile / 100.0))
+
+
+class ExponentialFrameStatistics:
+    """
+    The problem:
+    Thresholds, which are derived from the statistics of the current frame alone, jump from frame to frame. A single
+    hot pixel or a glitch of the sensor sets the maximum of the frame and thus swings the threshold.
+
+    This class keeps exponentially weighted moving averages of the statistics of a sequence of frames: The mean
+    grayscale value, its variance over the frames and the normalized histogram. They are updated incrementally from
+    the histogram of each new frame, so no additional pass over the pixels is needed, if the histogram is known anyway
+    (see "frame_statistics" and the FrameStatisticsIndex). High percentiles of the averaged histogram are a robust
+    replacement for the maximum: A few hot pixels do not move them and a single bright frame only moves them by the
+    smoothing factor.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, smoothing=0.05):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float smoothing:     The weight of a new frame between 0 and 1. Roughly the statistics follow the last
+                                    1 / smoothing frames. DEFAULT is 0.05
+        """
+        self.smoothing = smoothing
+
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        # The averaged fractions of the pixels for each of the 256 grayscale values
+        self.histogram = np.zeros(256, np.float64)
+
+    def update(self, histogram, outlier_deviation=None):
+        """
+        Adds the frame with the given histogram to the statistics. The first frame initializes them. Returns whether
+        the frame was added.
+
+        If an outlier deviation is given, a frame, whose mean is further away from the averaged mean than this many
+        standard deviations, is an outlier (a flash or a glitch). Outliers only update the variance, but not the mean
+        and the histogram, so that a lasting change of the scene is still followed after a few frames. The outliers are
+        only detected after the first 1 / smoothing frames.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray histogram:    The array with the 256 counts of the grayscale values of the frame
+        :param float outlier_deviation: DEFAULT is None for no outlier detection
+        :return: bool
+        """
+        histogram = np.asarray(histogram, np.float64)
+        fractions = histogram / histogram.sum()
+        mean = float(np.dot(fractions, np.arange(256)))
+
+        self.count += 1
+        if self.count == 1:
+            self.mean = mean
+            self.histogram[:] = fractions
+            return True
+
+        # The incremental update of the exponentially weighted mean and variance
+        difference = mean - self.mean
+        increment = self.smoothing * difference
+        outlier = (
+            outlier_deviation is not None and
+            self.count > 1 / self.smoothing and
+            abs(difference) > outlier_deviation * self.deviation
+        )
+        self.variance = (1 - self.smoothing) * (self.variance + difference * increment)
+        if outlier:
+            return False
+
+        self.mean += increment
+        self.histogram *= 1 - self.smoothing
+        self.histogram += self.smoothing * fractions
+        return True
+
+    @property
+    def deviation(self):
+        """
+        The standard deviation of the mean grayscale value over the frames
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: float
+        """
+        return math.sqrt(self.variance)
+
+    def percentile(self, percentile):
+        """
+        Returns the grayscale value below which the given percentage of the pixels of the averaged histogram are
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param float percentile:    The percentage between 0 and 100
+        :return: int
+        """
+        return histogram_percentile(self.histogram, percentile)
+
+
+class FrameStatisticsIndex:
+    """
+    The problem:
+    Choosing a reference frame, choosing thresholds for the preprocessing or triaging the frames all need the same per
+    frame statistics, which had to be recomputed from the decoded pixels every time.
+
+    This index stores the compact statistics of every frame of a frame folder in a sidecar file (see
+    "frame_statistics"), together with the difference energy of each frame to its predecessor. The index is built with
+    one pass over the frames and then only updated incrementally: Only the new or changed frames are decoded again.
+
+    The statistics are available as arrays with one row per frame, in the order of the sorted file names:
+    names, histograms, means, maxima, row_profiles, column_profiles and difference_energies (which is NaN for the first
+    frame).
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    SIDECAR_FILE_NAME = '.lightnimage_statistics.npz'
+
+    # The arrays, which make up the index and are saved in the sidecar file
+    FIELDS = [
+        'names', 'mtimes', 'sizes', 'histograms', 'means', 'maxima', 'row_profiles', 'column_profiles',
+        'difference_energies'
+    ]
+
+    def __init__(self, folder_path, pattern='*.jpg', sidecar_path=None):
+        """
+        The constructor. Loads the existing sidecar file, if there is one. Call "update" to index the frames.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str folder_path:     The folder, which contains the frames
+        :param str pattern:         The file name pattern of the frames. DEFAULT is "*.jpg"
+        :param str sidecar_path:    The path of the sidecar file. DEFAULT is None for a file within the frame folder
+        """
+        self.folder_path = folder_path
+        self.pattern = pattern
+        self.sidecar_path = sidecar_path or os.path.join(folder_path, self.SIDECAR_FILE_NAME)
+
+        self.names = np.zeros(0, np.str_)
+        self.mtimes = np.zeros(0, np.float64)
+        self.sizes = np.zeros(0, np.int64)
+        self.histograms = np.zeros((0, 256), np.uint32)
+        self.means = np.zeros(0, np.float64)
+        self.maxima = np.zeros(0, np.uint8)
+        self.row_profiles = np.zeros((0, 0), np.float32)
+        self.column_profiles = np.zeros((0, 0), np.float32)
+        self.difference_energies = np.zeros(0, np.float64)
+
+        if os.path.exists(self.sidecar_path):
+            self.load()
+
+        self.positions = {name: i for i, name in enumerate(self.names)}
+
+    def __len__(self):
+        """
+        The amount of indexed frames
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return len(self.names)
+
+    def load(self):
+        """
+        Loads the arrays of the index from the sidecar file
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        with np.load(self.sidecar_path) as data:
+            for field in self.FIELDS:
+                setattr(self, field, data[field])
+
+    def save(self):
+        """
+        Saves the arrays of the index into the sidecar file. The file is replaced atomically.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        temp_path = self.sidecar_path + '.tmp'
+        with open(temp_path, mode='wb') as file:
+            np.savez(file, **{field: getattr(self, field) for field in self.FIELDS})
+        os.replace(temp_path, self.sidecar_path)
+
+    def frame_names(self):
+        """
+        Returns the sorted list of the file names of all the frames currently in the folder
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: List(str)
+        """
+        return sorted(name for name in os.listdir(self.folder_path) if fnmatch.fnmatch(name, self.pattern))
+
+    def update(self):
+        """
+        Brings the index up to date with the frame folder and saves it. Only the frames, which are new or have changed
+        since the last update are decoded. Returns the amount of decoded frames.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        names = self.frame_names()
+        stats = [os.stat(os.path.join(self.folder_path, name)) for name in names]
+
+        # A frame is up to date, if it was indexed before and neither its modification time nor its size have changed
+        up_to_date = []
+        for name, stat in zip(names, stats):
+            position = self.positions.get(name)
+            up_to_date.append(
+                position is not None and
+                self.mtimes[position] == stat.st_mtime and
+                self.sizes[position] == stat.st_size
+            )
+
+        arrays = {}
+        decoded = []
+
+        def array(i):
+            # The decoded frames are cached, because each frame may be needed for its own statistics and for the
+            # difference energy of its successor
+            if i not in arrays:
+                arrays[i] = LightningImage.from_file(os.path.join(self.folder_path, names[i])).array
+                decoded.append(i)
+            return arrays[i]
+
+        rows = []
+        for i, name in enumerate(names):
+            if up_to_date[i]:
+                position = self.positions[name]
+                row = {
+                    'histogram':        self.histograms[position],
+                    'mean':             self.means[position],
+                    'max':              self.maxima[position],
+                    'row_profile':      self.row_profiles[position],
+                    'column_profile':   self.column_profiles[position]
+                }
+            else:
+                row = frame_statistics(array(i))
+
+            # The difference energy can only be reused, if the predecessor of the frame is still the same
+            previous_position = self.positions.get(names[i - 1]) if i > 0 else None
+            if i == 0:
+                row['difference_energy'] = np.nan
+            elif (up_to_date[i] and up_to_date[i - 1] and
+                  previous_position is not None and previous_position == self.positions[name] - 1):
+                row['difference_energy'] = self.difference_energies[self.positions[name]]
+            else:
+                row['difference_energy'] = difference_energy(array(i), array(i - 1))
+
+            rows.append(row)
+
+            # Only the current frame may still be needed for the next one
+            for j in [j for j in arrays if j < i]:
+                del arrays[j]
+
+        self.set_rows(names, stats, rows)
+        self.save()
+        return len(decoded)
+
+    def set_rows(self, names, stats, rows):
+        """
+        Replaces the arrays of the index with the given rows
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param list names:
+        :param list stats:  The list of the os.stat results of the frames
+        :param list rows:   The list of the statistic dicts of the frames
+        :return: void
+        """
+        if len({(len(row['row_profile']), len(row['column_profile'])) for row in rows}) > 1:
+            raise ValueError('All the frames in {} have to have the same shape'.format(self.folder_path))
+
+        self.names = np.asarray(names, np.str_)
+        self.mtimes = np.asarray([stat.st_mtime for stat in stats], np.float64)
+        self.sizes = np.asarray([stat.st_size for stat in stats], np.int64)
+        self.histograms = np.asarray([row['histogram'] for row in rows], np.uint32).reshape((-1, 256))
+        self.means = np.asarray([row['mean'] for row in rows], np.float64)
+        self.maxima = np.asarray([row['max'] for row in rows], np.uint8)
+        self.row_profiles = np.asarray([row['row_profile'] for row in rows], np.float32)
+        self.column_profiles = np.asarray([row['column_profile'] for row in rows], np.float32)
+        self.difference_energies = np.asarray([row['difference_energy'] for row in rows], np.float64)
+
+        self.positions = {name: i for i, name in enumerate(names)}
+
+    def position(self, name):
+        """
+        Returns the position of the frame with the given file name within the index
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :return: int
+        """
+        return self.positions[name]
+
+    def statistics(self, name):
+        """
+        Returns the dict of statistics of the frame with the given file name. The dict has the same keys as the result
+        of "frame_statistics", plus the difference energy to the previous frame.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :return: dict
+        """
+        position = self.position(name)
+        return {
+            'histogram':            self.histograms[position],
+            'mean':                 self.means[position],
+            'max':                  self.maxima[position],
+            'row_profile':          self.row_profiles[position],
+            'column_profile':       self.column_profiles[position],
+            'difference_energy':    self.difference_energies[position]
+        }
+
+    def percentile(self, name, percentile):
+        """
+        Returns the grayscale value of the given percentile of the pixels of the frame with the given file name
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param float percentile:
+        :return: int
+        """
+        return histogram_percentile(self.histograms[self.position(name)], percentile)
+
+
+class ReferenceFrameSelector:
+    """
+    The problem:
+    The reference frame, which is subtracted from a frame to find the lightning, had to be picked by hand for every
+    event.
+
+    This selector picks the best reference for a frame from a sliding window of the frames preceding it. The best
+    reference is the one with the lowest score, where by default the score prefers dark frames (low mean) which are
+    stable (low difference energy to their predecessor) and thus most likely do not contain a lightning. The score is
+    computed only from the precomputed statistics of the frames (see FrameStatisticsIndex).
+
+    The frames are pushed one after another in a streaming fashion. The window is kept as a monotonic queue, in which
+    the scores are ascending, so that the best frame is always at the front. Thus pushing a frame and getting the
+    reference are both O(1) amortized, independent of the window size.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    DEFAULT_CONFIG = {
+        'window':           10,
+        'score_function':   lambda statistics: ReferenceFrameSelector.default_score(statistics)
+    }
+
+    def __init__(self, config):
+        """
+        The constructor.
+
+        The config dict can have the following parameters:
+        - window:           The int amount of preceding frames, from which the reference is chosen. DEFAULT is 10
+        - score_function:   A callable, which gets the statistics dict of a frame and returns a float score. The frame
+                            with the LOWEST score is chosen as the reference. DEFAULT is the "default_score" function
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict config:
+        """
+        self.config = self.DEFAULT_CONFIG.copy()
+        self.config.update(config)
+
+        # The queue contains tuples (position, score, key) of the frames within the window, where the scores are
+        # strictly ascending. A frame, which has a worse score than a frame pushed after it, can never be the best
+        # reference again, because it also leaves the window earlier
+        self.queue = deque()
+        self.position = 0
+
+    def push(self, key, statistics):
+        """
+        Adds a frame to the window.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param key:             Anything, which identifies the frame, for example its file name
+        :param dict statistics: The statistics of the frame, as they are returned by FrameStatisticsIndex.statistics
+        :return: void
+        """
+        score = self.config['score_function'](statistics)
+
+        while self.queue and self.queue[-1][1] >= score:
+            self.queue.pop()
+        self.queue.append((self.position, score, key))
+        self.position += 1
+
+        # Removing the frames, which have left the window
+        while self.queue[0][0] < self.position - self.config['window']:
+            self.queue.popleft()
+
+    def reference(self):
+        """
+        Returns the key of the best reference frame within the window of the frames pushed so far. Returns None if no
+        frame has been pushed yet.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: The key of the reference frame
+        """
+        if not self.queue:
+            return None
+        return self.queue[0][2]
+
+    @staticmethod
+    def default_score(statistics):
+        """
+        The default score of a frame: The mean grayscale value plus twice the difference energy to its predecessor. A
+        frame with a lightning has a large difference energy to the frame before. The energy of the very first frame is
+        unknown, so it is assumed to be 0.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param dict statistics:
+        :return: float
+        """
+        energy = statistics['difference_energy']
+        if math.isnan(energy):
+            energy = 0
+        return statistics['mean'] + 2.0 * energy
+
+
+def select_references(index, config=None):
+    """
+    Selects the reference frame for every frame of the given statistics index in a single pass. Returns a list with
+    the file name of the reference for each frame, in the order of the index. The first frame has no preceding frames
+    and thus None as its reference.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param FrameStatisticsIndex index:
+    :param dict config:     The config of the ReferenceFrameSelector. DEFAULT is None for the default config
+    :return: List(str)
+    """
+    selector = ReferenceFrameSelector(config or {})
+    references = []
+    for name in index.names:
+        references.append(selector.reference())
+        selector.push(str(name), index.statistics(name))
+
+    return references
@@ -0,0 +1,660 @@
+import os
+import json
+import queue
+import threading
+
+import numpy as np
+
+
+class DetectionLog:
+    """
+    The layout of the detection log, which is shared by the writer and the reader.
+
+    A detection log is a folder, which contains one raw binary file for each column. There are two kinds of columns:
+    The FRAME columns contain one element per processed frame (the frame id, the timestamp and the offset and count of
+    its detections). They form the index to look up the detections of a frame in O(1). The DETECTION columns contain one
+    element per detected area (the frame id, the area coordinates, the classification and the features).
+    The files are only ever appended to, so that they can be memory mapped for the analysis of huge recordings. The
+    header file "header.json" contains the names of the features and the names of the classifications, which are
+    stored as integer codes.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    HEADER_FILE_NAME = 'header.json'
+
+    FRAME_COLUMNS = [
+        ('frame_id',    np.int64),
+        ('timestamp',   np.float64),
+        ('offset',      np.int64),
+        ('count',       np.int32)
+    ]
+
+    DETECTION_COLUMNS = [
+        ('detection_frame_id',  np.int64),
+        ('x_start',             np.int32),
+        ('x_end',               np.int32),
+        ('y_start',             np.int32),
+        ('y_end',               np.int32),
+        ('classification',      np.int16)
+    ]
+
+    FEATURE_DTYPE = np.float32
+
+    # The code for the detections without a classification
+    UNCLASSIFIED = -1
+
+    @classmethod
+    def column_path(cls, path, name):
+        """
+        Returns the path of the binary file for the column with the given name
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :param str name:
+        :return: str
+        """
+        return os.path.join(path, '{}.bin'.format(name))
+
+    @classmethod
+    def feature_column_name(cls, feature):
+        """
+        Returns the column name for the feature with the given name
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str feature:
+        :return: str
+        """
+        return 'feature_{}'.format(feature)
+
+    @classmethod
+    def read_header(cls, path):
+        """
+        Loads the header dict of the log in the given folder
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :return: dict
+        """
+        with open(os.path.join(path, cls.HEADER_FILE_NAME), mode='r') as file:
+            return json.load(file)
+
+    @classmethod
+    def write_header(cls, path, header):
+        """
+        Saves the given header dict into the log folder. The file is replaced atomically, so that a reader never sees a
+        partially written header
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:
+        :param dict header:
+        :return: void
+        """
+        header_path = os.path.join(path, cls.HEADER_FILE_NAME)
+        temp_path = header_path + '.tmp'
+        with open(temp_path, mode='w') as file:
+            json.dump(header, file, indent=4)
+        os.replace(temp_path, header_path)
+
+    @classmethod
+    def columns(cls, features):
+        """
+        Returns the list of all the (name, dtype) tuples of the detection columns for the given feature names
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param list features:
+        :return: List(Tuple(str, type))
+        """
+        return cls.DETECTION_COLUMNS + [(cls.feature_column_name(feature), cls.FEATURE_DTYPE) for feature in features]
+
+
+class DetectionLogWriter:
+    """
+    Writes the detections of the processed frames into an append only, columnar detection log (see DetectionLog).
+
+    The detections are buffered in memory and written as chunks of numpy arrays, once enough detections have been
+    collected. The actual writing to the files is done by a background thread, so that the processing loop is not
+    stalled by the disk. The writer has to be closed (or used as a context manager) to write the last chunk.
+
+    If the log already exists, the new frames are appended to it. Detections, which have been written without their
+    frame being part of the index (because the previous writer crashed), are discarded.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    Changed 19.10.2026
+    Added "frame_count" and "sync" for the checkpoints of the batch runs
+    """
+    def __init__(self, path, features=(), chunk_size=4096, queue_size=8, frame_count=None):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the frame_count parameter
+
+        :param str path:        The path of the log folder. Will be created if it does not exist
+        :param features:        A list with the names of the per area features to be stored. Has to match the features
+                                of an existing log
+        :param int chunk_size:  The amount of frames, which are buffered before they are written as one chunk
+        :param int queue_size:  The maximum amount of chunks waiting to be written. Only if the disk is not able to keep
+                                up and the queue is full, the processing is stalled
+        :param int frame_count: Optionally the amount of frames, to which an existing log is truncated, for example the
+                                frames of a checkpoint. Raises a ValueError, if the log contains less frames. DEFAULT is
+                                None for keeping all the complete frames
+        """
+        self.path = path
+        self.chunk_size = chunk_size
+
+        if os.path.exists(os.path.join(self.path, DetectionLog.HEADER_FILE_NAME)):
+            self.header = DetectionLog.read_header(self.path)
+            if list(features) and list(features) != self.header['features']:
+                raise ValueError('The features {} do not match the features {} of the existing log {}'.format(
+                    list(features),
+                    self.header['features'],
+                    self.path
+                ))
+        else:
+            os.makedirs(self.path, exist_ok=True)
+            self.header = {'version': 1, 'features': list(features), 'classes': []}
+            DetectionLog.write_header(self.path, self.header)
+
+        self.features = self.header['features']
+        self.columns = DetectionLog.columns(self.features)
+        self.class_codes = {name: code for code, name in enumerate(self.header['classes'])}
+
+        self.frame_count = 0
+        self.detection_count = self.recover(frame_count)
+
+        self.frame_buffer = []
+        self.detection_buffer = []
+
+        self.error = None
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def recover(self, limit=None):
+        """
+        Makes all the column files consistent with the frame index: All the frame columns are truncated to the amount
+        of complete frames and the detection columns to the amount of detections of these frames. Returns the amount of
+        detections in the log.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        Added the limit parameter. Sets the "frame_count" attribute
+
+        :param int limit:   Optionally the amount of frames to keep. DEFAULT is None for all the complete frames
+        :return: int
+        """
+        frame_count = None
+        for name, dtype in DetectionLog.FRAME_COLUMNS:
+            count = self.file_length(name, dtype)
+            frame_count = count if frame_count is None else min(frame_count, count)
+
+        if limit is not None:
+            if limit > frame_count:
+                raise ValueError('The log {} only contains {} complete frames instead of {}'.format(
+                    self.path,
+                    frame_count,
+                    limit
+                ))
+            frame_count = limit
+
+        detection_count = 0
+        if frame_count > 0:
+            offsets = np.fromfile(DetectionLog.column_path(self.path, 'offset'), np.int64)
+            counts = np.fromfile(DetectionLog.column_path(self.path, 'count'), np.int32)
+            detection_count = int(offsets[frame_count - 1] + counts[frame_count - 1])
+
+        for name, dtype in DetectionLog.FRAME_COLUMNS:
+            self.truncate(name, dtype, frame_count)
+        for name, dtype in self.columns:
+            self.truncate(name, dtype, detection_count)
+
+        self.frame_count = frame_count
+        return detection_count
+
+    def file_length(self, name, dtype):
+        """
+        Returns the amount of elements in the file of the given column
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param dtype:
+        :return: int
+        """
+        column_path = DetectionLog.column_path(self.path, name)
+        if not os.path.exists(column_path):
+            return 0
+        return os.path.getsize(column_path) // np.dtype(dtype).itemsize
+
+    def truncate(self, name, dtype, length):
+        """
+        Truncates the file of the given column to the given amount of elements, creating it if it does not exist
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param dtype:
+        :param int length:
+        :return: void
+        """
+        with open(DetectionLog.column_path(self.path, name), mode='ab') as file:
+            file.truncate(length * np.dtype(dtype).itemsize)
+
+    def write(self, frame_id, timestamp, areas, classifications=None, features=None):
+        """
+        Adds the detections of one frame to the log.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:            The id of the frame
+        :param float timestamp:         The timestamp of the frame
+        :param list areas:              The list of the area tuples detected in the frame
+        :param list classifications:    The list of the string classifications of the areas. DEFAULT is None for
+                                        unclassified areas
+        :param dict features:           A dict, which contains an array with one value per area for each feature name.
+                                        Missing features are stored as NaN. DEFAULT is None
+        :return: void
+        """
+        self.raise_error()
+
+        count = len(areas)
+        self.frame_buffer.append((frame_id, timestamp, self.detection_count, count))
+
+        if count > 0:
+            areas = np.asarray(areas, np.int64).reshape((count, 4))
+            columns = {
+                'detection_frame_id':   np.full(count, frame_id, np.int64),
+                'x_start':              areas[:, 0],
+                'x_end':                areas[:, 1],
+                'y_start':              areas[:, 2],
+                'y_end':                areas[:, 3],
+                'classification':       self.encode_classifications(classifications, count)
+            }
+            features = features or {}
+            for feature in self.features:
+                column_name = DetectionLog.feature_column_name(feature)
+                columns[column_name] = np.asarray(features.get(feature, np.full(count, np.nan)))
+
+            self.detection_buffer.append(columns)
+            self.detection_count += count
+
+        self.frame_count += 1
+
+        if len(self.frame_buffer) >= self.chunk_size:
+            self.flush()
+
+    def encode_classifications(self, classifications, count):
+        """
+        Turns the given list of classification strings into an array of integer codes. New classifications are added
+        to the header.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param list classifications:
+        :param int count:
+        :return: np.ndarray
+        """
+        if classifications is None:
+            return np.full(count, DetectionLog.UNCLASSIFIED, np.int16)
+
+        codes = np.empty(count, np.int16)
+        for i, classification in enumerate(classifications):
+            if classification not in self.class_codes:
+                self.class_codes[classification] = len(self.header['classes'])
+                self.header['classes'].append(classification)
+            codes[i] = self.class_codes[classification]
+
+        return codes
+
+    def flush(self):
+        """
+        Hands the buffered frames over to the background thread to be written as one chunk
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        if len(self.frame_buffer) == 0:
+            return
+
+        chunk = {}
+        frames = list(zip(*self.frame_buffer))
+        for (name, dtype), values in zip(DetectionLog.FRAME_COLUMNS, frames):
+            chunk[name] = np.asarray(values, dtype)
+        for name, dtype in self.columns:
+            if self.detection_buffer:
+                chunk[name] = np.concatenate([columns[name] for columns in self.detection_buffer]).astype(dtype)
+            else:
+                chunk[name] = np.zeros(0, dtype)
+
+        # The header is copied, because new classifications may be added while the chunk is waiting to be written
+        self.queue.put((chunk, json.loads(json.dumps(self.header))))
+        self.frame_buffer = []
+        self.detection_buffer = []
+
+    def sync(self):
+        """
+        Writes all the buffered frames and waits until the background thread has written them. Returns the dict, which
+        maps the names of all the columns to the sizes of their files in bytes, which are the offsets, at which the
+        next frames will be appended.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        Changed 19.10.2026
+        The files of the columns, the header and the folder are flushed to the disk with fsync. Otherwise a checkpoint,
+        which is saved after the sync, could describe frames, which are lost in a power failure
+
+        :return: dict
+        """
+        self.flush()
+        self.queue.join()
+        self.raise_error()
+
+        for name, dtype in DetectionLog.FRAME_COLUMNS + self.columns:
+            with open(DetectionLog.column_path(self.path, name), mode='ab') as file:
+                os.fsync(file.fileno())
+        with open(os.path.join(self.path, DetectionLog.HEADER_FILE_NAME), mode='rb') as file:
+            os.fsync(file.fileno())
+        # The new files and the replaced header are only durable, once the folder itself is flushed. Folders can not be
+        # opened on Windows
+        if os.name == 'posix':
+            descriptor = os.open(self.path, os.O_RDONLY)
+            try:
+                os.fsync(descriptor)
+            finally:
+                os.close(descriptor)
+
+        return {
+            name: self.file_length(name, np.uint8)
+            for name, dtype in DetectionLog.FRAME_COLUMNS + self.columns
+        }
+
+    def run(self):
+        """
+        The loop of the background thread, which appends the chunks to the column files
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        while True:
+            item = self.queue.get()
+            try:
+                if item is None:
+                    return
+                chunk, header = item
+                DetectionLog.write_header(self.path, header)
+                # The detection columns are written BEFORE the frame index, so that the index never points to
+                # detections, that do not exist yet
+                for name, dtype in self.columns + DetectionLog.FRAME_COLUMNS:
+                    with open(DetectionLog.column_path(self.path, name), mode='ab') as file:
+                        chunk[name].tofile(file)
+            except Exception as exception:
+                self.error = exception
+            finally:
+                self.queue.task_done()
+
+    def raise_error(self):
+        """
+        Raises the exception, which occurred in the background thread, if there was one
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        if self.error is not None:
+            raise self.error
+
+    def close(self):
+        """
+        Writes all the remaining buffered frames and stops the background thread
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        if self.thread.is_alive():
+            self.flush()
+            self.queue.put(None)
+            self.thread.join()
+        self.raise_error()
+
+
+class DetectionLogReader:
+    """
+    Reads a detection log (see DetectionLog). All the columns are memory mapped, so that the bulk analytics can work
+    on the whole columns as numpy arrays without loading them completely.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+    def __init__(self, path):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str path:    The path of the log folder
+        """
+        self.path = path
+        self.header = DetectionLog.read_header(self.path)
+        self.features = self.header['features']
+        self.classes = self.header['classes']
+
+        frame_columns = {name: self.map_column(name, dtype) for name, dtype in DetectionLog.FRAME_COLUMNS}
+        frame_count = min(len(column) for column in frame_columns.values())
+        self.frame_columns = {name: column[:frame_count] for name, column in frame_columns.items()}
+
+        # Only the detections, which are part of a complete frame are being used
+        detection_count = 0
+        if frame_count > 0:
+            detection_count = int(self.frame_columns['offset'][-1] + self.frame_columns['count'][-1])
+        self.detection_columns = {
+            name: self.map_column(name, dtype)[:detection_count]
+            for name, dtype in DetectionLog.columns(self.features)
+        }
+
+        self._frame_positions = None
+
+    def __len__(self):
+        """
+        The amount of frames in the log
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return len(self.frame_columns['frame_id'])
+
+    def map_column(self, name, dtype):
+        """
+        Returns the read only memory map of the column with the given name
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :param dtype:
+        :return: np.ndarray
+        """
+        column_path = DetectionLog.column_path(self.path, name)
+        if not os.path.exists(column_path) or os.path.getsize(column_path) < np.dtype(dtype).itemsize:
+            # Memory mapping an empty file is not possible
+            return np.zeros(0, dtype)
+        return np.memmap(column_path, dtype=dtype, mode='r')
+
+    @property
+    def frame_ids(self):
+        """
+        The (memory mapped) array of the ids of all the frames in the log
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: np.ndarray
+        """
+        return self.frame_columns['frame_id']
+
+    @property
+    def timestamps(self):
+        """
+        The (memory mapped) array of the timestamps of all the frames in the log
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: np.ndarray
+        """
+        return self.frame_columns['timestamp']
+
+    def column(self, name):
+        """
+        Returns the whole (memory mapped) detection column with the given name. For the features the name of the
+        feature can be used as well.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param str name:
+        :return: np.ndarray
+        """
+        if name in self.features:
+            name = DetectionLog.feature_column_name(name)
+        return self.detection_columns[name]
+
+    def frame_position(self, frame_id):
+        """
+        Returns the position of the frame with the given id within the index. If the frame ids are consecutive, the
+        position is calculated directly, otherwise a dict of all the positions is built once.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :return: int
+        """
+        frame_ids = self.frame_ids
+        if len(frame_ids) == 0:
+            raise KeyError(frame_id)
+
+        position = int(frame_id - frame_ids[0])
+        if 0 <= position < len(frame_ids) and frame_ids[position] == frame_id:
+            return position
+
+        if self._frame_positions is None:
+            self._frame_positions = {int(_frame_id): i for i, _frame_id in enumerate(frame_ids)}
+        return self._frame_positions[int(frame_id)]
+
+    def detections(self, frame_id):
+        """
+        Returns a dict with the (view on the) column arrays of all the detections of the frame with the given id
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :return: dict
+        """
+        position = self.frame_position(frame_id)
+        start = int(self.frame_columns['offset'][position])
+        end = start + int(self.frame_columns['count'][position])
+        return {name: column[start:end] for name, column in self.detection_columns.items()}
+
+    def areas(self, frame_id):
+        """
+        Returns the list of area tuples of the frame with the given id
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :return: List(Tuple(Tuple(int, int), Tuple(int, int)))
+        """
+        detections = self.detections(frame_id)
+        return [
+            ((int(x_start), int(x_end)), (int(y_start), int(y_end)))
+            for x_start, x_end, y_start, y_end in zip(
+                detections['x_start'],
+                detections['x_end'],
+                detections['y_start'],
+                detections['y_end']
+            )
+        ]
+
+    def classifications(self, frame_id):
+        """
+        Returns the list of the string classifications of the areas of the frame with the given id. Unclassified areas
+        are None.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int frame_id:
+        :return: List(str)
+        """
+        codes = self.detections(frame_id)['classification']
+        return [None if code == DetectionLog.UNCLASSIFIED else self.classes[code] for code in codes]
@@ -0,0 +1,202 @@
+# 19.10.2026
+# Processing a long stream of frames, where every frame is compared with its predecessor. Instead of creating new
+# arrays for every frame and every difference, the last frames are kept in a preallocated ring buffer and the
+# differences are computed into a few reusable output slots. So the memory stays constant, no matter how long the
+# stream is.
+import numpy as np
+
+from lightnimage.image import LightningImage
+
+
+class StreamingDifferencer:
+    """
+    The problem:
+    Computing the difference of every frame of a stream with its predecessor creates a new full size array for every
+    difference and the callers have to keep the previous frames alive themselves.
+
+    This class holds the last frames of the stream in a preallocated ring buffer. Every new frame is copied into the
+    buffer and its difference with the frame "lag" frames before is computed into one of a few preallocated output
+    slots. The differences are returned as images, which are read only views on these slots, so nothing is being
+    copied. The slots are being reused though: A returned difference is only valid until "slots" more frames have been
+    pushed. If it is needed longer, it has to be copied.
+
+    The absolute differences are computed as the maximum minus the minimum of the two frames, which can not overflow
+    8 bit integers, so no wider intermediate arrays are needed. With "signed" the differences are computed as 16 bit
+    integers "current - previous" instead.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    """
+
+    def __init__(self, shape, history=2, slots=2, lag=1, threshold=0, replace=255, invert=False, signed=False):
+        """
+        The constructor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param tuple shape:     The (height, width) shape of the frames
+        :param int history:     The amount of frames, that are kept in the ring buffer. Has to be bigger than the lag.
+                                DEFAULT is 2
+        :param int slots:       The amount of output slots for the differences. DEFAULT is 2, so that the previous
+                                difference is still valid, while the current one is being processed
+        :param int lag:         The amount of frames between the two frames of a difference. DEFAULT is 1 for the
+                                direct predecessor
+        :param int threshold:   Absolute differences below this value are replaced, like in LightningImage.difference.
+                                DEFAULT is 0 for no replacements
+        :param int replace:     The value to replace the differences below the threshold with. DEFAULT is 255
+        :param bool invert:     Whether to invert the absolute differences. DEFAULT is False
+        :param bool signed:     Whether to compute the signed 16 bit differences instead of the absolute ones. Can not
+                                be combined with the threshold and invert. DEFAULT is False
+        """
+        if lag < 1 or history <= lag:
+            raise ValueError('The history {} has to be bigger than the lag {}, which has to be at least 1'.format(
+                history,
+                lag
+            ))
+        if signed and (threshold or invert):
+            raise ValueError('The signed differences can not be thresholded or inverted')
+
+        self.shape = tuple(shape)
+        self.history = history
+        self.lag = lag
+        self.threshold = threshold
+        self.replace = replace
+        self.invert = invert
+        self.signed = signed
+
+        self.frames = np.zeros((history, ) + self.shape, np.uint8)
+        self.differences = np.zeros((slots, ) + self.shape, np.int16 if signed else np.uint8)
+        # The scratch buffers for the intermediate results, so that pushing a frame does not allocate any arrays
+        self.minimum = np.zeros(self.shape, np.uint8)
+        self.mask = np.zeros(self.shape, np.bool_)
+
+        # The total amount of frames pushed so far and of differences computed so far
+        self.count = 0
+        self.difference_count = 0
+
+    @property
+    def nbytes(self):
+        """
+        The amount of bytes of all the buffers, which is all the memory the differencer needs
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: int
+        """
+        return self.frames.nbytes + self.differences.nbytes + self.minimum.nbytes + self.mask.nbytes
+
+    def reset(self):
+        """
+        Forgets all the previous frames, so that a new stream can be started with the same buffers.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :return: void
+        """
+        self.count = 0
+        self.difference_count = 0
+
+    def frame(self, age=0):
+        """
+        Returns the frame, which has been pushed "age" frames ago, as a read only view on the ring buffer.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param int age: DEFAULT is 0 for the latest frame
+        :return: LightningImage
+        """
+        if not 0 <= age < min(self.count, self.history):
+            raise IndexError('The frame {} frames ago is not in the history of {} frames'.format(age, self.history))
+
+        return LightningImage(self.read_only(self.frames[(self.count - 1 - age) % self.history]), copy=False)
+
+    def push(self, frame):
+        """
+        Copies the given frame into the ring buffer and returns its difference to the frame "lag" frames before as a
+        read only view on the next output slot. Returns None for the first frames of the stream, which do not have a
+        predecessor yet.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param frame:   The LightningImage or array of the frame
+        :return: LightningImage
+        """
+        array = frame.array if isinstance(frame, LightningImage) else frame
+        if array.shape != self.shape:
+            raise ValueError('The frame of shape {} does not match the shape {} of the stream'.format(
+                array.shape,
+                self.shape
+            ))
+
+        current = self.frames[self.count % self.history]
+        np.copyto(current, array, casting='unsafe')
+        self.count += 1
+
+        if self.count <= self.lag:
+            return None
+
+        previous = self.frames[(self.count - 1 - self.lag) % self.history]
+        out = self.differences[self.difference_count % len(self.differences)]
+        self.difference_count += 1
+
+        if self.signed:
+            np.subtract(current, previous, out=out, dtype=np.int16)
+            return LightningImage(self.read_only(out), copy=False)
+
+        np.maximum(current, previous, out=out)
+        np.minimum(current, previous, out=self.minimum)
+        np.subtract(out, self.minimum, out=out)
+
+        if self.threshold:
+            np.less(out, self.threshold, out=self.mask)
+        if self.invert:
+            np.subtract(255, out, out=out)
+        if self.threshold:
+            np.copyto(out, self.replace, where=self.mask, casting='unsafe')
+
+        return LightningImage(self.read_only(out), copy=False)
+
+    def stream(self, frames):
+        """
+        A generator, which pushes all the given frames and yields the tuples of the frame index and the difference
+        for all the frames, that have a predecessor.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param frames:  An iterable of LightningImages or arrays
+        :return: Generator(Tuple(int, LightningImage))
+        """
+        for i, frame in enumerate(frames):
+            difference = self.push(frame)
+            if difference is not None:
+                yield i, difference
+
+    @staticmethod
+    def read_only(array):
+        """
+        Returns a read only view on the given array, so that the buffers can not be modified through the returned
+        images.
+
+        CHANGELOG
+
+        Added 19.10.2026
+
+        :param np.ndarray array:
+        :return: np.ndarray
+        """
+        view = array.view()
+        view.flags.writeable = False
+        return view
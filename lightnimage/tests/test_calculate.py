@@ -2,6 +2,8 @@ from unittest import TestCase
 import numpy as np
 
 from lightnimage.calculate import average_2d, threshold_sequencing
+from lightnimage.calculate import tile_ranges, merge_overlapping_areas, block_mean
+from lightnimage.calculate import integral_image, area_sums, areas_to_array, area_features
 
 
 class TestAverageCalculations(TestCase):
@@ -47,4 +49,119 @@ class TestSequencingCalculations(TestCase):
         sequences = threshold_sequencing(array, 4)
         self.assertEqual(1, len(sequences))
         sequence = sequences[0]
-        self.assertEqual((3, 9), sequence)
\ No newline at end of file
+        self.assertEqual((3, 9), sequence)
+
+    def test_1d_threshold_sequencing_open_sequence_at_the_end(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.asarray([0, 5, 0, 0, 5, 5])
+        sequences = threshold_sequencing(array, 4)
+        self.assertListEqual([(1, 2), (4, 6)], sequences)
+
+
+class TestTilingCalculations(TestCase):
+
+    def test_tile_ranges_overlap_and_cover_the_whole_axis(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        ranges = tile_ranges(10, 4, 1)
+        self.assertListEqual([(0, 4), (3, 7), (6, 10)], ranges)
+
+    def test_overlapping_areas_are_merged(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        areas = [((0, 10), (0, 10)), ((8, 20), (5, 12)), ((50, 60), (50, 60))]
+        merged = merge_overlapping_areas(areas)
+        self.assertListEqual([((0, 20), (0, 12)), ((50, 60), (50, 60))], merged)
+
+
+class TestDownsamplingCalculations(TestCase):
+
+    def test_block_mean_with_incomplete_border_blocks(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.asarray([
+            [1, 3, 6],
+            [3, 1, 8],
+            [2, 2, 1]
+        ])
+        expected = np.asarray([
+            [2, 7],
+            [2, 1]
+        ])
+        self.assertTrue((expected == block_mean(array, 2)).all())
+
+
+class TestAreaFeatureCalculations(TestCase):
+
+    def test_area_sums_from_integral_image(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.random.randint(0, 256, (20, 30)).astype(np.uint8)
+        areas = [((0, 29), (0, 19)), ((3, 7), (10, 12)), ((5, 5), (5, 5))]
+        sums = area_sums(integral_image(array), areas_to_array(areas, array.shape))
+        expected = [np.sum(array[y0:y1 + 1, x0:x1 + 1], dtype=np.float64) for (x0, x1), (y0, y1) in areas]
+        self.assertListEqual(expected, list(sums))
+
+    def test_area_features(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.zeros((20, 30), np.uint8)
+        # A vertical line in the first area and nothing in the second area
+        array[2:12, 4] = 255
+        # The areas have exclusive ends
+        features = area_features(array, [((0, 10), (0, 20)), ((20, 30), (0, 10))])
+
+        self.assertListEqual([10, 10], list(features['width']))
+        self.assertAlmostEqual(10 / 200, features['fill_ratio'][0])
+        self.assertEqual(10 * 255, features['intensity_sum'][0])
+        self.assertEqual(255, features['intensity_max'][0])
+        self.assertAlmostEqual(4, features['centroid_x'][0])
+        self.assertAlmostEqual(6.5, features['centroid_y'][0])
+        self.assertEqual(1, features['horizontal_extent'][0])
+        self.assertEqual(10, features['vertical_extent'][0])
+        # The empty area has its center as the centroid
+        self.assertEqual(0, features['fill_ratio'][1])
+        self.assertAlmostEqual(24.5, features['centroid_x'][1])
+
+    def test_area_features_match_the_pixels(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        random = np.random.RandomState(5)
+        array = (random.rand(40, 50) > 0.9) * random.randint(1, 256, (40, 50))
+        array = array.astype(np.uint8)
+        # Overlapping areas, areas at the borders (the last pixel is the maximum) and an empty area
+        array[-1, -1] = 255
+        areas = [((0, 50), (0, 40)), ((10, 30), (5, 25)), ((45, 50), (30, 40)), ((3, 4), (7, 8)), ((20, 20), (3, 9))]
+        features = area_features(array, areas, threshold=100)
+
+        for i, ((x_start, x_end), (y_start, y_end)) in enumerate(areas):
+            region = array[y_start:y_end, x_start:x_end]
+            lit_rows, lit_columns = np.nonzero(region > 100)
+            self.assertEqual(np.sum(region), features['intensity_sum'][i])
+            self.assertEqual(np.max(region, initial=0), features['intensity_max'][i])
+            self.assertEqual(len(lit_rows) / max(region.size, 1), features['fill_ratio'][i])
+            if len(lit_rows) > 0:
+                self.assertEqual(np.ptp(lit_columns) + 1, features['horizontal_extent'][i])
+                self.assertEqual(np.ptp(lit_rows) + 1, features['vertical_extent'][i])
+            if np.sum(region) > 0:
+                rows, columns = np.indices(region.shape)
+                self.assertAlmostEqual(np.sum((columns + x_start) * region) / np.sum(region), features['centroid_x'][i])
+                self.assertAlmostEqual(np.sum((rows + y_start) * region) / np.sum(region), features['centroid_y'][i])
+
+        self.assertEqual(255, features['intensity_max'][2])
+        self.assertEqual(0, features['width'][4])
@@ -1,7 +1,13 @@
 from unittest import TestCase
 import math
 
-from lightnimage.engine import SimpleAreaGroupingEngine
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.engine import SimpleAreaGroupingEngine, SimpleAreaSegmentationEngine
+from lightnimage.engine import TrackingAreaSegmentationEngine, TiledAreaSegmentationEngine
+from lightnimage.engine import MultiScaleAreaSegmentationEngine, SkeletonVectorisationEngine
+from lightnimage.engine import SimpleLightningClassificationEngine, XYCutAreaSegmentationEngine
 
 
 class TestSimpleAreaGroupingEngine(TestCase):
@@ -52,3 +58,202 @@ class TestSimpleAreaGroupingEngine(TestCase):
     def test_math_infinite(self):
         self.assertTrue(math.inf > 800000)
         self.assertTrue(math.inf > 0)
+
+
+class TestTrackingAreaSegmentationEngine(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        # A binary frame with a single white block, as it would come out of the difference and the preprocessing
+        self.array = np.zeros((60, 80), np.float64)
+        self.array[10:20, 30:40] = 255
+
+    def test_first_frame_is_searched_completely(self):
+        engine = TrackingAreaSegmentationEngine({})
+        areas = engine(LightningImage(self.array))
+        self.assertEqual('full', engine.mode)
+        self.assertListEqual([((30, 40), (10, 20))], areas)
+
+    def test_consecutive_frame_only_searches_regions_of_interest(self):
+        engine = TrackingAreaSegmentationEngine({})
+        full_areas = engine(LightningImage(self.array))
+        roi_areas = engine(LightningImage(self.array))
+        self.assertEqual('roi', engine.mode)
+        self.assertListEqual(full_areas, roi_areas)
+
+    def test_new_activity_outside_regions_forces_full_search(self):
+        engine = TrackingAreaSegmentationEngine({'margin': 5})
+        engine(LightningImage(self.array))
+
+        array = self.array.copy()
+        array[40:50, 60:70] = 255
+        areas = engine(LightningImage(array))
+        self.assertEqual('full', engine.mode)
+        self.assertEqual(2, len(areas))
+
+    def test_full_search_is_forced_periodically(self):
+        engine = TrackingAreaSegmentationEngine({'full_frame_interval': 3})
+        modes = []
+        for i in range(6):
+            engine(LightningImage(self.array))
+            modes.append(engine.mode)
+        self.assertListEqual(['full', 'roi', 'roi', 'full', 'roi', 'roi'], modes)
+
+
+class TestTiledAreaSegmentationEngine(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        # The first block crosses the boundary between the first tiles, the second one is within a single tile
+        self.array = np.zeros((100, 120), np.uint8)
+        self.array[20:45, 25:40] = 255
+        self.array[70:80, 90:100] = 255
+
+    def test_tiled_areas_equal_areas_of_whole_image(self):
+        expected = SimpleAreaSegmentationEngine({})(LightningImage(self.array))
+        engine = TiledAreaSegmentationEngine({'tile_size': 32, 'overlap': 8})
+        areas = engine(LightningImage(self.array))
+        self.assertListEqual(sorted(expected), sorted(areas))
+
+    def test_tiles_processed_in_parallel(self):
+        sequential = TiledAreaSegmentationEngine({'tile_size': 32, 'overlap': 8})
+        parallel = TiledAreaSegmentationEngine({'tile_size': 32, 'overlap': 8, 'workers': 4})
+        image = LightningImage(self.array)
+        self.assertListEqual(sorted(sequential(image)), sorted(parallel(image)))
+
+
+class TestMultiScaleAreaSegmentationEngine(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.array = np.zeros((130, 150), np.uint8)
+        self.array[20:45, 25:40] = 255
+        self.array[90:93, 101:140] = 255
+
+    def test_multi_scale_areas_equal_areas_of_whole_image(self):
+        expected = SimpleAreaSegmentationEngine({})(LightningImage(self.array))
+        engine = MultiScaleAreaSegmentationEngine({'factor': 3, 'levels': 2})
+        areas = engine(LightningImage(self.array))
+        self.assertListEqual(sorted(expected), sorted(areas))
+
+    def test_empty_image_has_no_areas(self):
+        engine = MultiScaleAreaSegmentationEngine({})
+        areas = engine(LightningImage(np.zeros((64, 64), np.uint8)))
+        self.assertListEqual([], areas)
+
+
+class TestXYCutAreaSegmentationEngine(TestCase):
+
+    def test_no_phantom_areas_for_shared_rows_and_columns(self):
+        array = np.zeros((60, 80), np.uint8)
+        array[10:21, 10:21] = 255
+        array[15:31, 50:61] = 255
+        array[40:51, 12:19] = 255
+
+        # The simple engine creates all four combinations of the two column and the two row sequences
+        self.assertEqual(4, len(SimpleAreaSegmentationEngine({'checking': False})(LightningImage(array))))
+
+        areas = XYCutAreaSegmentationEngine({})(LightningImage(array))
+        self.assertListEqual(
+            sorted([((10, 21), (10, 21)), ((50, 61), (15, 31)), ((12, 19), (40, 51))]),
+            sorted(areas)
+        )
+
+    def test_nested_cuts(self):
+        # The first two blocks share columns, so they can only be separated by cutting along x and then along y
+        array = np.zeros((40, 50), np.uint8)
+        array[0:11, 0:11] = 255
+        array[20:31, 5:16] = 255
+        array[20:31, 30:41] = 255
+        areas = XYCutAreaSegmentationEngine({})(LightningImage(array))
+        self.assertListEqual(
+            sorted([((0, 11), (0, 11)), ((5, 16), (20, 31)), ((30, 41), (20, 31))]),
+            sorted(areas)
+        )
+
+    def test_max_depth_limits_cuts(self):
+        array = np.zeros((40, 50), np.uint8)
+        array[0:11, 0:11] = 255
+        array[20:31, 5:16] = 255
+        areas = XYCutAreaSegmentationEngine({'max_depth': 0})(LightningImage(array))
+        self.assertListEqual([((0, 16), (0, 31))], areas)
+
+    def test_empty_image(self):
+        self.assertListEqual([], XYCutAreaSegmentationEngine({})(LightningImage(np.zeros((10, 10), np.uint8))))
+
+
+class TestSkeletonVectorisationEngine(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        # A vertical lightning with a thickness of 3 pixels and a diagonal branch going to the lower right
+        self.array = np.zeros((60, 60), np.uint8)
+        self.array[5:50, 28:31] = 255
+        for i in range(20):
+            self.array[25 + i, 30 + i:33 + i] = 255
+
+    def test_branching_lightning_is_vectorized(self):
+        engine = SkeletonVectorisationEngine({})
+        vector = engine(LightningImage(self.array))
+        self.assertEqual(3, len(vector))
+        self.assertEqual(1, vector.branch_count)
+        # The skeleton of the trunk alone is roughly 45 pixels long and the branch roughly 20 * sqrt(2)
+        self.assertTrue(60 < vector.length < 80)
+        # The vector takes only a fraction of the memory of the mask
+        self.assertTrue(vector.nbytes * 10 < self.array.nbytes)
+
+    def test_vectorizing_area_keeps_image_coordinates(self):
+        engine = SkeletonVectorisationEngine({})
+        vector = engine(LightningImage(self.array), ((20, 40), (0, 59)))
+        (x_start, x_end), (y_start, y_end) = vector.bounding_box()
+        self.assertTrue(25 <= x_start <= 31)
+        self.assertTrue(5 <= y_start <= 8)
+
+    def test_closed_loop_is_vectorized(self):
+        array = np.zeros((30, 30), np.uint8)
+        array[5:25, 5:8] = 255
+        array[5:8, 5:25] = 255
+        array[22:25, 5:25] = 255
+        array[5:25, 22:25] = 255
+        vector = SkeletonVectorisationEngine({})(LightningImage(array))
+        self.assertEqual(1, len(vector))
+        self.assertEqual(0, vector.branch_count)
+        polyline = vector.polyline(0)
+        self.assertListEqual(polyline[0].tolist(), polyline[-1].tolist())
+
+
+class TestSimpleLightningClassificationEngine(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.array = np.zeros((60, 60), np.uint8)
+        # A vertical and a horizontal line and a blob
+        self.array[5:40, 10] = 255
+        self.array[50, 20:55] = 255
+        self.array[10:20, 30:40] = 255
+        # All three areas are squares, so only the pixels within them make the difference
+        self.areas = [((0, 28), (2, 30)), ((20, 54), (35, 69)), ((30, 39), (10, 19))]
+
+    def test_areas_classified_by_their_content(self):
+        engine = SimpleLightningClassificationEngine({})
+        area_types = engine(LightningImage(self.array), self.areas)
+        self.assertListEqual(['ground', 'cross', '???'], [guess for guess, area in area_types])
+        self.assertListEqual(self.areas, [area for guess, area in area_types])
+        self.assertEqual(3, len(engine.features['fill_ratio']))
+
+    def test_custom_classification_function(self):
+        engine = SimpleLightningClassificationEngine({
+            'classification_function': lambda features: np.where(features['fill_ratio'] > 0.5, 'blob', 'line')
+        })
+        area_types = engine(LightningImage(self.array), self.areas)
+        self.assertListEqual(['line', 'line', 'blob'], [guess for guess, area in area_types])
@@ -0,0 +1,109 @@
+from unittest import TestCase
+import json
+import io
+import os
+from contextlib import redirect_stdout, redirect_stderr
+
+from lightnimage.image import LightningImage
+from lightnimage.evaluation import area_size, intersection_over_union, match_areas, load_annotations
+from lightnimage.evaluation import DetectionPipeline, evaluate, compare, format_reports
+from lightnimage.cli import main
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+ANNOTATIONS_PATH = os.path.join(SOURCE_PATH, 'aragats-annotations.json')
+
+
+class TestMatching(TestCase):
+
+    def test_intersection_over_union(self):
+        # The ends are exclusive, so the area has 10 x 10 pixels
+        area = ((0, 10), (0, 10))
+        self.assertEqual(100, area_size(area))
+        self.assertEqual(1.0, intersection_over_union(area, area))
+        self.assertEqual(0.0, intersection_over_union(area, ((10, 20), (0, 10))))
+        # Half of the area is shifted out: 50 common pixels of 150
+        self.assertAlmostEqual(1 / 3, intersection_over_union(area, ((5, 15), (0, 10))))
+        self.assertAlmostEqual(0.25, intersection_over_union(area, ((0, 5), (0, 5))))
+
+    def test_match_areas(self):
+        annotated_areas = [((0, 10), (0, 10)), ((100, 150), (100, 150))]
+        detected_areas = [((0, 5), (0, 5)), ((1, 10), (0, 10)), ((0, 10), (0, 8)), ((100, 140), (100, 150))]
+
+        matches = match_areas(detected_areas, annotated_areas)
+        # The best fitting area is matched, the other one on the same annotation is a false positive
+        self.assertListEqual([(1, 0), (3, 1)], sorted((i, j) for i, j, iou in matches))
+        self.assertEqual(0.9, [iou for i, j, iou in matches if i == 1][0])
+
+        self.assertListEqual([], match_areas(detected_areas, annotated_areas, threshold=0.95))
+        self.assertListEqual([], match_areas([], annotated_areas))
+
+
+class TestEvaluation(TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        cls.annotations = load_annotations(ANNOTATIONS_PATH)
+
+    def test_annotations(self):
+        self.assertEqual(14, len(self.annotations))
+        for annotation in self.annotations:
+            self.assertTrue(os.path.exists(annotation['frame']))
+            self.assertTrue(os.path.exists(annotation['reference']))
+            for (x_start, x_end), (y_start, y_end) in annotation['areas']:
+                self.assertTrue(0 <= x_start < x_end <= 1280 and 0 <= y_start < y_end <= 720)
+
+    def test_perfect_pipeline(self):
+        frames = {}
+        for annotation in self.annotations:
+            frames[annotation['frame']] = LightningImage.from_file(annotation['frame'])
+            frames[annotation['reference']] = LightningImage.from_file(annotation['reference'])
+        areas = {id(frames[annotation['frame']]): annotation['areas'] for annotation in self.annotations}
+
+        report = evaluate(lambda image, reference: areas[id(image)], self.annotations, repeat=1, frames=frames)
+        self.assertEqual(14, report['frames'])
+        self.assertEqual((12, 0, 0), (report['true_positives'], report['false_positives'], report['false_negatives']))
+        for key in ('precision', 'recall', 'f1', 'mean_iou'):
+            self.assertEqual(1.0, report[key])
+
+    def test_detection_pipeline(self):
+        report = evaluate(DetectionPipeline({}), self.annotations, repeat=1)
+
+        counted = sum(result['true_positives'] + result['false_positives'] for result in report['results'])
+        self.assertEqual(counted, sum(len(result['areas']) for result in report['results']))
+        self.assertEqual(12, report['true_positives'] + report['false_negatives'])
+        # The floors of the accuracy of the default detection. A faster variant must not fall below them
+        self.assertGreaterEqual(report['precision'], 0.4)
+        self.assertGreaterEqual(report['recall'], 0.8)
+        self.assertGreaterEqual(report['mean_iou'], 0.7)
+        self.assertGreater(report['frames_per_second'], 0)
+        self.assertGreater(report['traced_peak_frames'], 0)
+
+        # The upper end of the lightning in this frame is segmented as a separate area, which is a false positive
+        results = {result['frame']: result for result in report['results']}
+        self.assertEqual(0, results['aragats-0017.jpg']['true_positives'])
+        self.assertGreater(results['aragats-0186.jpg']['false_positives'], 0)
+
+    def test_compare_and_format(self):
+        reports = compare(
+            {'simple': DetectionPipeline({}), 'grouped': DetectionPipeline({'grouping': {}})},
+            self.annotations[:4],
+            repeat=1
+        )
+        self.assertListEqual(['simple', 'grouped'], list(reports))
+
+        lines = format_reports(reports).split('\n')
+        self.assertEqual(3, len(lines))
+        self.assertTrue(lines[1].startswith('simple'))
+        self.assertTrue(lines[2].startswith('grouped'))
+
+    def test_evaluate_command(self):
+        stdout = io.StringIO()
+        with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+            code = main(['evaluate', ANNOTATIONS_PATH, '--engine', 'tiled', '--grouping', '--repeat', '1'])
+
+        self.assertEqual(0, code)
+        reports = json.loads(stdout.getvalue())
+        self.assertListEqual(['tiled', 'tiled+grouping'], sorted(reports))
+        self.assertEqual(14, reports['tiled']['frames'])
+        self.assertNotIn('results', reports['tiled'])
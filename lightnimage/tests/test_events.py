@@ -0,0 +1,89 @@
+from unittest import TestCase
+import tempfile
+import os
+
+import numpy as np
+
+from lightnimage.events import TemporalEventBuilder, events_from_log
+from lightnimage.storage import DetectionLogWriter, DetectionLogReader
+
+
+class TestTemporalEventBuilder(TestCase):
+
+    def test_overlapping_areas_of_consecutive_frames_form_one_event(self):
+        builder = TemporalEventBuilder({})
+        self.assertListEqual([], builder.push(0, [((10, 20), (10, 20))], [5]))
+        self.assertListEqual([], builder.push(1, [((15, 25), (12, 30)), ((200, 210), (0, 5))], [9, 1]))
+        self.assertListEqual([], builder.push(2, [((18, 22), (25, 40))], [3]))
+        # The small area in the corner did not continue in the frames 2 and 3
+        finished = builder.push(3, [])
+        self.assertEqual(1, len(finished))
+        self.assertEqual(((200, 210), (0, 5)), finished[0].area)
+
+        events = builder.finish()
+        self.assertEqual(1, len(events))
+        event = events[0]
+        self.assertEqual((0, 2, 3), (event.first_frame, event.last_frame, event.frame_span))
+        self.assertEqual(((10, 25), (10, 40)), event.area)
+        self.assertEqual((9, 1), (event.peak_intensity, event.peak_frame))
+        self.assertEqual(3, event.detection_count)
+
+    def test_gap_ends_event(self):
+        frames = [(0, [((0, 10), (0, 10))], None), (2, [((0, 10), (0, 10))], None)]
+        self.assertEqual(2, len(list(TemporalEventBuilder({'max_gap': 1}).build(frames))))
+        self.assertEqual(1, len(list(TemporalEventBuilder({'max_gap': 2}).build(frames))))
+
+    def test_distance_links_nearby_areas(self):
+        frames = [(0, [((0, 10), (0, 10))], None), (1, [((15, 20), (0, 10))], None)]
+        self.assertEqual(2, len(list(TemporalEventBuilder({}).build(frames))))
+        self.assertEqual(1, len(list(TemporalEventBuilder({'distance': 5}).build(frames))))
+
+    def test_area_connecting_two_events_merges_them(self):
+        frames = [
+            (0, [((0, 10), (0, 10)), ((100, 110), (0, 10))], [1, 7]),
+            (1, [((5, 105), (5, 8))], [2])
+        ]
+        events = list(TemporalEventBuilder({'cell_size': 16}).build(frames))
+        self.assertEqual(1, len(events))
+        self.assertEqual(((0, 110), (0, 10)), events[0].area)
+        self.assertEqual(7, events[0].peak_intensity)
+        self.assertEqual(3, events[0].detection_count)
+
+    def test_frames_out_of_order_raise(self):
+        builder = TemporalEventBuilder({})
+        builder.push(5, [])
+        with self.assertRaises(ValueError):
+            builder.push(4, [])
+
+    def test_grid_finds_the_same_events_as_comparing_all(self):
+        random = np.random.RandomState(6)
+        frames = []
+        for frame_id in range(200):
+            areas = []
+            for i in range(random.randint(0, 4)):
+                x, y = random.randint(0, 300, 2)
+                width, height = random.randint(1, 40, 2)
+                areas.append(((int(x), int(x + width)), (int(y), int(y + height))))
+            frames.append((frame_id, areas, None))
+
+        # With a single huge cell, every area is compared with all the active events
+        expected = [event.as_dict() for event in TemporalEventBuilder({'cell_size': 10**6}).build(frames)]
+        events = [event.as_dict() for event in TemporalEventBuilder({'cell_size': 16, 'distance': 0}).build(frames)]
+        self.assertListEqual(expected, events)
+        self.assertEqual(sum(len(areas) for _, areas, _ in frames), sum(e['detection_count'] for e in events))
+        self.assertLess(len(events), sum(len(areas) for _, areas, _ in frames))
+
+    def test_events_from_detection_log(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            path = os.path.join(folder_path, 'log')
+            with DetectionLogWriter(path, features=['intensity_max']) as writer:
+                for frame_id, intensity in zip(range(10, 14), [50, 255, 120, 0]):
+                    areas = [((100, 150), (20, 300))] if intensity else []
+                    writer.write(frame_id, frame_id * 0.04, areas, features={
+                        'intensity_max': np.full(len(areas), intensity)
+                    })
+
+            events = events_from_log(DetectionLogReader(path), intensity_feature='intensity_max')
+            self.assertEqual(1, len(events))
+            self.assertEqual((10, 12), (events[0].first_frame, events[0].last_frame))
+            self.assertEqual((255, 11), (events[0].peak_intensity, events[0].peak_frame))
@@ -1,6 +1,8 @@
 from lightnimage.image import LightningImage
 
 from unittest import TestCase
+import tempfile
+import os
 
 import numpy as np
 
@@ -224,4 +226,47 @@ class TestLightningImage(TestCase):
 
         self.assertTrue((expected == image.array).all())
 
+    def test_difference_is_absolute_and_8_bit(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        image1 = LightningImage(np.asarray([[0, 200], [10, 255]], np.uint8))
+        image2 = LightningImage(np.asarray([[255, 100], [12, 0]], np.uint8))
+
+        difference = image1.difference(image2, threshold=5, replace=0)
+        self.assertEqual(np.uint8, difference.array.dtype)
+        self.assertTrue((np.asarray([[255, 100], [0, 255]]) == difference.array).all())
+
+    def test_row_sum_of_8_bit_image_does_not_overflow(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        image = LightningImage(np.full((10, 3), 255, np.uint8))
+        self.assertListEqual([2550, 2550, 2550], list(image.row_sum()))
 
+    def test_image_without_copy_is_a_view(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.zeros((4, 4), np.uint8)
+        image = LightningImage(array[1:3, 1:3], copy=False)
+        array[1, 1] = 7
+        self.assertEqual(7, image.array[0, 0])
+
+    def test_memory_mapped_image(self):
+        """
+        Added 19.10.2026
+        @return:
+        """
+        array = np.arange(12, dtype=np.uint8).reshape((3, 4))
+        with tempfile.TemporaryDirectory() as folder_path:
+            path = os.path.join(folder_path, 'frame.raw')
+            array.tofile(path)
+
+            image = LightningImage.from_memmap(path, (3, 4))
+            self.assertEqual(4, image.width)
+            self.assertTrue((array == image.array).all())
+            del image
@@ -0,0 +1,65 @@
+from unittest import TestCase
+import subprocess
+import json
+import sys
+import os
+
+# The root folder of the repository, which has to be on the path of the subprocess to import the package
+ROOT_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# The time in seconds, which importing the core modules may take ON TOP of importing numpy
+CORE_IMPORT_BUDGET = 0.5
+
+BENCHMARK_CODE = '''
+import json, sys, time
+start = time.perf_counter()
+import numpy
+numpy_time = time.perf_counter() - start
+start = time.perf_counter()
+{imports}
+core_time = time.perf_counter() - start
+print(json.dumps({{
+    'numpy_time': numpy_time,
+    'core_time': core_time,
+    'modules': sorted(name.split('.')[0] for name in sys.modules)
+}}))
+'''
+
+
+def benchmark_import(imports):
+    """
+    Imports the given modules in a fresh interpreter and returns a dict with the time it took to import numpy, the time
+    it took to import the modules afterwards and the list of all the (top level) modules, that were loaded
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    :param str imports: The import statements
+    :return: dict
+    """
+    output = subprocess.check_output(
+        [sys.executable, '-c', BENCHMARK_CODE.format(imports=imports)],
+        cwd=ROOT_PATH
+    )
+    return json.loads(output.decode())
+
+
+class TestImport(TestCase):
+
+    def test_core_modules_do_not_import_plotting_libraries(self):
+        result = benchmark_import('import lightnimage.image, lightnimage.calculate, lightnimage.engine')
+        self.assertNotIn('matplotlib', result['modules'])
+        self.assertNotIn('scipy', result['modules'])
+
+    def test_plotting_modules_do_not_import_matplotlib_until_used(self):
+        result = benchmark_import('import lightnimage.tools, lightnimage.util')
+        self.assertNotIn('matplotlib', result['modules'])
+
+    def test_core_modules_import_within_budget(self):
+        # The fastest of a few runs is used, so that a single slow start of the interpreter does not fail the test
+        core_time = min(
+            benchmark_import('import lightnimage.image, lightnimage.calculate, lightnimage.engine')['core_time']
+            for i in range(3)
+        )
+        self.assertLess(core_time, CORE_IMPORT_BUDGET)
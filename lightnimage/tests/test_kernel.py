@@ -0,0 +1,203 @@
+from unittest import TestCase, skipUnless
+from unittest.mock import patch
+import math
+
+import numpy as np
+
+from lightnimage.kernel import get_backend, available_backends, benchmark, masked_indices
+from lightnimage.engine import SimpleAreaGroupingEngine, CustomSequenceAreaSegmentationEngine
+
+
+def reference_sequences(start_function, stop_function, array):
+    # The original implementation of the sequence function, which visits every element
+    sequences = []
+    sequence_start = None
+    for i, value in enumerate(array):
+        if sequence_start is None:
+            if start_function(i, value, array):
+                sequence_start = i
+        elif stop_function(i, value, array):
+            sequences.append((sequence_start, i))
+            sequence_start = None
+    if sequence_start is not None:
+        sequences.append((sequence_start, len(array)))
+    return sequences
+
+
+def start_function(i, v, a):
+    if v > 0.6:
+        return True
+    return False
+
+
+def stop_function(i, v, a):
+    if v < 0.4:
+        return True
+    return False
+
+
+class KernelBackendTests:
+    """
+    The tests, which every kernel backend has to pass. The name of the backend is defined by the subclasses
+    """
+    BACKEND = None
+
+    def setUp(self):
+        self.backend = get_backend(self.BACKEND)
+        self.random = np.random.RandomState(3)
+
+    def test_sequence_scan_matches_reference(self):
+        for i in range(20):
+            array = self.random.rand(self.random.randint(1, 60))
+            expected = reference_sequences(start_function, stop_function, array)
+            self.assertListEqual(expected, self.backend.sequence_scan(start_function, stop_function, array))
+
+    def test_vectorized_sequence_scan_matches_loop(self):
+        vectorized_start = lambda i, v, a: v > 0.6
+        vectorized_stop = lambda i, v, a: v < 0.4
+        for i in range(20):
+            array = self.random.rand(self.random.randint(1, 60))
+            self.assertListEqual(
+                reference_sequences(vectorized_start, vectorized_stop, array),
+                self.backend.sequence_scan(vectorized_start, vectorized_stop, array, vectorized=True)
+            )
+
+    def test_sequence_scan_of_empty_array(self):
+        self.assertListEqual([], self.backend.sequence_scan(start_function, stop_function, np.zeros(0)))
+
+    def test_masked_transform_with_index_dependent_function(self):
+        array = self.random.randint(0, 256, (20, 30)).astype(np.uint8)
+        mask = self.random.rand(20, 30) > 0.5
+
+        def function(value, i, j):
+            if (i + j) % 2 == 0:
+                return 255 - value
+            return i + j
+
+        expected = array.copy()
+        for i, j in zip(*np.nonzero(mask)):
+            expected[i, j] = function(array[i, j], i, j)
+
+        result = self.backend.masked_transform(function, array, mask)
+        self.assertEqual(np.uint8, result.dtype)
+        self.assertTrue(np.array_equal(expected, result))
+
+        result = self.backend.masked_transform(function, array, mask, replace=7)
+        self.assertTrue(np.all(result[~mask] == 7))
+        self.assertTrue(np.array_equal(expected[mask], result[mask]))
+
+    def test_vectorized_masked_transform_matches_loop(self):
+        array = self.random.randint(0, 256, (20, 30)).astype(np.uint8)
+        mask = self.random.rand(20, 30) > 0.5
+        function = lambda value, i, j: (value // 2 + i + j) % 256
+        self.assertTrue(np.array_equal(
+            self.backend.masked_transform(function, array, mask),
+            self.backend.masked_transform(function, array, mask, vectorized=True)
+        ))
+
+    def test_masked_transform_in_blocks_of_rows(self):
+        array = self.random.randint(0, 256, (20, 30)).astype(np.uint8)
+        mask = self.random.rand(20, 30) > 0.2
+        function = lambda value, i, j: (value // 2 + i * j) % 256
+        expected = self.backend.masked_transform(function, array, mask)
+
+        # Blocks of 2 rows, the last block only has 1 row
+        blocks = list(masked_indices(mask[:19], block_pixels=60))
+        self.assertEqual(10, len(blocks))
+        self.assertTrue(np.array_equal(np.nonzero(mask[:19])[0], np.concatenate([rows for rows, columns in blocks])))
+
+        with patch('lightnimage.kernel.masked_indices', lambda mask: masked_indices(mask, block_pixels=60)):
+            self.assertTrue(np.array_equal(expected, self.backend.masked_transform(function, array, mask)))
+            vectorized_result = self.backend.masked_transform(function, array, mask, vectorized=True)
+            self.assertTrue(np.array_equal(expected, vectorized_result))
+
+    def test_element_transform_matches_full_mask(self):
+        array = self.random.randint(0, 256, (20, 30)).astype(np.uint8)
+
+        def function(value, i, j):
+            if value > 100:
+                return value - i
+            return j * 2.5
+
+        result = self.backend.element_transform(function, array)
+        self.assertEqual(np.uint8, result.dtype)
+        self.assertTrue(np.array_equal(
+            self.backend.masked_transform(function, array, np.ones(array.shape, bool)),
+            result
+        ))
+
+    def test_pairwise_weights_match_loop(self):
+        distances = self.random.rand(15, 15) * 100
+        sizes = self.random.rand(15, 15) * 1000
+        upper = np.triu_indices(15, 1)
+
+        weights = self.backend.pairwise_weights(lambda d, s: d + math.sqrt(s), distances, sizes)
+        vectorized_weights = self.backend.pairwise_weights(lambda d, s: d + np.sqrt(s), distances, sizes, True)
+        self.assertTrue(np.allclose(distances[upper] + np.sqrt(sizes[upper]), weights[upper]))
+        self.assertTrue(np.allclose(weights[upper], vectorized_weights[upper]))
+
+    def test_functions_without_array_support_fall_back_to_loop(self):
+        distances = self.random.rand(5, 5)
+        sizes = self.random.rand(5, 5)
+        upper = np.triu_indices(5, 1)
+        weights = self.backend.pairwise_weights(lambda d, s: d + math.sqrt(s), distances, sizes, True)
+        self.assertTrue(np.allclose(distances[upper] + np.sqrt(sizes[upper]), weights[upper]))
+
+    def test_grouping_engine_with_backend(self):
+        areas = [((0, 10), (0, 10)), ((12, 20), (0, 10)), ((500, 510), (500, 510))]
+        config = {'backend': self.BACKEND, 'threshold': 50}
+        grouped_areas = SimpleAreaGroupingEngine(config)(areas)
+        loop_grouped_areas = SimpleAreaGroupingEngine(dict(config, **{
+            'weight_function': lambda d, s: d + math.sqrt(s),
+            'vectorized': False
+        }))(areas)
+        self.assertListEqual(sorted([((0, 20), (0, 10)), ((500, 510), (500, 510))]), sorted(grouped_areas))
+        self.assertListEqual(sorted(grouped_areas), sorted(loop_grouped_areas))
+
+    def test_sequence_function_generator_with_backend(self):
+        array = np.array([0, 5, 6, 0, 0, 7, 7, 7], np.float64)
+        sequence_function = CustomSequenceAreaSegmentationEngine.sequence_function_generator(
+            lambda i, v, a: v > 1,
+            lambda i, v, a: v <= 1,
+            backend=self.BACKEND
+        )
+        self.assertListEqual([(1, 3), (5, 8)], sequence_function(array))
+
+    def test_callback_reads_current_outer_array(self):
+        array = np.zeros((4, 5), np.uint8)
+        mask = np.ones((4, 5), bool)
+        offset = np.array([10])
+
+        def function(value, i, j):
+            return value + offset[0]
+
+        self.assertTrue(np.all(self.backend.masked_transform(function, array, mask) == 10))
+        offset[0] = 20
+        self.assertTrue(np.all(self.backend.masked_transform(function, array, mask) == 20))
+
+
+class TestNumpyKernelBackend(KernelBackendTests, TestCase):
+    BACKEND = 'numpy'
+
+
+@skipUnless('numba' in available_backends(), 'numba is not installed')
+class TestNumbaKernelBackend(KernelBackendTests, TestCase):
+    BACKEND = 'numba'
+
+
+class TestKernelBackendSelection(TestCase):
+
+    def test_unknown_backend_raises(self):
+        with self.assertRaises(ValueError):
+            get_backend('fortran')
+
+    def test_default_backend_is_available(self):
+        self.assertIn(get_backend().name, available_backends())
+        # numba is only used, if it is selected explicitly
+        self.assertEqual('numpy', get_backend().name)
+        self.assertIs(get_backend('numpy'), get_backend('numpy'))
+
+    def test_benchmark_measures_all_kernels(self):
+        results = benchmark(['numpy'], size=32, repeat=1)
+        self.assertSetEqual({'sequence_scan', 'masked_transform', 'pairwise_weights'}, set(results['numpy'].keys()))
+        self.assertTrue(all(seconds >= 0 for seconds in results['numpy'].values()))
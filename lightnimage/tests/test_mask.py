@@ -0,0 +1,265 @@
+from unittest import TestCase
+import tempfile
+import os
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.calculate import average_2d
+from lightnimage.mask import RunLengthMask, PackedMask, ExclusionMask, ARAGATS_EXCLUSION
+from lightnimage.engine import SimpleAreaSegmentationEngine, CustomSequenceAreaSegmentationEngine
+from lightnimage.engine import SimpleLightningPreprocessingEngine
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+
+def sparse_binary_image(shape, density, seed=0):
+    random = np.random.RandomState(seed)
+    return np.where(random.rand(*shape) < density, 255, 0).astype(np.uint8)
+
+
+class TestRunLengthMask(TestCase):
+
+    def setUp(self):
+        self.array = sparse_binary_image((70, 90), 0.2)
+        self.mask = RunLengthMask.from_array(self.array)
+
+    def test_encoding_round_trip(self):
+        self.assertTrue(np.array_equal(self.array, self.mask.to_array()))
+        self.assertEqual(np.count_nonzero(self.array), self.mask.count())
+
+    def test_encoding_in_chunks(self):
+        array = sparse_binary_image((RunLengthMask.CHUNK_ROWS * 2 + 5, 20), 0.3, seed=1)
+        self.assertTrue(np.array_equal(array, RunLengthMask.from_array(array).to_array()))
+
+    def test_runs_of_full_rows(self):
+        array = np.zeros((3, 5), np.uint8)
+        array[1] = 255
+        array[2, 4] = 255
+        mask = RunLengthMask.from_array(array)
+        self.assertListEqual([1, 2], list(mask.rows))
+        self.assertListEqual([0, 4], list(mask.starts))
+        self.assertListEqual([5, 5], list(mask.ends))
+
+    def test_projections_match_image(self):
+        image = LightningImage(self.array)
+        self.assertTrue(np.allclose(image.row_sum(), self.mask.row_sum()))
+        self.assertTrue(np.allclose(image.column_sum(), self.mask.column_sum()))
+        self.assertTrue(np.allclose(image.row_sum(scale=10), self.mask.row_sum(scale=10)))
+
+    def test_rectangle_queries_match_dense_array(self):
+        random = np.random.RandomState(2)
+        for i in range(50):
+            x_start, x_end = sorted(random.randint(0, 90, 2))
+            y_start, y_end = sorted(random.randint(0, 70, 2))
+            area = ((int(x_start), int(x_end)), (int(y_start), int(y_end)))
+            expected = np.count_nonzero(self.array[y_start:y_end + 1, x_start:x_end + 1])
+            self.assertEqual(expected, self.mask.count(area))
+            self.assertAlmostEqual(average_2d(self.array, area), self.mask.average(area))
+
+    def test_bounding_box(self):
+        array = np.zeros((50, 60), np.uint8)
+        array[10, 20:25] = 255
+        array[30, 5] = 255
+        self.assertEqual(((5, 25), (10, 31)), RunLengthMask.from_array(array).bounding_box())
+        self.assertIsNone(RunLengthMask.from_array(np.zeros((5, 5))).bounding_box())
+
+    def test_component_areas(self):
+        array = np.zeros((20, 20), np.uint8)
+        # An L shaped component and a diagonal line, which is only connected with the connectivity 8
+        array[2:8, 2] = 255
+        array[7, 2:6] = 255
+        array[10, 10] = 255
+        array[11, 11] = 255
+        array[12, 12] = 255
+        mask = RunLengthMask.from_array(array)
+
+        self.assertListEqual(
+            [((2, 6), (2, 8)), ((10, 13), (10, 13))],
+            mask.component_areas()
+        )
+        self.assertEqual(4, len(mask.component_areas(connectivity=4)))
+
+        # The areas are sliced like the areas of the segmentation engines
+        self.assertEqual(np.count_nonzero(array), sum(
+            np.count_nonzero(array[y_start:y_end, x_start:x_end])
+            for (x_start, x_end), (y_start, y_end) in mask.component_areas()
+        ))
+
+    def test_component_areas_of_u_shape(self):
+        # The two arms of the U are only connected by the bottom row, so the labels have to be propagated back up
+        array = np.zeros((10, 10), np.uint8)
+        array[1:8, 1] = 255
+        array[1:8, 7] = 255
+        array[8, 1:8] = 255
+        self.assertListEqual([((1, 8), (1, 9))], RunLengthMask.from_array(array).component_areas())
+
+    def test_memory_scales_with_lit_pixels(self):
+        array = sparse_binary_image((1000, 1000), 0.005)
+        self.assertLess(RunLengthMask.from_array(array).nbytes, array.nbytes / 10)
+
+
+class TestRunLengthMaskSegmentation(TestCase):
+
+    def setUp(self):
+        self.array = np.zeros((120, 160), np.uint8)
+        self.array[20:40, 30:50] = 255
+        self.array[80:100, 100:140] = 255
+
+    def test_simple_engine_accepts_run_length_mask(self):
+        engine = SimpleAreaSegmentationEngine({})
+        expected = engine(LightningImage(self.array))
+        self.assertListEqual(expected, engine(RunLengthMask.from_array(self.array)))
+
+    def test_custom_sequence_engine_accepts_run_length_mask(self):
+        engine = CustomSequenceAreaSegmentationEngine({})
+        expected = engine(LightningImage(self.array))
+        self.assertListEqual(expected, engine(RunLengthMask.from_array(self.array)))
+        self.assertEqual(2, len(expected))
+
+    def test_preprocessing_returns_run_length_mask(self):
+        image = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0186.jpg'))
+        dense = SimpleLightningPreprocessingEngine({})(image)
+        mask = SimpleLightningPreprocessingEngine({'run_length': True})(image)
+
+        self.assertIsInstance(mask, RunLengthMask)
+        self.assertTrue(np.array_equal(dense.array == 255, mask.to_array() == 255))
+
+
+class TestPackedMask(TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(4)
+        # A width, which is not a multiple of 8, so that the last byte of each row is padded
+        self.mask_a = (random.rand(30, 45) > 0.7).astype(np.uint8)
+        self.mask_b = (random.rand(30, 45) > 0.5).astype(np.uint8)
+        self.packed_a = PackedMask.from_mask(self.mask_a)
+        self.packed_b = PackedMask.from_mask(self.mask_b)
+
+    def test_conversion_from_and_to_get_mask(self):
+        image = LightningImage(np.random.RandomState(1).randint(0, 256, (30, 45)).astype(np.uint8))
+        mask = image.get_mask(100)
+        packed = image.get_mask(100, packed=True)
+
+        self.assertEqual(PackedMask.from_mask(mask), packed)
+        self.assertTrue(np.array_equal(mask, packed.to_mask()))
+        self.assertEqual(30 * 6, packed.nbytes)
+
+    def test_logical_operations(self):
+        self.assertTrue(np.array_equal(self.mask_a & self.mask_b, (self.packed_a & self.packed_b).to_mask()))
+        self.assertTrue(np.array_equal(self.mask_a | self.mask_b, (self.packed_a | self.packed_b).to_mask()))
+        self.assertTrue(np.array_equal(self.mask_a ^ self.mask_b, (self.packed_a ^ self.packed_b).to_mask()))
+        self.assertTrue(np.array_equal(1 - self.mask_a, (~self.packed_a).to_mask()))
+        self.assertEqual(self.mask_a.size - np.sum(self.mask_a), (~self.packed_a).count())
+
+        with self.assertRaises(ValueError):
+            self.packed_a & PackedMask.from_mask(np.zeros((30, 46)))
+
+    def test_counts_within_areas(self):
+        self.assertEqual(np.sum(self.mask_a), self.packed_a.count())
+
+        random = np.random.RandomState(2)
+        for i in range(50):
+            x_start, x_end = sorted(random.randint(0, 45, 2))
+            y_start, y_end = sorted(random.randint(0, 30, 2))
+            area = ((int(x_start), int(x_end)), (int(y_start), int(y_end)))
+            expected = np.sum(self.mask_a[y_start:y_end + 1, x_start:x_end + 1])
+            self.assertEqual(expected, self.packed_a.count(area))
+
+    def test_bounding_box(self):
+        mask = np.zeros((20, 30), np.uint8)
+        mask[3, 17] = 1
+        mask[12, 9:11] = 1
+        self.assertEqual(((9, 18), (3, 13)), PackedMask.from_mask(mask).bounding_box())
+        self.assertIsNone(PackedMask.from_mask(np.zeros((4, 4))).bounding_box())
+
+    def test_nonzero_matches_dense_mask(self):
+        expected_rows, expected_columns = np.nonzero(self.mask_a)
+        rows, columns = self.packed_a.nonzero()
+        self.assertTrue(np.array_equal(expected_rows, rows))
+        self.assertTrue(np.array_equal(expected_columns, columns))
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            path = os.path.join(folder_path, 'mask.npz')
+            self.packed_a.save(path)
+            self.assertEqual(self.packed_a, PackedMask.load(path))
+
+    def test_transform_masked_accepts_packed_and_run_length_masks(self):
+        array = np.random.RandomState(3).randint(0, 256, (30, 45)).astype(np.uint8)
+        expected = LightningImage(array)
+        expected.transform_masked(lambda v, i, j: 0, self.mask_a)
+
+        for mask in (self.packed_a, RunLengthMask.from_array(self.mask_a)):
+            image = LightningImage(array)
+            image.transform_masked(lambda v, i, j: 0, mask)
+            self.assertTrue(np.array_equal(expected.array, image.array))
+
+
+class TestExclusionMask(TestCase):
+
+    def test_rectangles_with_negative_indices(self):
+        exclusion = ExclusionMask([((0, 4), (0, 2)), ((-2, None), (-3, None))])
+        array = np.full((2, 10, 20), 7, np.uint8)
+        exclusion.apply(array)
+
+        expected = np.full((10, 20), 7, np.uint8)
+        expected[0:2, 0:4] = 0
+        expected[7:10, 18:20] = 0
+        self.assertTrue(np.array_equal(expected, array[0]))
+        self.assertTrue(np.array_equal(expected, array[1]))
+        # Everything derived from the shape is only computed once
+        self.assertIs(exclusion.prepare((10, 20)), exclusion.prepare((2, 10, 20)))
+
+    def test_rectangles_have_exclusive_ends(self):
+        # An area of a segmentation engine excludes exactly the pixels, which it covers
+        area = ((3, 8), (2, 5))
+        array = ExclusionMask([area]).apply(np.ones((10, 20), np.uint8))
+        self.assertEqual(0, np.count_nonzero(array[2:5, 3:8]))
+        self.assertEqual(200 - 15, np.count_nonzero(array))
+
+        # A negative end counts from the end and is exclusive as well
+        array = ExclusionMask([((-4, -1), (0, None))]).apply(np.ones((10, 20), np.uint8))
+        self.assertListEqual([1] * 16 + [0, 0, 0, 1], array[0].tolist())
+
+    def test_bitmap(self):
+        bitmap = np.zeros((10, 20), np.uint8)
+        bitmap[4, 5] = 1
+        exclusion = ExclusionMask([((0, 1), (0, 1))], PackedMask.from_mask(bitmap))
+
+        array = exclusion.apply(np.full((10, 20), 7, np.uint8), replace=1)
+        self.assertEqual(1, array[4, 5])
+        self.assertEqual(1, array[0, 0])
+        self.assertEqual(200 - 2, np.count_nonzero(array == 7))
+
+        with self.assertRaises(ValueError):
+            exclusion.apply(np.zeros((20, 10), np.uint8))
+
+    def test_crop_to_working_region(self):
+        # A band at the top, a column at the right and a corner, which can not be cropped
+        exclusion = ExclusionMask([((0, None), (0, 3)), ((-1, None), (None, None)), ((0, 5), (-2, None))])
+        array = np.arange(10 * 20).reshape((10, 20)).astype(np.int64)
+
+        self.assertEqual((slice(3, 10), slice(0, 19)), exclusion.region(array.shape))
+        cropped = exclusion.crop(array)
+        self.assertTrue(np.shares_memory(cropped, array))
+        self.assertEqual((7, 19), cropped.shape)
+
+        # Applying the exclusion to the cropped view is the same as cropping the applied array
+        expected = exclusion.crop(exclusion.apply(array.copy()))
+        self.assertTrue(np.array_equal(expected, exclusion.apply(cropped.copy(), shape=array.shape)))
+
+    def test_aragats_overlays(self):
+        image = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0186.jpg'))
+        reference = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0178.jpg'))
+        difference = reference.difference(image, threshold=70, replace=0)
+        difference.lighten(30, replace=255)
+
+        # Without the exclusion the changing clock and date are detected in the upper left and lower right corner
+        areas = SimpleAreaSegmentationEngine({})(difference)
+        self.assertTrue(any(area[1][1] < 24 for area in areas))
+        self.assertTrue(any(area[0][0] >= 1128 and area[1][0] >= 672 for area in areas))
+
+        ARAGATS_EXCLUSION.apply(difference.array)
+        areas = SimpleAreaSegmentationEngine({})(difference)
+        self.assertListEqual([((440, 600), (355, 373)), ((440, 600), (376, 616))], areas)
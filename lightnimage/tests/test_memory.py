@@ -0,0 +1,154 @@
+from unittest import TestCase
+import os
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.memory import measure_memory, resident_set_size
+from lightnimage.engine import SimpleAreaSegmentationEngine, CustomSequenceAreaSegmentationEngine
+from lightnimage.engine import TiledAreaSegmentationEngine, MultiScaleAreaSegmentationEngine
+from lightnimage.engine import XYCutAreaSegmentationEngine, SimpleAreaGroupingEngine
+from lightnimage.engine import SimpleLightningClassificationEngine, SimpleLightningPreprocessingEngine
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+
+class MemoryBudgetTestCase(TestCase):
+    """
+    The budgets are the peak amount of memory an operation may allocate in addition to its inputs, as a multiple of
+    the bytes of one frame. They are a bit above the current peaks, so that any path, which starts copying or
+    widening the frames, fails the tests.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        # A real frame with a lightning in it and its reference
+        cls.frame = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0186.jpg'))
+        cls.reference = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0181.jpg'))
+        cls.frame_bytes = cls.frame.array.nbytes
+
+        difference = cls.reference.difference(cls.frame, threshold=70, replace=0)
+        difference.lighten(30, replace=255)
+        cls.difference = difference
+
+    def assertWithinBudget(self, budget, function, *args, frame_bytes=None):
+        # The budget can be relative to a smaller frame, for the operations, which loop over the pixels in python
+        frame_bytes = frame_bytes or self.frame_bytes
+        # The first call is not measured, because it may compile or cache things
+        function(*args)
+        result, memory = measure_memory(function, *args)
+        self.assertLessEqual(
+            memory['traced_peak'],
+            budget * frame_bytes,
+            'The peak of {:.2f} frames exceeds the budget of {} frames'.format(
+                memory['traced_peak'] / frame_bytes,
+                budget
+            )
+        )
+        return result, memory
+
+
+class TestImageMemory(MemoryBudgetTestCase):
+
+    def test_image_methods(self):
+        # The masked transformation needs the indices of the masked pixels, so a sparse lightning mask is used
+        mask = self.difference.get_mask(0)
+        budgets = [
+            ('constructor',             1.1, lambda image: LightningImage(image)),
+            ('view',                    0.1, lambda image: LightningImage(image.array, copy=False)),
+            ('copy',                    1.1, lambda image: image.copy()),
+            ('get_mask',                1.1, lambda image: image.get_mask(100)),
+            ('get_mask packed',         1.3, lambda image: image.get_mask(100, packed=True)),
+            ('difference',              2.1, lambda image: image.difference(self.reference, threshold=70)),
+            ('difference inverted',     2.1, lambda image: image.difference(self.reference, 70, invert=True)),
+            ('subtraction',             2.1, lambda image: image - self.reference),
+            ('lighten',                 1.1, lambda image: image.lighten(200)),
+            ('darken',                  1.1, lambda image: image.darken(20)),
+            ('invert',                  0.1, lambda image: image.invert()),
+            ('row_sum',                 0.1, lambda image: image.row_sum()),
+            ('column_sum',              0.1, lambda image: image.column_sum(scale=100)),
+            ('transform',               1.1, lambda image: image.transform(lambda array: array // 2)),
+            ('transform_element_wise',  2.1, lambda image: image.transform_element_wise(
+                lambda value, i, j: value // 2,
+                vectorized=True
+            )),
+            ('transform_masked',        2.1, lambda image: image.transform_masked(
+                lambda value, i, j: value // 2,
+                mask,
+                vectorized=True
+            ))
+        ]
+        for name, budget, function in budgets:
+            with self.subTest(name):
+                # Every operation gets its own copy, because some of them work in place
+                image = self.frame.copy()
+                self.assertWithinBudget(budget, function, image)
+
+    def test_default_transformations(self):
+        # The default calls, which call the function for every pixel in a loop. A part of the frame keeps the loops
+        # short, the budgets are relative to the size of that part
+        small = LightningImage(self.frame.array[:180, :320])
+        dense_mask = np.ones(small.array.shape, np.bool_)
+        function = lambda value, i, j: value // 2
+        budgets = [
+            # The result and one row of float values
+            ('transform_element_wise',  1.5, lambda image: image.transform_element_wise(function)),
+            # The result and the indices and values of one block of rows of the mask (see "kernel.masked_indices")
+            ('transform_masked dense',  2.1, lambda image: image.transform_masked(function, dense_mask)),
+            ('transform_masked dense vectorized', 2.1, lambda image: image.transform_masked(
+                function,
+                dense_mask,
+                vectorized=True
+            ))
+        ]
+        for name, budget, transformation in budgets:
+            with self.subTest(name):
+                image = small.copy()
+                self.assertWithinBudget(budget, transformation, image, frame_bytes=small.array.nbytes)
+                # The transformation has been applied twice
+                self.assertTrue(np.array_equal(small.array // 4, image.array))
+
+    def test_resident_set_size_of_difference(self):
+        if resident_set_size() is None:
+            self.skipTest('The resident set size is not available on this platform')
+
+        # A frame, which is large enough, that its arrays are not served from memory freed before
+        large = LightningImage(np.tile(self.frame.array, (3, 3)))
+        reference = LightningImage(np.tile(self.reference.array, (3, 3)))
+        result, memory = measure_memory(large.difference, reference, 70)
+
+        self.assertEqual(large.array.shape, result.array.shape)
+        # Only a loose upper bound, because the sampling may miss the short peaks and the allocator may reuse pages
+        self.assertLessEqual(memory['rss_peak'], 3 * large.array.nbytes)
+
+
+class TestEngineMemory(MemoryBudgetTestCase):
+
+    def test_segmentation_engines(self):
+        budgets = [
+            # The copy of the frame, which the engine works on
+            ('simple',      1.5, SimpleAreaSegmentationEngine({})),
+            ('custom',      0.5, CustomSequenceAreaSegmentationEngine({})),
+            ('tiled',       1.0, TiledAreaSegmentationEngine({})),
+            # The float64 pyramid levels (a 16th and a 256th of the pixels, 8 bytes each) and the copies of the
+            # refined regions
+            ('multiscale',  2.0, MultiScaleAreaSegmentationEngine({})),
+            # The int32 integral image of the frame, 4 bytes per pixel
+            ('xycut',       4.5, XYCutAreaSegmentationEngine({}))
+        ]
+        for name, budget, engine in budgets:
+            with self.subTest(name):
+                areas, memory = self.assertWithinBudget(budget, engine, self.difference)
+                self.assertGreater(len(areas), 0)
+
+    def test_processing_engines(self):
+        areas = SimpleAreaSegmentationEngine({})(self.difference)
+        budgets = [
+            ('preprocessing',   2.5, SimpleLightningPreprocessingEngine({}), (self.frame, )),
+            # The int32 integral image of the frame and the boolean image of the lit pixels (see "area_features")
+            ('classification',  5.5, SimpleLightningClassificationEngine({}), (self.difference, areas)),
+            ('grouping',        0.1, SimpleAreaGroupingEngine({}), (areas, ))
+        ]
+        for name, budget, engine, args in budgets:
+            with self.subTest(name):
+                self.assertWithinBudget(budget, engine, *args)
@@ -0,0 +1,78 @@
+from unittest import TestCase
+import tempfile
+import json
+import os
+
+from lightnimage.metrics import MetricsRegistry, MetricsExporter
+
+
+class TestMetricsRegistry(TestCase):
+
+    def setUp(self):
+        self.registry = MetricsRegistry()
+
+    def test_metrics_are_created_once(self):
+        counter = self.registry.counter('frames_total', 'The frames', {'status': 'processed'})
+        counter.inc()
+        self.registry.counter('frames_total', labels={'status': 'processed'}).inc(2)
+        self.registry.counter('frames_total', labels={'status': 'skipped'}).inc()
+
+        self.assertEqual(3, counter.value)
+        self.assertListEqual(
+            [{'labels': {'status': 'processed'}, 'value': 3}, {'labels': {'status': 'skipped'}, 'value': 1}],
+            self.registry.snapshot()['lightnimage_frames_total']
+        )
+
+        with self.assertRaises(ValueError):
+            self.registry.gauge('frames_total')
+
+    def test_histogram_buckets(self):
+        histogram = self.registry.histogram('latency_seconds', buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+
+        self.assertListEqual([2, 1, 1], histogram.counts)
+        self.assertEqual(4, histogram.count)
+        self.assertAlmostEqual(3.65, histogram.sum)
+
+        with histogram.time():
+            pass
+        self.assertEqual(5, histogram.count)
+
+    def test_prometheus_text_format(self):
+        self.registry.gauge('queue_depth', 'The waiting frames').set(4)
+        self.registry.counter('frames_total', 'The frames', {'status': 'load "error"'}).inc()
+        self.registry.histogram('latency_seconds', 'The latency', {'stage': 'segmentation'}, (0.5, 2)).observe(1)
+
+        self.assertEqual(
+            '# HELP lightnimage_queue_depth The waiting frames\n'
+            '# TYPE lightnimage_queue_depth gauge\n'
+            'lightnimage_queue_depth 4\n'
+            '# HELP lightnimage_frames_total The frames\n'
+            '# TYPE lightnimage_frames_total counter\n'
+            'lightnimage_frames_total{status="load \\"error\\""} 1\n'
+            '# HELP lightnimage_latency_seconds The latency\n'
+            '# TYPE lightnimage_latency_seconds histogram\n'
+            'lightnimage_latency_seconds_bucket{stage="segmentation",le="0.5"} 0\n'
+            'lightnimage_latency_seconds_bucket{stage="segmentation",le="2"} 1\n'
+            'lightnimage_latency_seconds_bucket{stage="segmentation",le="+Inf"} 1\n'
+            'lightnimage_latency_seconds_sum{stage="segmentation"} 1.0\n'
+            'lightnimage_latency_seconds_count{stage="segmentation"} 1\n',
+            self.registry.to_prometheus()
+        )
+
+    def test_exporter_writes_files(self):
+        self.registry.counter('frames_total').inc(5)
+        with tempfile.TemporaryDirectory() as folder_path:
+            prometheus_path = os.path.join(folder_path, 'metrics.prom')
+            snapshot_path = os.path.join(folder_path, 'metrics.jsonl')
+
+            exporter = MetricsExporter(self.registry, prometheus_path, snapshot_path, interval=0.01)
+            exporter.stop()
+
+            with open(prometheus_path) as file:
+                self.assertIn('lightnimage_frames_total 5\n', file.read())
+            with open(snapshot_path) as file:
+                snapshots = [json.loads(line) for line in file]
+            self.assertGreaterEqual(len(snapshots), 1)
+            self.assertEqual(5, snapshots[-1]['metrics']['lightnimage_frames_total'][0]['value'])
@@ -0,0 +1,47 @@
+from unittest import TestCase
+
+import numpy as np
+
+from lightnimage.model import L2Vector
+
+
+class TestL2Vector(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.vector = L2Vector.from_polylines(
+            [
+                [(0, 0), (0, 10)],
+                [(0, 10), (3, 14), (3, 20)]
+            ],
+            [(0, 10)]
+        )
+
+    def test_polylines_share_one_coordinate_array(self):
+        self.assertEqual(2, len(self.vector))
+        self.assertEqual((5, 2), self.vector.coordinates.shape)
+        self.assertListEqual([[0, 10], [3, 14], [3, 20]], self.vector.polyline(1).tolist())
+
+    def test_lengths_do_not_include_gaps_between_polylines(self):
+        lengths = self.vector.lengths()
+        self.assertAlmostEqual(10, lengths[0])
+        self.assertAlmostEqual(11, lengths[1])
+        self.assertAlmostEqual(21, self.vector.length)
+
+    def test_geometric_queries(self):
+        self.assertEqual(1, self.vector.branch_count)
+        self.assertEqual(((0, 4), (0, 21)), self.vector.bounding_box())
+        # The lightning is mostly vertical
+        self.assertTrue(70 < self.vector.orientation < 110)
+
+    def test_empty_vector(self):
+        vector = L2Vector()
+        self.assertEqual(0, len(vector))
+        self.assertEqual(0, vector.length)
+        self.assertIsNone(vector.bounding_box())
+
+    def test_slots_prevent_additional_attributes(self):
+        with self.assertRaises(AttributeError):
+            self.vector.mask = np.zeros((10, 10))
@@ -0,0 +1,54 @@
+from unittest import TestCase
+import tempfile
+import os
+import io
+
+import numpy as np
+from PIL import Image
+
+from lightnimage.render import render_areas, encode_image, render_batch, contact_sheet
+
+
+class TestRender(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.array = np.full((50, 60), 100, np.uint8)
+
+    def test_area_outline_is_drawn(self):
+        rgb = render_areas(self.array, [((10, 20), (5, 30))])
+        self.assertEqual((50, 60, 3), rgb.shape)
+        self.assertListEqual([255, 0, 0], rgb[5, 15].tolist())
+        self.assertListEqual([255, 0, 0], rgb[30, 20].tolist())
+        # The inside and the outside of the area are not changed
+        self.assertListEqual([100, 100, 100], rgb[15, 15].tolist())
+        self.assertListEqual([100, 100, 100], rgb[40, 40].tolist())
+
+    def test_label_is_drawn_and_clipped(self):
+        rgb = render_areas(self.array, [((50, 59), (0, 10))], ['ground'])
+        # There is no space above the area, so the label is drawn inside and clipped at the right border
+        self.assertTrue((rgb[2:12, 51:59] == [255, 0, 0]).all(axis=2).any())
+
+    def test_png_encoding_is_lossless(self):
+        rgb = render_areas(self.array, [((10, 20), (5, 30))], ['cross'])
+        decoded = np.array(Image.open(io.BytesIO(encode_image(rgb, 'PNG'))))
+        self.assertTrue((rgb == decoded).all())
+
+    def test_batch_rendering_on_worker_pool(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            jobs = [
+                (self.array, [((i, i + 10), (i, i + 10))], ['???'], os.path.join(folder_path, '{}.png'.format(i)))
+                for i in range(4)
+            ]
+            paths = render_batch(jobs, workers=2)
+            self.assertListEqual([job[3] for job in jobs], paths)
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+
+    def test_contact_sheet(self):
+        sheet = contact_sheet([self.array] * 5, columns=2, factor=2, spacing=1)
+        # 3 rows and 2 columns of 25 x 30 thumbnails
+        self.assertEqual((3 * 25 + 2, 2 * 30 + 1, 3), sheet.shape)
+        self.assertListEqual([100, 100, 100], sheet[0, 0].tolist())
+        self.assertListEqual([0, 0, 0], sheet[25, 0].tolist())
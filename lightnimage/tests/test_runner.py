@@ -0,0 +1,452 @@
+from unittest import TestCase
+from concurrent.futures import ThreadPoolExecutor
+import tempfile
+import shutil
+import json
+import io
+import os
+from contextlib import redirect_stdout, redirect_stderr
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.storage import DetectionLogReader, DetectionLogWriter
+from lightnimage.tools import simple_lightning_detection
+from lightnimage.runner import FolderFrameSource, RawFrameSource, FrameDetectionEngine, run_batch
+from lightnimage.runner import BatchCheckpoint, config_hash, bounded_map
+from lightnimage.engine import SimpleAreaSegmentationEngine, CustomSequenceAreaSegmentationEngine
+from lightnimage.metrics import MetricsRegistry
+from lightnimage.events import events_from_log
+from lightnimage.cli import main
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+FRAME_NAMES = ['aragats-{:04d}.jpg'.format(i) for i in range(180, 188)]
+
+
+class TestBatchRunner(TestCase):
+
+    def setUp(self):
+        self.folder_path = tempfile.mkdtemp()
+        self.frame_path = os.path.join(self.folder_path, 'frames')
+        os.makedirs(self.frame_path)
+        for name in FRAME_NAMES:
+            shutil.copy(os.path.join(SOURCE_PATH, name), self.frame_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder_path)
+
+    def test_detection_engine_matches_simple_lightning_detection(self):
+        image = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0186.jpg'))
+        reference = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0181.jpg'))
+
+        with redirect_stdout(io.StringIO()):
+            expected = simple_lightning_detection(image, reference)
+        areas, classifications, features = FrameDetectionEngine({})(image, reference)
+
+        self.assertListEqual(expected, list(zip(classifications, areas)))
+        self.assertEqual(len(areas), len(features['intensity_max']))
+
+    def test_cropped_detection_matches_the_whole_frame(self):
+        image = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0186.jpg'))
+        reference = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0181.jpg'))
+        # The whole top and the left border are excluded, so the working region does not start at the origin
+        config = {'exclusion': [((0, None), (0, 24)), ((0, 100), (0, None))]}
+
+        areas, classifications, features = FrameDetectionEngine(config)(image, reference)
+        cropped = FrameDetectionEngine(dict(config, crop=True))(image, reference)
+
+        self.assertGreater(len(areas), 0)
+        self.assertListEqual(areas, cropped[0])
+        self.assertListEqual(classifications, cropped[1])
+        self.assertTrue(np.allclose(features['centroid_x'], cropped[2]['centroid_x']))
+        self.assertTrue(np.allclose(features['centroid_y'], cropped[2]['centroid_y']))
+
+    def test_run_batch_writes_all_frames_in_order(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        progress = []
+        metrics = MetricsRegistry()
+        summary = run_batch(
+            FolderFrameSource(self.frame_path),
+            output_path,
+            reference='previous',
+            progress=progress.append,
+            progress_interval=0,
+            metrics=metrics
+        )
+
+        # The first frame does not have a reference
+        self.assertEqual({'no_reference': 1}, summary['skipped'])
+        self.assertEqual(len(FRAME_NAMES) - 1, summary['processed'])
+        # One progress report after every frame and the final one
+        self.assertEqual(len(FRAME_NAMES) + 1, len(progress))
+        self.assertEqual(summary['processed'], progress[-1]['processed'])
+        self.assertGreater(summary['frames_per_second'], 0)
+        self.assertLessEqual(summary['latency_ms']['p50'], summary['latency_ms']['p99'])
+
+        reader = DetectionLogReader(output_path)
+        self.assertListEqual(list(range(1, len(FRAME_NAMES))), list(reader.frame_ids))
+        self.assertEqual(summary['detections'], sum(len(reader.areas(i)) for i in reader.frame_ids))
+
+        self.assertEqual(1, metrics.counter('frames_total', labels={'status': 'no_reference'}).value)
+        self.assertEqual(summary['processed'], metrics.counter('frames_total', labels={'status': 'processed'}).value)
+        self.assertEqual(0, metrics.gauge('pending_frames').value)
+        self.assertEqual(summary['detections'], metrics.histogram('detections_per_frame').sum)
+        for stage in ('preprocessing', 'segmentation', 'classification'):
+            histogram = metrics.histogram('stage_latency_seconds', labels={'stage': stage})
+            self.assertEqual(summary['processed'], histogram.count)
+
+    def test_multiple_workers_give_the_same_log(self):
+        logs = []
+        for workers in (1, 2):
+            output_path = os.path.join(self.folder_path, 'log-{}'.format(workers))
+            run_batch(FolderFrameSource(self.frame_path), output_path, workers=workers, config={'engine': 'xycut'})
+            reader = DetectionLogReader(output_path)
+            logs.append([(frame_id, reader.areas(frame_id)) for frame_id in reader.frame_ids])
+
+        self.assertListEqual(logs[0], logs[1])
+        self.assertGreater(len(logs[0]), 0)
+
+    def test_unreadable_frames_are_skipped(self):
+        with open(os.path.join(self.frame_path, 'aragats-0183.jpg'), mode='wb') as file:
+            file.write(b'not a jpeg')
+
+        source = FolderFrameSource(self.frame_path)
+        summary = run_batch(source, os.path.join(self.folder_path, 'log'), reference='previous')
+        # The broken frame is skipped itself and as the reference of the next frame
+        self.assertEqual({'no_reference': 1, 'load_error': 2}, summary['skipped'])
+
+    def test_bounded_map_takes_the_jobs_lazily(self):
+        taken = []
+
+        def jobs():
+            for job in range(100):
+                taken.append(job)
+                yield job
+
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = bounded_map(executor, lambda job: job * 2, jobs(), 4)
+            self.assertEqual(0, next(results))
+            self.assertEqual(4, len(taken))
+            results.close()
+            self.assertEqual(4, len(taken))
+
+            results = bounded_map(executor, lambda job: job * 2, range(100), 4)
+            self.assertListEqual([job * 2 for job in range(100)], list(results))
+
+    def test_raw_frame_store(self):
+        arrays = [LightningImage.from_file(os.path.join(self.frame_path, name)).array for name in FRAME_NAMES]
+        store_path = os.path.join(self.folder_path, 'frames.raw')
+        np.concatenate(arrays).tofile(store_path)
+
+        source = RawFrameSource(store_path, arrays[0].shape, fps=25.0)
+        self.assertEqual(len(FRAME_NAMES), len(source))
+        self.assertTrue(np.array_equal(arrays[3], source.load(3).array))
+
+        output_path = os.path.join(self.folder_path, 'log')
+        summary = run_batch(source, output_path, config={'classification': False}, reference='previous')
+        self.assertEqual(len(FRAME_NAMES) - 1, summary['processed'])
+        self.assertAlmostEqual(2 / 25.0, DetectionLogReader(output_path).timestamps[1])
+
+    def test_automatic_references_from_statistics(self):
+        references = FolderFrameSource(self.frame_path).references('auto', window=5)
+        self.assertIsNone(references[0])
+        self.assertEqual('aragats-0181.jpg', references[FRAME_NAMES.index('aragats-0186.jpg')])
+
+        with self.assertRaises(ValueError):
+            FolderFrameSource(self.frame_path).references('best')
+
+    def test_references_from_a_start(self):
+        arrays = [LightningImage.from_file(os.path.join(self.frame_path, name)).array for name in FRAME_NAMES]
+        store_path = os.path.join(self.folder_path, 'frames.raw')
+        np.concatenate(arrays).tofile(store_path)
+
+        for source in (FolderFrameSource(self.frame_path), RawFrameSource(store_path, arrays[0].shape)):
+            for mode in ('auto', 'previous'):
+                references = source.references(mode, window=3)
+                for start in range(len(FRAME_NAMES) + 1):
+                    self.assertListEqual(references[start:], source.references(mode, window=3, start=start))
+
+
+def read_log(output_path):
+    reader = DetectionLogReader(output_path)
+    return [(frame_id, reader.areas(frame_id), reader.classifications(frame_id)) for frame_id in reader.frame_ids]
+
+
+class Interruption(Exception):
+    pass
+
+
+class CountingFrameSource(FolderFrameSource):
+    # Appends a line to a file for every loaded frame, so that the loads of the worker processes can be counted
+
+    def __init__(self, folder_path, count_path):
+        FolderFrameSource.__init__(self, folder_path)
+        self.count_path = count_path
+
+    def load(self, key):
+        with open(self.count_path, mode='a') as file:
+            file.write(key + '\n')
+        return FolderFrameSource.load(self, key)
+
+
+class CountingRawFrameSource(RawFrameSource):
+    # Counts the loaded frames within the current process
+
+    def __init__(self, *args, **kwargs):
+        RawFrameSource.__init__(self, *args, **kwargs)
+        self.loads = 0
+
+    def load(self, key):
+        self.loads += 1
+        return RawFrameSource.load(self, key)
+
+
+class TestCheckpoints(TestCase):
+
+    def setUp(self):
+        self.folder_path = tempfile.mkdtemp()
+        self.frame_path = os.path.join(self.folder_path, 'frames')
+        os.makedirs(self.frame_path)
+        for name in FRAME_NAMES:
+            shutil.copy(os.path.join(SOURCE_PATH, name), self.frame_path)
+
+        self.expected_path = os.path.join(self.folder_path, 'expected')
+        run_batch(FolderFrameSource(self.frame_path), self.expected_path, reference='previous')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder_path)
+
+    def interrupted_batch(self, output_path, frames, source=None, reference='previous', **kwargs):
+        # Stops the batch run with an exception after the given amount of frames
+        def progress(summary):
+            if summary['finished'] >= frames:
+                raise Interruption()
+
+        with self.assertRaises(Interruption):
+            run_batch(
+                source or FolderFrameSource(self.frame_path),
+                output_path,
+                reference=reference,
+                progress=progress,
+                progress_interval=0,
+                **kwargs
+            )
+
+    def test_completed_ranges(self):
+        checkpoint = BatchCheckpoint('hash')
+        for frame_id in (0, 1, 2, 5, 7, 6, 3):
+            checkpoint.add(frame_id)
+        self.assertListEqual([[0, 4], [5, 8]], checkpoint.completed)
+
+        checkpoint.add(4)
+        checkpoint.add(4)
+        self.assertListEqual([[0, 8]], checkpoint.completed)
+        self.assertEqual(8, len(checkpoint))
+        self.assertIn(7, checkpoint)
+        self.assertNotIn(8, checkpoint)
+
+    def test_interrupted_run_is_resumed(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        self.interrupted_batch(output_path, 4, checkpoint_interval=3600)
+
+        # The checkpoint is written, when the run is interrupted
+        checkpoint = BatchCheckpoint.load(output_path)
+        self.assertListEqual([[0, 4]], checkpoint.completed)
+        self.assertEqual(3, checkpoint.output['frames'])
+        self.assertEqual(
+            checkpoint.output['offsets']['frame_id'],
+            os.path.getsize(os.path.join(output_path, 'frame_id.bin'))
+        )
+
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        self.assertEqual(4, summary['resumed'])
+        self.assertEqual(len(FRAME_NAMES) - 4, summary['processed'])
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+        # A complete run has nothing left to do
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        self.assertEqual(len(FRAME_NAMES), summary['resumed'])
+        self.assertEqual(0, summary['finished'])
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+    def test_interrupted_run_with_workers_is_resumed(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        count_path = os.path.join(self.folder_path, 'loads.txt')
+        source = CountingFrameSource(self.frame_path, count_path)
+        self.interrupted_batch(output_path, 2, source=source, workers=2, checkpoint_interval=3600)
+
+        # Only the jobs in flight are finished, the rest of the archive is not detected before the run stops. Every
+        # job loads its frame and its reference
+        with open(count_path) as file:
+            self.assertLessEqual(len(file.readlines()), 2 * 2 * 2 + 2)
+        completed = len(BatchCheckpoint.load(output_path))
+        self.assertLess(completed, len(FRAME_NAMES))
+
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous', workers=2)
+        self.assertEqual(completed, summary['resumed'])
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+    def test_resumed_run_does_not_load_the_completed_frames(self):
+        arrays = [LightningImage.from_file(os.path.join(self.frame_path, name)).array for name in FRAME_NAMES]
+        store_path = os.path.join(self.folder_path, 'frames.raw')
+        np.concatenate(arrays).tofile(store_path)
+        expected_path = os.path.join(self.folder_path, 'expected-raw')
+        run_batch(RawFrameSource(store_path, arrays[0].shape), expected_path, window=2)
+
+        output_path = os.path.join(self.folder_path, 'log')
+        self.interrupted_batch(output_path, 6, RawFrameSource(store_path, arrays[0].shape), 'auto', window=2)
+        source = CountingRawFrameSource(store_path, arrays[0].shape)
+        summary = run_batch(source, output_path, window=2)
+        self.assertEqual(6, summary['resumed'])
+        self.assertListEqual(read_log(expected_path), read_log(output_path))
+        # The statistics of the frames from the window before the first missing frame on and of their predecessor,
+        # then the two missing frames and their references. Not the statistics of the whole source
+        self.assertLessEqual(source.loads, 5 + 2 * 2)
+
+    def test_frames_after_the_checkpoint_are_discarded(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        self.interrupted_batch(output_path, 3, checkpoint_interval=3600)
+
+        # Frames, which have been written after the checkpoint, for example before a crash
+        with DetectionLogWriter(output_path) as writer:
+            writer.write(5, 0.0, [((1, 2), (3, 4))])
+
+        run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+    def test_changed_config_is_detected(self):
+        self.assertEqual(config_hash({}), config_hash({'engine': 'simple'}))
+        self.assertNotEqual(config_hash({}), config_hash({'engine': 'xycut'}))
+        self.assertNotEqual(config_hash({}), config_hash({'exclusion': [((0, 9), (0, 9))]}))
+        self.assertNotEqual(config_hash({}), config_hash({}, reference='previous'))
+
+        # The engine objects are identified by their class and their config
+        def tiled(**config):
+            return {'engine': 'tiled', 'engine_config': {'engine': SimpleAreaSegmentationEngine(config)}}
+        self.assertEqual(config_hash(tiled()), config_hash(tiled()))
+        self.assertNotEqual(config_hash(tiled()), config_hash(tiled(threshold=2.0)))
+        self.assertEqual(
+            config_hash({'engine': 'tiled', 'engine_config': {'engine': CustomSequenceAreaSegmentationEngine({})}}),
+            config_hash({'engine': 'tiled', 'engine_config': {'engine': CustomSequenceAreaSegmentationEngine({})}})
+        )
+
+        # Functions are identified by their qualified name, which is not unique for lambdas and closures
+        self.assertNotEqual(
+            config_hash({'engine_config': {'function': np.mean}}),
+            config_hash({'engine_config': {'function': np.median}})
+        )
+        with self.assertRaises(ValueError):
+            config_hash({'engine_config': {'function': lambda value: value}})
+        with self.assertRaises(ValueError):
+            config_hash({'engine_config': {'function': tiled}})
+
+        output_path = os.path.join(self.folder_path, 'log')
+        self.interrupted_batch(output_path, 3, checkpoint_interval=0)
+
+        with self.assertRaises(ValueError):
+            run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous', config={'engine': 'xycut'})
+
+        # A restart discards the earlier results
+        run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous', restart=True)
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+    def test_failed_frames_are_retried_in_order(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        broken_path = os.path.join(self.frame_path, FRAME_NAMES[3])
+        shutil.move(broken_path, broken_path + '.backup')
+        with open(broken_path, mode='wb') as file:
+            file.write(b'not a jpeg')
+
+        run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        # The broken frame is the reference of the next frame as well
+        self.assertListEqual([[3, 5]], BatchCheckpoint.load(output_path).failed)
+
+        # The failed frames are completed, so resuming does not append them after the higher frame ids
+        shutil.move(broken_path + '.backup', broken_path)
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        self.assertEqual((len(FRAME_NAMES), 0), (summary['resumed'], summary['finished']))
+        frame_ids = list(DetectionLogReader(output_path).frame_ids)
+        self.assertListEqual(sorted(frame_ids), frame_ids)
+        self.assertNotIn(3, frame_ids)
+
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous', retry_failed=True)
+        self.assertEqual((len(FRAME_NAMES) - 2, 2, 2), (summary['resumed'], summary['retried'], summary['processed']))
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+        self.assertListEqual([], BatchCheckpoint.load(output_path).failed)
+        self.assertFalse(os.path.exists(output_path + '.retry'))
+        events_from_log(DetectionLogReader(output_path))
+
+        # The rewritten log is resumed like any other
+        summary = run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+        self.assertEqual(0, summary['finished'])
+        self.assertListEqual(read_log(self.expected_path), read_log(output_path))
+
+    def test_changed_frames_are_detected(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        self.interrupted_batch(output_path, 3, checkpoint_interval=0)
+
+        os.remove(os.path.join(self.frame_path, FRAME_NAMES[1]))
+        with self.assertRaises(ValueError):
+            run_batch(FolderFrameSource(self.frame_path), output_path, reference='previous')
+
+
+class TestCommandLine(TestCase):
+
+    def setUp(self):
+        self.folder_path = tempfile.mkdtemp()
+        for name in FRAME_NAMES[:4]:
+            shutil.copy(os.path.join(SOURCE_PATH, name), self.folder_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder_path)
+
+    def test_detect_command(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        summary_path = os.path.join(self.folder_path, 'summary.json')
+        stdout = io.StringIO()
+        with redirect_stdout(stdout):
+            code = main([
+                'detect', self.folder_path, '-o', output_path,
+                '--engine', 'xycut', '--engine-config', '{"threshold": 2}',
+                '--reference', 'previous', '--quiet', '--summary', summary_path,
+                '--metrics-file', os.path.join(self.folder_path, 'metrics.prom')
+            ])
+
+        self.assertEqual(0, code)
+        summary = json.loads(stdout.getvalue())
+        self.assertEqual(3, summary['processed'])
+        with open(summary_path) as file:
+            self.assertEqual(summary['detections'], json.load(file)['detections'])
+        self.assertEqual(3, len(DetectionLogReader(output_path)))
+        with open(os.path.join(self.folder_path, 'metrics.prom')) as file:
+            self.assertIn('lightnimage_candidates_per_frame_count{engine="xycut"}', file.read())
+
+    def test_resumed_detect_command(self):
+        output_path = os.path.join(self.folder_path, 'log')
+        arguments = ['detect', self.folder_path, '-o', output_path, '--reference', 'previous', '--quiet']
+
+        def run(*extra):
+            stdout = io.StringIO()
+            with redirect_stdout(stdout), redirect_stderr(io.StringIO()):
+                code = main(arguments + list(extra))
+            return code, json.loads(stdout.getvalue()) if code == 0 else None
+
+        run()
+        code, summary = run()
+        self.assertEqual((0, 4, 0), (code, summary['resumed'], summary['finished']))
+
+        # A different config of the same log has to be restarted explicitly
+        code, summary = run('--engine', 'xycut')
+        self.assertEqual(1, code)
+        code, summary = run('--engine', 'xycut', '--restart')
+        self.assertEqual((0, 0, 3), (code, summary['resumed'], summary['processed']))
+        self.assertEqual(3, len(DetectionLogReader(output_path)))
+
+    def test_invalid_source(self):
+        with redirect_stdout(io.StringIO()):
+            code = main(['detect', os.path.join(self.folder_path, 'missing'), '-o', 'log', '--quiet'])
+        self.assertEqual(1, code)
+
+        with self.assertRaises(SystemExit):
+            main(['detect', self.folder_path, '-o', 'log', '--shape', '12'])
@@ -0,0 +1,179 @@
+from unittest import TestCase
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import tempfile
+import os
+import socket
+
+from lightnimage.image import LightningImage
+from lightnimage.runner import FrameDetectionEngine
+from lightnimage.metrics import MetricsRegistry
+from lightnimage.service import MicroBatchingDetector, DetectionService, DetectionClient, create_server
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+
+def load_frame(number):
+    return LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-{:04d}.jpg'.format(number))).array
+
+
+class TestMicroBatchingDetector(TestCase):
+
+    def setUp(self):
+        self.reference = load_frame(181)
+        self.frames = [load_frame(number) for number in range(182, 188)]
+
+    def test_concurrent_frames_are_batched(self):
+        detector = MicroBatchingDetector({'max_batch_size': 4, 'max_wait': 0.5, 'workers': 2})
+        try:
+            futures = [detector.submit(frame, self.reference) for frame in self.frames]
+            results = [future.result(timeout=30) for future in futures]
+        finally:
+            detector.close()
+
+        engine = FrameDetectionEngine({})
+        for frame, (areas, classifications, features) in zip(self.frames, results):
+            expected = engine(LightningImage(frame), LightningImage(self.reference))
+            self.assertListEqual(expected[0], areas)
+            self.assertListEqual(expected[1], classifications)
+
+        statistics = detector.statistics()
+        self.assertEqual(len(self.frames), statistics['frames'])
+        self.assertEqual(2, statistics['batches'])
+        self.assertEqual(4, statistics['largest_batch'])
+
+    def test_batch_is_dispatched_after_waiting(self):
+        detector = MicroBatchingDetector({'max_batch_size': 100, 'max_wait': 0.01})
+        try:
+            detector.submit(self.frames[0], self.reference).result(timeout=30)
+        finally:
+            detector.close()
+        self.assertEqual(1, detector.statistics()['batches'])
+
+    def test_shape_mismatch_raises(self):
+        detector = MicroBatchingDetector({})
+        try:
+            with self.assertRaises(ValueError):
+                detector.submit(self.frames[0], self.reference[:10])
+        finally:
+            detector.close()
+
+
+class TestDetectionService(TestCase):
+
+    def setUp(self):
+        self.reference = load_frame(181)
+        self.frames = [load_frame(number) for number in range(182, 188)]
+        engine = FrameDetectionEngine({})
+        # The expected results are computed up front, because the engines are not thread safe
+        self.expected = {
+            id(frame): engine(LightningImage(frame), LightningImage(self.reference)) for frame in self.frames
+        }
+
+    def start(self, address):
+        service = DetectionService({'max_batch_size': 8, 'max_wait': 0.2, 'metrics': MetricsRegistry()})
+        server = create_server(service, address)
+        thread = threading.Thread(target=server.serve_forever, daemon=True)
+        thread.start()
+
+        def stop():
+            server.shutdown()
+            server.server_close()
+            service.close()
+        self.addCleanup(stop)
+
+        return server.server_address
+
+    def check_client(self, client, frame):
+        expected = self.expected[id(frame)]
+        result = client.detect(frame)
+        self.assertListEqual(expected[0], result['areas'])
+        self.assertListEqual(expected[1], result['classifications'])
+
+    def test_concurrent_clients_over_tcp(self):
+        address = self.start(('127.0.0.1', 0))
+
+        client = DetectionClient(address, stream='camera')
+        client.set_reference(self.reference)
+
+        def produce(frame):
+            # Every producer thread has its own client
+            producer = DetectionClient(address, stream='camera')
+            try:
+                self.check_client(producer, frame)
+            finally:
+                producer.close()
+
+        with ThreadPoolExecutor(max_workers=len(self.frames)) as executor:
+            list(executor.map(produce, self.frames))
+
+        statistics = client.statistics()
+        metrics = client.metrics()
+        client.close()
+        self.assertEqual(len(self.frames), statistics['frames'])
+        self.assertLess(statistics['batches'], len(self.frames))
+
+        self.assertIn('lightnimage_batch_size_sum {}'.format(float(len(self.frames))), metrics)
+        self.assertIn('lightnimage_request_latency_seconds_count {}'.format(len(self.frames)), metrics)
+
+    def test_previous_frame_as_reference_over_unix_socket(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            address = self.start(os.path.join(folder_path, 'detection.sock'))
+
+            client = DetectionClient(address, stream='replay')
+            self.assertEqual({'skipped': 'no_reference'}, client.detect(self.reference))
+            self.check_client(client, self.frames[0])
+
+            # The streams have separate references
+            other = DetectionClient(address, stream='other')
+            self.assertEqual({'skipped': 'no_reference'}, other.detect(self.frames[0]))
+            self.assertEqual({'skipped': 'shape_mismatch'}, other.detect(self.frames[0][:100]))
+
+            client.close()
+            other.close()
+
+    def test_invalid_requests(self):
+        address = self.start(('127.0.0.1', 0))
+        client = DetectionClient(address)
+
+        with self.assertRaises(ValueError):
+            client.request('POST', '/detect?shape=10x10')
+        with self.assertRaises(ValueError):
+            client.request('GET', '/unknown')
+        client.close()
+
+    def test_invalid_request_consumes_its_body(self):
+        address = self.start(('127.0.0.1', 0))
+        smuggled = b'GET /statistics HTTP/1.1\r\nHost: test\r\nContent-Length: 0\r\n\r\n'
+        for path in ('/detect', '/unknown'):
+            connection = socket.create_connection(address, timeout=10)
+            try:
+                connection.sendall(
+                    'POST {} HTTP/1.1\r\nHost: test\r\nContent-Length: {}\r\n\r\n'.format(path, len(smuggled))
+                    .encode() + smuggled
+                )
+                connection.shutdown(socket.SHUT_WR)
+                responses = b''
+                while True:
+                    chunk = connection.recv(65536)
+                    if not chunk:
+                        break
+                    responses += chunk
+            finally:
+                connection.close()
+            self.assertEqual(1, responses.count(b'HTTP/1.1 '))
+            self.assertTrue(responses.startswith(b'HTTP/1.1 4'))
+
+    def test_detection_error_is_responded(self):
+        address = self.start(('127.0.0.1', 0))
+        client = DetectionClient(address)
+        frame = load_frame(182)
+        client.set_reference(load_frame(181))
+        with patch.object(DetectionService, 'detect', side_effect=RuntimeError('broken')):
+            with self.assertRaises(ValueError) as context:
+                client.detect(frame)
+        self.assertIn('500', str(context.exception))
+        self.assertIn('broken', str(context.exception))
+        self.assertIn('areas', client.detect(frame))
+        client.close()
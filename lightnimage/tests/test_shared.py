@@ -0,0 +1,89 @@
+from unittest import TestCase
+import multiprocessing
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.shared import SharedFrameRing
+
+
+def sum_frames(ring, results):
+    # A consumer process, which reports the sum of the pixels of every frame
+    for frame_id, timestamp, image in ring.images(timeout=30):
+        results.put((frame_id, timestamp, int(np.sum(image.array, dtype=np.int64)), image.array.flags.writeable))
+    # The last image has to be dropped, before the shared memory can be closed
+    image = None
+    ring.close()
+    results.put(None)
+
+
+class TestSharedFrameRing(TestCase):
+
+    def setUp(self):
+        self.ring = SharedFrameRing((30, 40), slots=3)
+        self.addCleanup(self.ring.unlink)
+
+    def test_slot_handoff_within_one_process(self):
+        frame = np.arange(30 * 40).reshape((30, 40)).astype(np.uint8)
+        self.ring.put(LightningImage(frame), 7, timestamp=0.28)
+
+        slot, frame_id, timestamp = self.ring.receive(timeout=5)
+        self.assertEqual((7, 0.28), (frame_id, timestamp))
+
+        image = self.ring.image(slot)
+        self.assertTrue(np.array_equal(frame, image.array))
+        # The image is a read only view on the shared memory and not a copy
+        self.assertTrue(np.shares_memory(image.array, self.ring.frames))
+        self.assertFalse(image.array.flags.writeable)
+        del image
+        self.ring.release(slot)
+
+    def test_full_ring_applies_backpressure(self):
+        frame = np.zeros((30, 40), np.uint8)
+        for frame_id in range(3):
+            self.ring.put(frame, frame_id)
+
+        with self.assertRaises(TimeoutError):
+            self.ring.put(frame, 3, timeout=0.1)
+
+        slot, frame_id, timestamp = self.ring.receive(timeout=5)
+        self.assertEqual(0, frame_id)
+        self.ring.release(slot)
+        # After a slot has been released, the producer can continue
+        self.ring.put(frame, 3, timeout=5)
+
+    def test_wrong_shape_raises(self):
+        with self.assertRaises(ValueError):
+            self.ring.put(np.zeros((40, 30), np.uint8), 0)
+
+    def test_consumer_processes(self):
+        results = multiprocessing.Queue()
+        consumers = [multiprocessing.Process(target=sum_frames, args=(self.ring, results)) for i in range(2)]
+        for consumer in consumers:
+            consumer.start()
+
+        random = np.random.RandomState(3)
+        expected = {}
+        # Many more frames than slots, so the slots are being reused
+        for frame_id in range(20):
+            slot = self.ring.acquire(timeout=30)
+            frame = self.ring.frame(slot)
+            frame[:] = random.randint(0, 256, frame.shape)
+            expected[frame_id] = (frame_id * 0.04, int(np.sum(frame, dtype=np.int64)), False)
+            self.ring.publish(slot, frame_id, frame_id * 0.04)
+        del frame
+        self.ring.finish(consumers=len(consumers))
+
+        received = {}
+        finished = 0
+        while finished < len(consumers):
+            result = results.get(timeout=30)
+            if result is None:
+                finished += 1
+            else:
+                received[result[0]] = result[1:]
+
+        for consumer in consumers:
+            consumer.join(timeout=30)
+            self.assertEqual(0, consumer.exitcode)
+        self.assertDictEqual(expected, received)
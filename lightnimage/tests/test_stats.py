@@ -0,0 +1,176 @@
+from unittest import TestCase
+import tempfile
+import shutil
+import os
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.engine import SimpleLightningPreprocessingEngine
+from lightnimage.stats import FrameStatisticsIndex, frame_statistics, histogram_percentile
+from lightnimage.stats import ReferenceFrameSelector, select_references, ExponentialFrameStatistics
+
+SOURCE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'source')
+
+
+class TestFrameStatistics(TestCase):
+
+    def test_frame_statistics(self):
+        array = np.asarray([
+            [0, 10, 20],
+            [30, 40, 255]
+        ], np.uint8)
+        statistics = frame_statistics(array)
+        self.assertEqual(255, statistics['max'])
+        self.assertAlmostEqual(np.mean(array), statistics['mean'])
+        self.assertEqual(6, np.sum(statistics['histogram']))
+        self.assertListEqual([10, 325 / 3], list(statistics['row_profile']))
+        self.assertListEqual([15, 25, 137.5], list(statistics['column_profile']))
+
+    def test_histogram_percentile(self):
+        histogram = np.zeros(256)
+        histogram[10] = 90
+        histogram[200] = 10
+        self.assertEqual(10, histogram_percentile(histogram, 50))
+        self.assertEqual(200, histogram_percentile(histogram, 95))
+
+
+def noise_frame(random, mean, shape=(60, 80)):
+    return np.clip(random.normal(mean, 5, shape), 0, 255).astype(np.uint8)
+
+
+class TestExponentialFrameStatistics(TestCase):
+
+    def test_exponentially_weighted_mean_and_variance(self):
+        means = [10.0, 20.0, 14.0, 30.0]
+        running = ExponentialFrameStatistics(smoothing=0.5)
+        for mean in means:
+            histogram = np.zeros(256)
+            histogram[int(mean)] = 100
+            running.update(histogram)
+
+        # The mean is the weighted average, where each frame has half the weight of the one after it
+        weights = np.array([0.125, 0.125, 0.25, 0.5])
+        self.assertAlmostEqual(float(np.dot(weights, means)), running.mean)
+        self.assertAlmostEqual(1.0, running.histogram.sum())
+        self.assertEqual(0.5, running.histogram[30])
+        self.assertEqual(30, running.percentile(75))
+        self.assertGreater(running.deviation, 0)
+
+    def test_outliers_do_not_change_the_histogram(self):
+        random = np.random.RandomState(5)
+        running = ExponentialFrameStatistics(smoothing=0.1)
+        for i in range(30):
+            self.assertTrue(running.update(frame_statistics(noise_frame(random, 60))['histogram'], 4))
+
+        histogram = running.histogram.copy()
+        self.assertFalse(running.update(frame_statistics(noise_frame(random, 200))['histogram'], 4))
+        self.assertTrue(np.array_equal(histogram, running.histogram))
+
+        # A lasting change of the scene is followed after a few frames
+        accepted = [running.update(frame_statistics(noise_frame(random, 200))['histogram'], 4) for i in range(20)]
+        self.assertTrue(accepted[-1])
+        self.assertGreater(running.mean, 100)
+
+
+class TestStreamingPreprocessing(TestCase):
+
+    def test_threshold_is_stable_against_hot_pixels(self):
+        random = np.random.RandomState(2)
+        frames = [noise_frame(random, 80) for i in range(40)]
+        # A single hot pixel in one of the frames
+        frames[30][10, 10] = 255
+
+        thresholds = {}
+        for streaming in (False, True):
+            engine = SimpleLightningPreprocessingEngine({'streaming': streaming})
+            thresholds[streaming] = []
+            for frame in frames:
+                engine(LightningImage(frame))
+                thresholds[streaming].append(engine.threshold)
+
+        self.assertGreater(thresholds[False][30] - thresholds[False][29], 20)
+        self.assertLess(abs(thresholds[True][30] - thresholds[True][29]), 1)
+
+    def test_streaming_with_precomputed_statistics(self):
+        image = LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0182.jpg'))
+        engine = SimpleLightningPreprocessingEngine({'streaming': True})
+        expected = engine(image)
+
+        engine.reset()
+        result = engine(image, frame_statistics(image.array))
+        self.assertTrue(np.array_equal(expected.array, result.array))
+
+
+class TestFrameStatisticsIndex(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.folder = tempfile.TemporaryDirectory()
+        for i in range(180, 184):
+            shutil.copy(os.path.join(SOURCE_PATH, 'aragats-{:04d}.jpg'.format(i)), self.folder.name)
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_index_is_built_and_loaded_from_sidecar(self):
+        index = FrameStatisticsIndex(self.folder.name)
+        self.assertEqual(4, index.update())
+        self.assertEqual(4, len(index))
+        self.assertTrue(np.isnan(index.difference_energies[0]))
+        self.assertTrue((index.difference_energies[1:] > 0).all())
+
+        array = LightningImage.from_file(os.path.join(self.folder.name, 'aragats-0181.jpg')).array
+        statistics = FrameStatisticsIndex(self.folder.name).statistics('aragats-0181.jpg')
+        self.assertEqual(np.amax(array), statistics['max'])
+        self.assertAlmostEqual(np.mean(array), statistics['mean'])
+        self.assertEqual(array.shape[0], len(statistics['row_profile']))
+
+    def test_only_new_frames_are_decoded_on_update(self):
+        FrameStatisticsIndex(self.folder.name).update()
+        shutil.copy(os.path.join(SOURCE_PATH, 'aragats-0184.jpg'), self.folder.name)
+
+        index = FrameStatisticsIndex(self.folder.name)
+        energies = index.difference_energies.copy()
+        # The new frame and its predecessor for the difference energy
+        self.assertEqual(2, index.update())
+        self.assertEqual(5, len(index))
+        self.assertListEqual(list(energies[1:]), list(index.difference_energies[1:4]))
+
+    def test_preprocessing_with_precomputed_statistics(self):
+        # The image is made smaller, because the preprocessing still iterates every pixel
+        image = LightningImage(LightningImage.from_file(os.path.join(SOURCE_PATH, 'aragats-0182.jpg')).array[::8, ::8])
+
+        engine = SimpleLightningPreprocessingEngine({})
+        statistics = frame_statistics(image.array)
+        expected = engine(image)
+        result = engine(image, statistics)
+        self.assertTrue((expected.array == result.array).all())
+
+
+class TestReferenceFrameSelector(TestCase):
+
+    def test_best_frame_of_sliding_window_is_selected(self):
+        scores = np.random.RandomState(1).uniform(0, 100, 200)
+        selector = ReferenceFrameSelector({'window': 7, 'score_function': lambda statistics: statistics['score']})
+        self.assertIsNone(selector.reference())
+        for i, score in enumerate(scores):
+            selector.push(i, {'score': score})
+            window_start = max(0, i - 6)
+            expected = window_start + int(np.argmin(scores[window_start:i + 1]))
+            self.assertEqual(expected, selector.reference())
+
+    def test_reference_selected_from_statistics_index(self):
+        with tempfile.TemporaryDirectory() as folder_path:
+            for i in range(176, 187):
+                shutil.copy(os.path.join(SOURCE_PATH, 'aragats-{:04d}.jpg'.format(i)), folder_path)
+            index = FrameStatisticsIndex(folder_path)
+            index.update()
+
+            references = select_references(index, {'window': 5})
+            self.assertIsNone(references[0])
+            # The frames 0183 to 0185 contain the lightning, so the last calm frame before it is chosen, which is the
+            # same one, that was picked by hand in the detection demo
+            self.assertEqual('aragats-0181.jpg', references[-1])
@@ -0,0 +1,114 @@
+from unittest import TestCase
+from unittest.mock import patch
+import tempfile
+import os
+
+import numpy as np
+
+from lightnimage.storage import DetectionLogWriter, DetectionLogReader, DetectionLog
+
+
+class TestDetectionLog(TestCase):
+
+    def setUp(self):
+        """
+        Added 19.10.2026
+        """
+        self.folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.folder.name, 'log')
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def write_frames(self, writer, frame_ids):
+        for frame_id in frame_ids:
+            areas = [((frame_id, frame_id + 10), (0, 5))] * (frame_id % 3)
+            classifications = ['ground', 'cross'][:len(areas)]
+            features = {'aspect_ratio': np.full(len(areas), frame_id / 10)}
+            writer.write(frame_id, frame_id * 0.04, areas, classifications, features)
+
+    def test_written_detections_can_be_looked_up_by_frame(self):
+        with DetectionLogWriter(self.path, features=['aspect_ratio'], chunk_size=4) as writer:
+            self.write_frames(writer, range(10))
+
+        reader = DetectionLogReader(self.path)
+        self.assertEqual(10, len(reader))
+        self.assertListEqual([((5, 15), (0, 5)), ((5, 15), (0, 5))], reader.areas(5))
+        self.assertListEqual(['ground', 'cross'], reader.classifications(5))
+        self.assertListEqual([], reader.areas(3))
+        self.assertAlmostEqual(0.8, reader.detections(8)['feature_aspect_ratio'][0], 5)
+        self.assertAlmostEqual(0.28, reader.timestamps[7])
+
+    def test_columns_are_memory_mapped_for_bulk_analysis(self):
+        with DetectionLogWriter(self.path, features=['aspect_ratio']) as writer:
+            self.write_frames(writer, range(9))
+
+        reader = DetectionLogReader(self.path)
+        # Every frame i has i % 3 detections
+        self.assertEqual(9, len(reader.column('x_start')))
+        self.assertIsInstance(reader.column('aspect_ratio'), np.memmap)
+
+    def test_appending_to_existing_log(self):
+        with DetectionLogWriter(self.path, features=['aspect_ratio']) as writer:
+            self.write_frames(writer, range(5))
+        with DetectionLogWriter(self.path) as writer:
+            self.write_frames(writer, range(5, 10))
+
+        reader = DetectionLogReader(self.path)
+        self.assertEqual(10, len(reader))
+        self.assertListEqual([((8, 18), (0, 5)), ((8, 18), (0, 5))], reader.areas(8))
+
+    def test_incomplete_detections_are_discarded(self):
+        with DetectionLogWriter(self.path) as writer:
+            writer.write(0, 0.0, [((0, 1), (0, 1))])
+
+        # Simulating a crash, where the detections of a frame were written, but not its index entry
+        with open(DetectionLog.column_path(self.path, 'x_start'), mode='ab') as file:
+            np.asarray([99], np.int32).tofile(file)
+
+        self.assertEqual(1, len(DetectionLogReader(self.path).column('x_start')))
+        with DetectionLogWriter(self.path) as writer:
+            writer.write(1, 0.04, [((2, 3), (2, 3))])
+
+        reader = DetectionLogReader(self.path)
+        self.assertListEqual([((2, 3), (2, 3))], reader.areas(1))
+
+    def test_log_is_truncated_to_a_frame_count(self):
+        with DetectionLogWriter(self.path) as writer:
+            self.write_frames(writer, range(4))
+            # The synced columns are complete on the disk
+            offsets = writer.sync()
+            self.assertEqual(os.path.getsize(DetectionLog.column_path(self.path, 'frame_id')), offsets['frame_id'])
+            self.write_frames(writer, range(4, 9))
+
+        with DetectionLogWriter(self.path, frame_count=4) as writer:
+            self.assertEqual(4, writer.frame_count)
+            # Frames 1, 2 have 1 and 2 detections
+            self.assertEqual(3, writer.detection_count)
+            self.write_frames(writer, range(10, 12))
+
+        reader = DetectionLogReader(self.path)
+        self.assertListEqual([0, 1, 2, 3, 10, 11], list(reader.frame_ids))
+
+        with self.assertRaises(ValueError):
+            DetectionLogWriter(self.path, frame_count=7)
+
+    def test_sync_flushes_the_columns_to_the_disk(self):
+        with DetectionLogWriter(self.path) as writer:
+            self.write_frames(writer, range(4))
+            with patch('lightnimage.storage.os.fsync', wraps=os.fsync) as fsync:
+                writer.sync()
+
+        names = DetectionLog.FRAME_COLUMNS + DetectionLog.columns(writer.features)
+        # Every column file, the header and the folder
+        self.assertEqual(len(names) + 2, fsync.call_count)
+
+    def test_non_consecutive_frame_ids(self):
+        with DetectionLogWriter(self.path) as writer:
+            writer.write(10, 0.0, [((0, 1), (0, 1))])
+            writer.write(25, 1.0, [((2, 3), (2, 3))])
+
+        reader = DetectionLogReader(self.path)
+        self.assertListEqual([((2, 3), (2, 3))], reader.areas(25))
+        with self.assertRaises(KeyError):
+            reader.areas(11)
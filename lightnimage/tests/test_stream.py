@@ -0,0 +1,89 @@
+from unittest import TestCase
+import tracemalloc
+
+import numpy as np
+
+from lightnimage.image import LightningImage
+from lightnimage.stream import StreamingDifferencer
+
+
+class TestStreamingDifferencer(TestCase):
+
+    def setUp(self):
+        random = np.random.RandomState(5)
+        self.frames = [random.randint(0, 256, (40, 60)).astype(np.uint8) for i in range(12)]
+
+    def test_differences_match_image_difference(self):
+        differencer = StreamingDifferencer((40, 60), threshold=10, replace=255)
+        self.assertIsNone(differencer.push(self.frames[0]))
+
+        for previous, current in zip(self.frames, self.frames[1:]):
+            expected = LightningImage(current).difference(LightningImage(previous), threshold=10, replace=255)
+            difference = differencer.push(LightningImage(current))
+            self.assertEqual(np.uint8, difference.array.dtype)
+            self.assertTrue(np.array_equal(expected.array, difference.array))
+
+    def test_inverted_differences_match_image_difference(self):
+        differencer = StreamingDifferencer((40, 60), threshold=20, replace=0, invert=True)
+        for i, difference in differencer.stream(self.frames):
+            expected = LightningImage(self.frames[i]).difference(
+                LightningImage(self.frames[i - 1]),
+                threshold=20,
+                replace=0,
+                invert=True
+            )
+            self.assertTrue(np.array_equal(expected.array, difference.array))
+
+    def test_signed_differences_with_lag(self):
+        differencer = StreamingDifferencer((40, 60), history=4, lag=3, signed=True)
+        indices = []
+        for i, difference in differencer.stream(self.frames):
+            indices.append(i)
+            expected = self.frames[i].astype(np.int16) - self.frames[i - 3].astype(np.int16)
+            self.assertTrue(np.array_equal(expected, difference.array))
+        self.assertListEqual(list(range(3, 12)), indices)
+
+    def test_differences_are_read_only_views_on_reused_slots(self):
+        differencer = StreamingDifferencer((40, 60), slots=2)
+        differences = [difference for i, difference in differencer.stream(self.frames[:4])]
+
+        for difference in differences:
+            self.assertTrue(np.shares_memory(difference.array, differencer.differences))
+            self.assertFalse(difference.array.flags.writeable)
+
+        # With two slots, the third difference overwrote the first one
+        self.assertTrue(np.shares_memory(differences[0].array, differences[2].array))
+        self.assertFalse(np.shares_memory(differences[1].array, differences[2].array))
+
+    def test_frames_from_history(self):
+        differencer = StreamingDifferencer((40, 60), history=3)
+        for frame in self.frames[:5]:
+            differencer.push(frame)
+
+        self.assertTrue(np.array_equal(self.frames[4], differencer.frame(0).array))
+        self.assertTrue(np.array_equal(self.frames[2], differencer.frame(2).array))
+        with self.assertRaises(IndexError):
+            differencer.frame(3)
+
+    def test_memory_stays_constant(self):
+        differencer = StreamingDifferencer((200, 300), threshold=5)
+        frame = np.zeros((200, 300), np.uint8)
+        differencer.push(frame)
+
+        tracemalloc.start()
+        for i in range(50):
+            frame[:] = i
+            differencer.push(frame)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # Pushing a frame does not allocate any frame sized arrays, only a few small objects
+        self.assertLess(peak, frame.nbytes / 4)
+
+    def test_invalid_parameters_raise(self):
+        with self.assertRaises(ValueError):
+            StreamingDifferencer((10, 10), history=2, lag=2)
+        with self.assertRaises(ValueError):
+            StreamingDifferencer((10, 10), signed=True, threshold=10)
+        with self.assertRaises(ValueError):
+            StreamingDifferencer((10, 10)).push(np.zeros((5, 5), np.uint8))
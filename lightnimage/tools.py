@@ -1,11 +1,12 @@
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-
+# 19.10.2026
+# matplotlib is NOT imported at the module level, but only within the plotting functions, when they are used for the
+# first time. Importing matplotlib is slow and may try to set up a GUI backend, which is not needed for the detection
+import os
 
 from lightnimage.image import LightningImage
-from lightnimage.engine import *
-
-import os
+from lightnimage.engine import SimpleAreaSegmentationEngine, SimpleLightningClassificationEngine
+from lightnimage.render import render_areas, save_image
+from lightnimage.mask import ExclusionMask, ARAGATS_EXCLUSION
 
 
 def plot_lightning_detection_overview(image, ref_image):
@@ -20,6 +21,9 @@ def plot_lightning_detection_overview(image, ref_image):
     @param LightningImage ref_image:
     @return:
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+
     # Creating the sub plots
     f, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, sharex='col', sharey='row')
 
@@ -65,7 +69,7 @@ def plot_lightning_detection_overview(image, ref_image):
     # Removing the lightning from the difference picture by using the mask
     print('Removing the lightning from the difference picture using the lightning mask')
     removed = subtraction.copy()
-    removed.transform_masked(lambda v, i, j: 0, difference.get_mask())
+    removed.transform_masked(lambda v, i, j: 0, difference.get_mask(), vectorized=True)
 
     ax4.imshow(removed.array, cmap='gray')
     ax4.set_title('without lightning')
@@ -93,6 +97,9 @@ def plot_simple_lightning_detection(image, ref_image, save_path=None, file_name=
     Changed 19.11.2018
     Fixed bug, where the plot image couldnt be saved
 
+    Changed 19.10.2026
+    The detection is done by "simple_lightning_detection" and the list of area types is actually returned now
+
     @param LightningImage image:
     @param LightningImage ref_image:
     @param str save_path:
@@ -100,37 +107,20 @@ def plot_simple_lightning_detection(image, ref_image, save_path=None, file_name=
     @param bool is_showing:
     @return: List(Tuple(str, Tuple(Tuple(int, int), Tuple(int, int))))
     """
+    import matplotlib.pyplot as plt
+    import matplotlib.patches as patches
+
     # Creating the sub plots
     f, ax = plt.subplots(1, 1, sharex='col', sharey='row')
 
-    # Calculating a simple subtraction of the two images
-    print('Calculating the difference of the pictures')
-
-    # Calculating the difference of the two images
-    difference = ref_image.difference(image, threshold=70, replace=0)
-
-    # Refining the difference picture to gain a pure mask of the lightning
-    print('Processing the difference to get the lightning mask')
-    difference.lighten(30, replace=255)
-
-    # Computing the areas in which the lightnings are
-    print('Calculating the areas, that contain lightning')
-    config = {
-
-    }
-    area_engine = SimpleAreaSegmentationEngine(config)
-    areas = area_engine(difference)
-
-    # Filtering out the area that occurs due to the timestamp in the lower right corner
-    areas = filter(lambda x: x[0][0] <= image.width * 0.9 or x[1][0] <= image.height * 0.9, areas)
+    # 19.10.2026
+    # The detection itself has been moved into its own function, so that it can also be used without matplotlib
+    area_types = simple_lightning_detection(image, ref_image)
 
     ax.imshow(image.array, cmap='gray')
 
-    # For each area making a guess if it is a cross or ground lightning
-    # depending on whether the area is rather vertical or horizontal
     print('Overlaying the detected areas with the original picture')
-    area_types = []
-    for area in areas:
+    for guess, area in area_types:
         print('Found area {}'.format(str(area)))
         start = (area[0][0], area[1][0])
         width = area[0][1] - area[0][0]
@@ -138,18 +128,6 @@ def plot_simple_lightning_detection(image, ref_image, save_path=None, file_name=
         rect = patches.Rectangle(start, width, height, linewidth=1, edgecolor='r', facecolor='none')
         ax.add_patch(rect)
 
-        # Making the guess
-        if width >= 1.3 * height:
-            guess = 'cross'
-        elif height >= 1.3 * width:
-            guess = 'ground'
-        else:
-            guess = '???'
-
-        # Adding the guessed type and the area, which was guessed for to the list
-        # which will be returned at the end
-        area_types.append((guess, area))
-
         # plotting the text
         ax.text(start[0], start[1] - 14, guess, size=7, color='r')
 
@@ -168,4 +146,99 @@ def plot_simple_lightning_detection(image, ref_image, save_path=None, file_name=
     # 19.11.2018
     # Added a flag as parameter, whith which the actual display of the plot can be toggled
     if is_showing:
-        plt.show()
\ No newline at end of file
+        plt.show()
+
+    return area_types
+
+
+def simple_lightning_detection(image, ref_image, exclusion=ARAGATS_EXCLUSION):
+    """
+    Detects the areas of lightning within the given image by using the difference to the given reference image. For
+    each area a guess of the lightning type is made:
+    - "ground": Cloud to ground
+    - "cross": Cloud to cloud
+    - "???": Couldnt make a guess
+
+    Returns a list of tuples, where the first element is the string containing the type of the lightning and the
+    second being the area tuple.
+
+    CHANGELOG
+
+    Added 19.10.2026
+    Moved out of "plot_simple_lightning_detection". The guess is now made by the SimpleLightningClassificationEngine
+
+    Changed 19.10.2026
+    Added the exclusion parameter, which replaces the filter of the areas in the lower right corner
+
+    @param LightningImage image:
+    @param LightningImage ref_image:
+    @param exclusion:           The ExclusionMask or the list of rectangles of the regions, which are excluded from
+                                the detection. DEFAULT is ARAGATS_EXCLUSION, None for no exclusion
+    @return: List(Tuple(str, Tuple(Tuple(int, int), Tuple(int, int))))
+    """
+    # Calculating a simple subtraction of the two images
+    print('Calculating the difference of the pictures')
+
+    # Calculating the difference of the two images
+    difference = ref_image.difference(image, threshold=70, replace=0)
+
+    # Refining the difference picture to gain a pure mask of the lightning
+    print('Processing the difference to get the lightning mask')
+    difference.lighten(30, replace=255)
+
+    # 19.10.2026
+    # Removing the timestamp overlays from the difference, before any of the sums are computed. This replaces the
+    # filter, which removed the areas in the lower right corner after the segmentation
+    exclusion = ExclusionMask.create(exclusion)
+    if exclusion is not None:
+        exclusion.apply(difference.array)
+
+    # Computing the areas in which the lightnings are
+    print('Calculating the areas, that contain lightning')
+    config = {
+
+    }
+    area_engine = SimpleAreaSegmentationEngine(config)
+    areas = area_engine(difference)
+
+    # For each area making a guess if it is a cross or ground lightning
+    # depending on whether the lit pixels within the area are rather vertical or horizontal
+    # 19.10.2026
+    # The guess is made for all areas at once by the classification engine
+    classification_engine = SimpleLightningClassificationEngine({})
+    area_types = classification_engine(difference, list(areas))
+
+    return area_types
+
+
+def render_simple_lightning_detection(image, ref_image, save_path=None, file_name=None, image_format='png'):
+    """
+    Does the same as "plot_simple_lightning_detection", but without matplotlib: The areas and the guessed lightning
+    types are drawn directly into an RGB array, which is optionally saved as a PNG or JPEG file. This is a lot faster
+    and creates much smaller files, which is important for checking the detection of thousands of frames.
+
+    Returns a tuple of the list of (guess, area) tuples and the rendered RGB array.
+
+    CHANGELOG
+
+    Added 19.10.2026
+
+    @param LightningImage image:
+    @param LightningImage ref_image:
+    @param str save_path:       The folder to save the image in. DEFAULT is None for not saving
+    @param str file_name:       The file name without the extension
+    @param str image_format:    Either "png" or "jpg". DEFAULT is png
+    @return: Tuple(List(Tuple(str, Tuple(Tuple(int, int), Tuple(int, int)))), np.ndarray)
+    """
+    area_types = simple_lightning_detection(image, ref_image)
+    rgb = render_areas(
+        image.array,
+        [area for guess, area in area_types],
+        [guess for guess, area in area_types]
+    )
+
+    if save_path is not None and file_name is not None:
+        file_path = os.path.join(save_path, '{}.{}'.format(file_name, image_format))
+        save_image(rgb, file_path)
+
+    return area_types, rgb
@@ -1,8 +1,5 @@
 import os
 
-import matplotlib.pyplot as plt
-import matplotlib.patches as patches
-
 
 def draw_areas(ax, areas, color='r'):
     """
@@ -18,6 +15,10 @@ def draw_areas(ax, areas, color='r'):
     :param string color:    The color of the area edges. DEFAULT is "r" for red
     :return: void
     """
+    # 19.10.2026
+    # matplotlib is only imported, when it is actually used
+    import matplotlib.patches as patches
+
     for area in areas:
         # Calculating the defining features of the area, which are needed to define the rectangular
         # patch
@@ -20,6 +20,16 @@ setup(
         'pillow',
         'imageio'
     ],
-    python_requires='~=3.5',
+    extras_require={
+        'jit': ['numba']
+    },
+    entry_points={
+        'console_scripts': [
+            'lightnimage = lightnimage.cli:main'
+        ]
+    },
+    # 19.10.2026
+    # shared_memory needs 3.8 and tracemalloc.reset_peak in the memory module needs 3.9
+    python_requires='>=3.9',
     zip_safe=False
 )